@@ -6,38 +6,213 @@ Chatbot IA pour Monitoring SD-WAN
 
 import subprocess
 import re
+import sys
+import threading
+import time
 import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
+from functools import partial
+
+from sdwan_prober import ProberPool
+from sdwan_inventory import DEFAULT_TEST_PAIRS, TopologyInventory, link_label
+from sdwan_intent import IntentIndex
+from sdwan_sketch import SketchStore
+from sdwan_state import ControllerStateClient
+
+# Lien de référence pour l'état global, les anomalies et la perte
+REFERENCE_LINK = ('s1h1', '10.2.0.11', 'site1->site2')
+
+OVS_BRIDGES = ['br-site1', 'br-site2', 'br-site3', 'br-wan']
+CONTROLLER_STATUS_CMD = "docker ps --filter name=sdwan-ryu --format '{{.Status}}'"
+
+# Commandes et pings d'une réponse lancés en parallèle, avec une échéance
+# commune: la réponse attend la plus lente, pas la somme
+COMMAND_WORKERS = 16
+ANSWER_DEADLINE = 8  # secondes
+PENDING = "⏳ Pas de réponse dans les délais"
+
+PATHS_SHOWN = 10  # Chemins listés (les moins bons), le reste est résumé
+
+PING_COUNT = 3  # Une seule mesure par lien, partagée par toutes les réponses
+
+# Durée de validité des résultats par type de requête (secondes)
+CACHE_TTL = {
+    'state': 2,
+    'ping': 10,
+    'loss': 30,
+    'controller': 5,
+    'flows': 10,
+    'namespaces': 30,
+    'bridges': 30,
+    'ovs': 10,
+}
+DEFAULT_TTL = 10
+
+
+class ResultCache:
+    """
+    Résultats par clé (le premier élément est le type de requête, qui fixe la
+    durée de validité). Les appels concurrents pour une même clé attendent
+    l'exécution déjà en cours au lieu d'en relancer une.
+    """
+    def __init__(self, ttl=CACHE_TTL, default_ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        self.entries = {}   # clé -> (horodatage, valeur)
+        self.inflight = {}  # clé -> Future de l'exécution en cours
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    def get(self, key, compute):
+        """(valeur, horodatage de la mesure); compute() n'est appelé que si rien de frais"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl.get(key[0], self.default_ttl):
+                self.stats['hits'] += 1
+                return entry[1], entry[0]
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self.inflight[key] = Future()
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self.lock:
+                del self.inflight[key]
+            future.set_exception(e)
+            raise
+        measured = time.time()
+        with self.lock:
+            self.entries[key] = (measured, value)
+            del self.inflight[key]
+        future.set_result((value, measured))
+        return value, measured
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def data_age(measured):
+    """'🕒 Données mesurées il y a 4 s' pour l'horodatage le plus ancien utilisé"""
+    age = time.time() - measured
+    if age < 1:
+        return "🕒 Données mesurées à l'instant"
+    return f"🕒 Données mesurées il y a {age:.0f} s"
+
+
+def format_duration(seconds):
+    """3725 -> '1 h 2 min'"""
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return f"{int(seconds)} s"
+    if minutes < 60:
+        return f"{minutes} min"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours} h {minutes} min"
+    return f"{hours // 24} j {hours % 24} h"
+
+
+class Failed:
+    """Résultat de gather pour un appel qui a levé une exception (faux, comme None)"""
+    __slots__ = ('error',)
+    
+    def __init__(self, error):
+        self.error = error
+    
+    def __bool__(self):
+        return False
+    
+    def __str__(self):
+        return f"❌ Échec de la mesure ({self.error})"
+
+
+def missing(result):
+    """Texte d'un résultat de gather sans valeur: délai dépassé ou échec"""
+    return str(result) if isinstance(result, Failed) else PENDING
+
+
+def age_line(results):
+    """Ligne d'âge pour des résultats (..., horodatage) dont certains manquent"""
+    times = [result[-1] for result in results if result]
+    return f"\n  {data_age(min(times))}" if times else ""
+
 
 class SDWANChatbot:
-    def __init__(self):
+    def __init__(self, native=False):
         self.name = "SD-WAN Assistant"
         self.version = "1.0"
         
-        # Base de connaissances (avec et sans accents)
-        self.commands = {
-            'latence': self.get_latency,
-            'ping': self.get_latency,
-            'perte': self.get_packet_loss,
-            'loss': self.get_packet_loss,
-            'controleur': self.get_controller_status,
-            'controller': self.get_controller_status,
-            'contrôleur': self.get_controller_status,
-            'flows': self.get_flows_count,
-            'openflow': self.get_flows_count,
-            'etat': self.get_network_status,
-            'état': self.get_network_status,
-            'status': self.get_network_status,
-            'resume': self.get_summary,
-            'résumé': self.get_summary,
-            'summary': self.get_summary,
-            'aide': self.show_help,
-            'help': self.show_help,
-            'anomalie': self.check_anomalies,
-            'anomaly': self.check_anomalies,
-            'site': self.get_site_info,
-            'bridge': self.get_bridge_info,
+        # Sondes ICMP natives (pas de fork de ping par mesure)
+        self.prober_pool = ProberPool() if native else None
+        
+        # Inventaire des sites découverts (matrice de tests complète)
+        self.inventory = TopologyInventory()
+        
+        # Quantiles de RTT par lien (seaux d'une minute, dernière heure)
+        self.latency_sketches = SketchStore(bucket_seconds=60, buckets=60)
+        
+        # Résultats récents partagés entre les réponses (TTL par type de requête)
+        self.cache = ResultCache()
+        
+        # État structuré du contrôleur (SDWAN_STATE_ADDR); shell en repli
+        self.state_client = ControllerStateClient()
+        
+        # Exécution parallèle des commandes; échéance de la réponse en cours
+        self.executor = ThreadPoolExecutor(max_workers=COMMAND_WORKERS,
+                                           thread_name_prefix='chatbot-cmd')
+        self.deadline = None
+        self.answer_state = None  # (état du contrôleur,) une fois lu pour la réponse en cours
+        
+        # Intentions: fonction et exemples (mots-clés ou phrases, FR/EN),
+        # normalisés une seule fois dans un index BM25
+        self.intents = {
+            'latency': (self.get_latency, [
+                'latence', 'latency', 'ping', 'délai', 'delay', 'rtt', 'temps de réponse',
+                'response time', 'latence entre les sites', 'latency between sites']),
+            'loss': (self.get_packet_loss, [
+                'perte', 'loss', 'perte de paquets', 'paquets perdus', 'packet loss',
+                'lost packets', 'perte entre les sites']),
+            'controller': (self.get_controller_status, [
+                'contrôleur', 'controller', 'ryu', 'contrôleur SDN', 'état du contrôleur',
+                'controller status', 'le contrôleur tourne', 'is the controller running']),
+            'flows': (self.get_flows_count, [
+                'flows', 'flux', 'openflow', 'règles', 'rules', 'flows installés',
+                'flow tables', 'tables de flows', 'installed flows']),
+            'status': (self.get_network_status, [
+                'état', 'status', 'état du réseau', 'network status', 'réseau', 'network',
+                'santé', 'health', 'connectivité', 'connectivity']),
+            'summary': (self.get_summary, [
+                'résumé', 'summary', 'rapport', 'report', "vue d'ensemble", 'overview',
+                'résumé complet', 'full summary']),
+            'paths': (self.get_paths_status, [
+                'chemins', 'paths', 'tunnels', 'score des chemins', 'path metrics',
+                'failover', 'basculement', 'routage', 'routing']),
+            'help': (self.show_help, [
+                'aide', 'help', 'commandes', 'commands', 'que sais-tu faire', 'what can you do']),
+            'anomalies': (self.check_anomalies, [
+                'anomalie', 'anomaly', 'problème', 'problem', 'alerte', 'alert', 'panne',
+                'outage', 'incident', 'something wrong']),
+            'sites': (self.get_site_info, [
+                'site', 'sites', 'sous-réseau', 'subnet', 'adresses', 'addresses',
+                'hosts', 'routeurs', 'routers']),
+            'bridges': (self.get_bridge_info, [
+                'bridge', 'ovs', 'open vswitch', 'ports', 'configuration ovs',
+                'état des bridges', 'bridge configuration']),
+            'refresh': (self.refresh, [
+                'actualiser', 'refresh', 'rafraîchir', 'vider le cache', 'clear cache',
+                'mesures fraîches', 'fresh data']),
         }
+        self.intent_index = IntentIndex({name: examples for name, (_, examples) in self.intents.items()})
         
         self.colors = {
             'GREEN': '\033[0;32m',
@@ -72,47 +247,144 @@ class SDWANChatbot:
         except Exception as e:
             return f"Erreur: {str(e)}"
     
+    def ping(self, ns, ip, count=3):
+        """Ping depuis un namespace: {'latency': ms ou None, 'loss': % ou None, 'rtts': [ms]}"""
+        if self.prober_pool:
+            try:
+                result = self.prober_pool.ping(ns, ip, count=count, interval=0.2, timeout=2)
+                return {
+                    'latency': result.get('latency_ms'),
+                    'loss': int(round(result['packet_loss_percent'])),
+                    'rtts': [r for r in result['rtts'] if r is not None]
+                }
+            except OSError:
+                pass  # Namespace inaccessible: repli sur ping
+        
+        cmd = f"sudo ip netns exec {ns} ping -c {count} -W 2 {ip} 2>&1"
+        output = self.run_command(cmd)
+        
+        rtt = re.search(r'rtt min/avg/max[^=]+=\s*[\d.]+/([\d.]+)/', output)
+        loss = re.search(r'(\d+)% packet loss', output)
+        return {
+            'latency': float(rtt.group(1)) if rtt else None,
+            'loss': int(loss.group(1)) if loss else None,
+            'rtts': [float(t) for t in re.findall(r'time=([\d.]+) ms', output)]
+        }
+    
+    def probe(self, ns, ip, link_id=None):
+        """Ping mis en cache: (résultat, horodatage); un seul ping par lien et par TTL"""
+        def measure():
+            result = self.ping(ns, ip, count=PING_COUNT)
+            if link_id and result['latency'] is not None:
+                # Chaque mesure n'entre qu'une fois dans les quantiles
+                self.latency_sketches.extend(link_id, result['rtts'] or [result['latency']])
+            return result
+        return self.cache.get(('ping', ns, ip), measure)
+    
+    def cached_command(self, kind, cmd):
+        """Sortie de commande mise en cache: (sortie, horodatage)"""
+        return self.cache.get((kind, cmd), lambda: self.run_command(cmd))
+    
+    def controller_state(self):
+        """
+        (état structuré du contrôleur, horodatage), ou None s'il ne répond pas.
+        Lu une seule fois par réponse; un échec est gardé en cache comme un
+        succès, pour ne pas repayer le délai d'attente à chaque section.
+        """
+        if self.answer_state is not None:
+            return self.answer_state[0]
+        document, measured = self.cache.get(('state',), self._fetch_state)
+        state = (document, measured) if document is not None else None
+        if self.deadline is not None:
+            self.answer_state = (state,)
+        return state
+    
+    def _fetch_state(self):
+        try:
+            return self.state_client.query()
+        except (OSError, ValueError):
+            return None  # Contrôleur injoignable: repli sur les commandes shell
+    
+    def controller_running(self):
+        """(contrôleur actif, uptime ou None, horodatage)"""
+        state = self.controller_state()
+        if state:
+            return True, format_duration(state[0]['uptime_seconds']), state[1]
+        output, measured = self.cached_command('controller', CONTROLLER_STATUS_CMD)
+        if 'Up' not in output:
+            return False, None, measured
+        return True, output.split('Up')[1].strip().split('\n')[0], measured
+    
+    def flows_output(self, bridge):
+        """(sortie de dump-flows, horodatage) pour un bridge"""
+        return self.cached_command('flows', f"sudo ovs-ofctl dump-flows {bridge} -O OpenFlow13 2>&1")
+    
+    def gather(self, calls):
+        """
+        Exécute les appels en parallèle jusqu'à l'échéance de la réponse.
+        Résultats dans l'ordre des appels: None pour ceux qui n'ont pas fini
+        à temps (ils continuent et remplissent le cache), Failed pour ceux
+        qui ont échoué.
+        """
+        deadline = self.deadline or time.monotonic() + ANSWER_DEADLINE
+        futures = [self.executor.submit(call) for call in calls]
+        wait(futures, timeout=max(0, deadline - time.monotonic()))
+        results = []
+        for future in futures:
+            if not future.done():
+                results.append(None)
+            elif future.exception() is not None:
+                results.append(Failed(future.exception()))
+            else:
+                results.append(future.result())
+        return results
+    
     def get_latency(self, args=None):
         """Mesure la latence entre sites"""
         self.print_color("\n🔍 Mesure de la latence...", 'CYAN')
         
-        tests = [
-            ('Site 1 → Site 2', 's1h1', '10.2.0.11'),
-            ('Site 1 → Site 3', 's1h1', '10.3.0.11'),
-            ('Site 2 → Site 3', 's2h1', '10.3.0.11'),
-        ]
+        tests = self.inventory.probe_matrix() or DEFAULT_TEST_PAIRS
+        probes = self.gather([partial(self.probe, ns, ip, link_id) for ns, ip, link_id in tests])
         
         results = []
-        for name, ns, ip in tests:
-            cmd = f"sudo ip netns exec {ns} ping -c 3 -W 2 {ip} 2>&1"
-            output = self.run_command(cmd)
+        for (ns, ip, link_id), probed in zip(tests, probes):
+            name = link_label(link_id)
+            if not probed:
+                results.append(f"  • {name}: {missing(probed)}")
+                continue
+            latency = probed[0]['latency']
             
-            if 'rtt min/avg/max' in output:
-                rtt = re.search(r'rtt min/avg/max[^=]+=\s*[\d.]+/([\d.]+)/', output)
-                if rtt:
-                    latency = float(rtt.group(1))
-                    results.append(f"  • {name}: {latency:.2f} ms")
+            if latency is not None:
+                sketch = self.latency_sketches.window(link_id)
+                p50, p90, p99 = sketch.quantiles((0.5, 0.9, 0.99))
+                results.append(f"  • {name}: {latency:.2f} ms "
+                               f"(p50 {p50:.2f} / p90 {p90:.2f} / p99 {p99:.2f} ms "
+                               f"sur {sketch.count} mesures)")
             else:
                 results.append(f"  • {name}: ❌ Échec")
         
-        return "\n📊 Latences mesurées:\n" + "\n".join(results)
+        return "\n📊 Latences mesurées:\n" + "\n".join(results) + age_line(probes)
     
     def get_packet_loss(self, args=None):
         """Vérifie la perte de paquets"""
         self.print_color("\n🔍 Analyse de la perte de paquets...", 'CYAN')
         
-        cmd = "sudo ip netns exec s1h1 ping -c 10 -W 2 10.2.0.11 2>&1"
-        output = self.run_command(cmd)
-        
-        loss_match = re.search(r'(\d+)% packet loss', output)
-        if loss_match:
-            loss = int(loss_match.group(1))
+        # 10 paquets pour la résolution du pourcentage: mesure à part, gardée plus longtemps
+        ns, ip, _ = REFERENCE_LINK
+        probed, = self.gather([partial(self.cache.get, ('loss', ns, ip),
+                                       lambda: self.ping(ns, ip, count=10))])
+        if not probed:
+            return f"\n{missing(probed)}"
+        result, measured = probed
+        loss = result['loss']
+        if loss is not None:
             if loss == 0:
-                return f"\n✅ Aucune perte de paquets détectée (0%)"
+                answer = f"\n✅ Aucune perte de paquets détectée (0%)"
             elif loss < 5:
-                return f"\n⚠️  Perte de paquets faible: {loss}%"
+                answer = f"\n⚠️  Perte de paquets faible: {loss}%"
             else:
-                return f"\n🚨 Perte de paquets élevée: {loss}%"
+                answer = f"\n🚨 Perte de paquets élevée: {loss}%"
+            return answer + f"\n  {data_age(measured)}"
         
         return "\n❌ Impossible de mesurer la perte de paquets"
     
@@ -120,60 +392,123 @@ class SDWANChatbot:
         """Vérifie l'état du contrôleur SDN"""
         self.print_color("\n🔍 Vérification du contrôleur SDN...", 'CYAN')
         
-        cmd = "docker ps --filter name=sdwan-ryu --format '{{.Status}}'"
-        output = self.run_command(cmd)
-        
-        if 'Up' in output:
-            uptime = output.split('Up')[1].strip().split('\n')[0]
-            return f"\n✅ Contrôleur Ryu actif depuis {uptime}"
+        state = self.controller_state()
+        if state:
+            document, measured = state
+            stats = document['stats']
+            return (f"\n✅ Contrôleur Ryu actif depuis {format_duration(document['uptime_seconds'])}"
+                    f"\n  • Switches connectés: {len(document['datapaths'])}"
+                    f"\n  • Flows actifs: {document['flows']['active']}"
+                    f"\n  • Basculements (failovers): {stats['failovers']}"
+                    f"\n  • Changements de chemin: {stats['path_switches']}"
+                    f"\n  {data_age(measured)}")
+        
+        running, uptime, measured = self.controller_running()
+        
+        if running:
+            return f"\n✅ Contrôleur Ryu actif depuis {uptime}\n  {data_age(measured)}"
         else:
-            return "\n❌ Contrôleur Ryu inactif"
+            return f"\n❌ Contrôleur Ryu inactif\n  {data_age(measured)}"
     
     def get_flows_count(self, args=None):
         """Compte les flows OpenFlow installés"""
         self.print_color("\n🔍 Analyse des flows OpenFlow...", 'CYAN')
         
-        bridges = ['br-site1', 'br-site2', 'br-site3', 'br-wan']
+        state = self.controller_state()
+        if state:
+            document, measured = state
+            flows = document['flows']
+            results = [f"  • {datapath['name'] or datapath['dpid']}: {datapath['rules']} règles apprises"
+                       for datapath in document['datapaths']]
+            classes = ", ".join(f"{name}: {count}" for name, count in flows['by_class'].items())
+            return (f"\n📊 Flows OpenFlow (contrôleur):\n" + "\n".join(results) +
+                    f"\n\n  Flows actifs: {flows['active']} ({classes})\n  {data_age(measured)}")
+        
+        outputs = self.gather([partial(self.flows_output, bridge) for bridge in OVS_BRIDGES])
         results = []
         total_flows = 0
         
-        for bridge in bridges:
-            cmd = f"sudo ovs-ofctl dump-flows {bridge} -O OpenFlow13 2>&1"
-            output = self.run_command(cmd)
-            count = output.count('priority=')
+        for bridge, output in zip(OVS_BRIDGES, outputs):
+            if not output:
+                results.append(f"  • {bridge}: {missing(output)}")
+                continue
+            count = output[0].count('priority=')
             total_flows += count
             results.append(f"  • {bridge}: {count} flows")
         
-        return f"\n📊 Flows OpenFlow installés:\n" + "\n".join(results) + f"\n\n  Total: {total_flows} flows"
+        partial_total = "" if all(outputs) else " (partiel)"
+        return (f"\n📊 Flows OpenFlow installés:\n" + "\n".join(results) +
+                f"\n\n  Total: {total_flows} flows{partial_total}" + age_line(outputs))
+    
+    def get_paths_status(self, args=None):
+        """Chemins entre sites et leurs métriques, vus par le contrôleur"""
+        self.print_color("\n🔍 Analyse des chemins...", 'CYAN')
+        
+        state = self.controller_state()
+        if not state:
+            return "\n❌ Chemins indisponibles: le contrôleur ne répond pas"
+        document, measured = state
+        
+        paths = sorted(document['paths'], key=lambda p: p['score'])
+        results = []
+        for path in paths[:PATHS_SHOWN]:
+            link = link_label(f"{path['src_site'] or path['src']}->{path['dst_site'] or path['dst']}")
+            tunnel = f" via {path['tunnel'].upper()}" if path['tunnel'] else ""
+            if not path['available']:
+                results.append(f"  • {link}{tunnel}: ❌ Indisponible")
+                continue
+            results.append(f"  • {link}{tunnel}: {path['latency_ms']:.1f} ms, "
+                           f"perte {path['packet_loss_percent']:.1f}%, score {path['score']:.0f}")
+        if len(paths) > PATHS_SHOWN:
+            results.append(f"  … et {len(paths) - PATHS_SHOWN} autres")
+        if not results:
+            results.append("  Aucun chemin calculé (topologie en cours de découverte)")
+        
+        return (f"\n🛣️  Chemins ({len(document['paths'])}, les moins bons d'abord):\n" + "\n".join(results) +
+                f"\n\n  Basculements (failovers): {document['stats']['failovers']}\n  {data_age(measured)}")
     
     def get_network_status(self, args=None):
         """État global du réseau"""
         self.print_color("\n🔍 Analyse de l'état du réseau...", 'CYAN')
         
-        # Namespaces
-        cmd = "sudo ip netns list | wc -l"
-        ns_count = self.run_command(cmd).strip()
-        
-        # Bridges
-        cmd = "sudo ovs-vsctl list-br | wc -l"
-        br_count = self.run_command(cmd).strip()
-        
-        # Contrôleur
-        cmd = "docker ps --filter name=sdwan-ryu --format '{{.Status}}'"
-        controller = "Actif ✅" if 'Up' in self.run_command(cmd) else "Inactif ❌"
-        
-        # Test de connectivité
-        cmd = "sudo ip netns exec s1h1 ping -c 2 -W 2 10.2.0.11 >/dev/null 2>&1 && echo 'OK' || echo 'FAIL'"
-        connectivity = self.run_command(cmd).strip()
+        # Bridges et contrôleur depuis le contrôleur si possible (une requête locale)
+        state = self.controller_state()
+        
+        # Namespaces, bridges, contrôleur et connectivité (même mesure que la latence)
+        calls = [partial(self.cached_command, 'namespaces', "sudo ip netns list | wc -l"),
+                 partial(self.probe, *REFERENCE_LINK)]
+        if not state:
+            calls += [partial(self.cached_command, 'bridges', "sudo ovs-vsctl list-br | wc -l"),
+                      self.controller_running]
+        namespaces, probed, *shell = self.gather(calls)
+        
+        ns_count = namespaces[0].strip() if namespaces else missing(namespaces)
+        if state:
+            bridges = controller = state
+            br_count = f"{len(state[0]['datapaths'])} connectés au contrôleur"
+            controller_state = "Actif ✅"
+        else:
+            bridges, controller = shell
+            br_count = bridges[0].strip() if bridges else missing(bridges)
+            if not controller:
+                controller_state = missing(controller)
+            else:
+                controller_state = "Actif ✅" if controller[0] else "Inactif ❌"
+        if not probed:
+            connectivity = missing(probed)
+        elif probed[0]['latency'] is not None:
+            connectivity = "✅ Opérationnelle"
+        else:
+            connectivity = "❌ Problème détecté"
         
         return f"""
 📊 État du Réseau SD-WAN:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
   • Namespaces réseau: {ns_count}
   • Bridges OVS: {br_count}
-  • Contrôleur SDN: {controller}
-  • Connectivité inter-sites: {"✅ Opérationnelle" if connectivity == 'OK' else "❌ Problème détecté"}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+  • Contrôleur SDN: {controller_state}
+  • Connectivité inter-sites: {connectivity}
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━{age_line([namespaces, bridges, controller, probed])}
 """
     
     def check_anomalies(self, args=None):
@@ -182,34 +517,64 @@ class SDWANChatbot:
         
         anomalies = []
         
-        # Vérifie la latence
-        cmd = "sudo ip netns exec s1h1 ping -c 5 -W 2 10.2.0.11 2>&1"
-        output = self.run_command(cmd)
+        # État du contrôleur lu avant de lancer les mesures
+        state = self.controller_state()
         
-        if 'rtt min/avg/max' in output:
-            rtt = re.search(r'rtt min/avg/max[^=]+=\s*[\d.]+/([\d.]+)/', output)
-            if rtt and float(rtt.group(1)) > 100:
-                anomalies.append("⚠️  Latence élevée détectée (>100ms)")
+        # Latence et perte (même mesure que l'état et la latence), contrôleur
+        probed, controller = self.gather([partial(self.probe, *REFERENCE_LINK),
+                                          self.controller_running])
         
-        # Vérifie la perte de paquets
-        loss_match = re.search(r'(\d+)% packet loss', output)
-        if loss_match and int(loss_match.group(1)) > 0:
-            anomalies.append(f"⚠️  Perte de paquets: {loss_match.group(1)}%")
+        if not probed:
+            anomalies.append(f"Lien de référence: {missing(probed)}")
+        else:
+            result = probed[0]
+            if result['latency'] is not None and result['latency'] > 100:
+                anomalies.append("⚠️  Latence élevée détectée (>100ms)")
+            
+            # Vérifie la perte de paquets
+            if result['loss']:
+                anomalies.append(f"⚠️  Perte de paquets: {result['loss']}%")
         
         # Vérifie le contrôleur
-        cmd = "docker ps --filter name=sdwan-ryu --format '{{.Status}}'"
-        if 'Up' not in self.run_command(cmd):
+        if not controller:
+            anomalies.append(f"Contrôleur SDN: {missing(controller)}")
+        elif not controller[0]:
             anomalies.append("🚨 Contrôleur SDN inactif")
         
+        # Chemins vus par le contrôleur
+        if state:
+            down = [path for path in state[0]['paths'] if not path['available']]
+            if down:
+                anomalies.append(f"🚨 {len(down)} chemin(s) indisponible(s)")
+            lossy = [path for path in state[0]['paths']
+                     if path['available'] and path['packet_loss_percent'] >= 5]
+            if lossy:
+                anomalies.append(f"⚠️  {len(lossy)} chemin(s) avec plus de 5% de perte")
+        
+        age = age_line([probed, controller, state])
         if anomalies:
-            return "\n🚨 Anomalies détectées:\n  " + "\n  ".join(anomalies)
+            return "\n🚨 Anomalies détectées:\n  " + "\n  ".join(anomalies) + age
         else:
-            return "\n✅ Aucune anomalie détectée. Le réseau fonctionne normalement."
+            return "\n✅ Aucune anomalie détectée. Le réseau fonctionne normalement." + age
     
     def get_summary(self, args=None):
         """Résumé complet du réseau"""
         self.print_color("\n📋 Génération du résumé complet...", 'CYAN')
         
+        # Toutes les mesures des sections lancées en même temps: les sections
+        # ci-dessous les relisent dans le cache. Le contrôleur, s'il répond,
+        # remplace les commandes OVS/Docker.
+        state = self.controller_state()
+        tests = self.inventory.probe_matrix() or DEFAULT_TEST_PAIRS
+        calls = ([partial(self.probe, *REFERENCE_LINK)] +
+                 [partial(self.probe, ns, ip, link_id) for ns, ip, link_id in tests] +
+                 [partial(self.cached_command, 'namespaces', "sudo ip netns list | wc -l")])
+        if not state:
+            calls += ([partial(self.cached_command, 'bridges', "sudo ovs-vsctl list-br | wc -l"),
+                       self.controller_running] +
+                      [partial(self.flows_output, bridge) for bridge in OVS_BRIDGES])
+        self.gather(calls)
+        
         summary = f"""
 ╔══════════════════════════════════════════════════════════════════╗
 ║           RÉSUMÉ SD-WAN - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}           ║
@@ -218,6 +583,8 @@ class SDWANChatbot:
         summary += self.get_network_status()
         summary += "\n" + self.get_latency()
         summary += "\n" + self.get_flows_count()
+        if state:
+            summary += "\n" + self.get_paths_status()
         summary += "\n" + self.check_anomalies()
         
         return summary
@@ -247,10 +614,16 @@ class SDWANChatbot:
         """Informations sur les bridges OVS"""
         self.print_color("\n🔍 Analyse des bridges...", 'CYAN')
         
-        cmd = "sudo ovs-vsctl show"
-        output = self.run_command(cmd)
-        
-        return f"\n📊 Configuration OVS:\n{output}"
+        shown, = self.gather([partial(self.cached_command, 'ovs', "sudo ovs-vsctl show")])
+        if not shown:
+            return f"\n📊 Configuration OVS: {missing(shown)}"
+        output, measured = shown
+        return f"\n📊 Configuration OVS:\n{output}\n  {data_age(measured)}"
+    
+    def refresh(self, args=None):
+        """Oublie les résultats en cache: la prochaine question remesure tout"""
+        self.cache.clear()
+        return "\n🔄 Cache vidé: les prochaines réponses utiliseront des mesures fraîches"
     
     def show_help(self, args=None):
         """Affiche l'aide"""
@@ -267,14 +640,18 @@ class SDWANChatbot:
   🔧 Infrastructure:
     • controleur          - État du contrôleur SDN
     • flows / openflow    - Compte les flows OpenFlow
+    • chemins / paths     - Métriques des chemins et basculements
     • site                - Informations sur les sites
     • bridge              - Configuration des bridges OVS
+    • actualiser / refresh - Force de nouvelles mesures (sinon réutilisées
+                            quelques secondes)
 
   ❓ Aide:
     • aide / help         - Affiche ce message
     • quit / exit         - Quitter le chatbot
 
-Tapez votre question en langage naturel !
+Tapez votre question en langage naturel (français ou anglais) !
+Plusieurs questions à la fois: "latence et pertes entre les sites"
 """
     
     def process_query(self, query):
@@ -286,13 +663,19 @@ Tapez votre question en langage naturel !
         if query_no_accent in ['quit', 'exit', 'q', 'quitter', 'sortir']:
             return None
         
-        # Recherche de mots-clés dans la question (avec et sans accents)
-        for keyword, function in self.commands.items():
-            keyword_no_accent = self.remove_accents(keyword)
-            if keyword in query_lower or keyword_no_accent in query_no_accent:
-                return function()
+        # Intentions de la question (une ou plusieurs, dans l'ordre de la question)
+        intents = self.intent_index.match(query)
+        if intents:
+            # Une seule échéance pour toutes les mesures de la réponse
+            self.deadline = time.monotonic() + ANSWER_DEADLINE
+            self.answer_state = None
+            try:
+                return "\n".join(self.intents[name][0]() for name in intents)
+            finally:
+                self.deadline = None
+                self.answer_state = None
         
-        # Si aucun mot-clé trouvé
+        # Si aucune intention reconnue
         return """
 ❓ Je n'ai pas compris votre question.
 
@@ -350,7 +733,8 @@ Tapez 'aide' pour voir toutes les commandes.
                 self.print_color(f"\n❌ Erreur: {str(e)}\n", 'RED')
 
 def main():
-    chatbot = SDWANChatbot()
+    # --native: sondes ICMP en processus au lieu de forker ping
+    chatbot = SDWANChatbot(native='--native' in sys.argv)
     chatbot.start()
 
 if __name__ == '__main__':
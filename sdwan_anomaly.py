@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Streaming Anomaly Detection
+O(1)-per-sample detectors with a small fixed state per link and metric:
+Welford z-score, EWMA/EWMV, two-sided CUSUM for level shifts and an
+hour-of-day seasonal baseline. A DetectorBank runs a configurable set of
+detectors per metric and keeps per-detector alert rates for tuning.
+"""
+
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+
+
+class Anomaly:
+    """One detector firing on one sample"""
+    __slots__ = ('link_id', 'metric', 'detector', 'value', 'expected', 'score', 'timestamp')
+
+    def __init__(self, link_id, metric, detector, value, expected, score, timestamp):
+        self.link_id = link_id
+        self.metric = metric
+        self.detector = detector
+        self.value = value
+        self.expected = expected
+        self.score = score
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return (f"Anomaly({self.link_id} {self.metric} {self.detector}: "
+                f"{self.value:.2f} vs {self.expected:.2f}, score={self.score:.2f})")
+
+
+class _Welford:
+    """Running mean / variance (Welford)"""
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+class Detector:
+    """Base class: update() returns (expected, score) when the sample is anomalous"""
+    name = 'detector'
+    __slots__ = ()  # Subclass slots only hold if the base adds no __dict__
+
+    def update(self, value, timestamp):
+        raise NotImplementedError
+
+
+class ZScoreDetector(Detector):
+    """|x - mean| / stdev over the running (Welford) statistics"""
+    name = 'zscore'
+    __slots__ = ('threshold', 'warmup', 'stats')
+
+    def __init__(self, threshold=2.5, warmup=10):
+        self.threshold = threshold
+        self.warmup = warmup
+        self.stats = _Welford()
+
+    def update(self, value, timestamp):
+        stats = self.stats
+        result = None
+        if stats.n >= self.warmup:
+            stdev = stats.stdev
+            if stdev > 0:
+                score = (value - stats.mean) / stdev
+                if abs(score) > self.threshold:
+                    result = (stats.mean, score)
+        stats.add(value)
+        return result
+
+
+class EWMADetector(Detector):
+    """Exponentially weighted mean and variance; adapts to slow drift"""
+    name = 'ewma'
+    __slots__ = ('alpha', 'threshold', 'warmup', 'floor', 'n', 'mean', 'var')
+
+    def __init__(self, alpha=0.1, threshold=3.0, warmup=10, floor=0.0):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.floor = floor  # Minimum deviation worth reporting
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+
+    def update(self, value, timestamp):
+        result = None
+        if self.n == 0:
+            self.mean = value
+        else:
+            deviation = value - self.mean
+            stdev = math.sqrt(self.var)
+            if self.n >= self.warmup and stdev > 0 and abs(deviation) > self.floor:
+                score = deviation / stdev
+                if abs(score) > self.threshold:
+                    result = (self.mean, score)
+            increment = self.alpha * deviation
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + deviation * increment)
+        self.n += 1
+        return result
+
+
+class CUSUMDetector(Detector):
+    """Two-sided CUSUM on standardized residuals; catches sustained level shifts"""
+    name = 'cusum'
+    __slots__ = ('k', 'h', 'warmup', 'stats', 'high', 'low')
+
+    def __init__(self, k=0.5, h=5.0, warmup=10):
+        self.k = k  # Allowed slack, in standard deviations
+        self.h = h  # Decision threshold, in standard deviations
+        self.warmup = warmup
+        self.stats = _Welford()
+        self.high = 0.0
+        self.low = 0.0
+
+    def update(self, value, timestamp):
+        stats = self.stats
+        if stats.n < self.warmup or stats.stdev == 0:
+            stats.add(value)
+            return None
+
+        z = (value - stats.mean) / stats.stdev
+        self.high = max(0.0, self.high + z - self.k)
+        self.low = max(0.0, self.low - z - self.k)
+
+        if self.high > self.h or self.low > self.h:
+            score = self.high if self.high > self.h else -self.low
+            expected = stats.mean
+            # New level: restart the reference so the shift is reported once
+            self.high = self.low = 0.0
+            self.stats = _Welford()
+            self.stats.add(value)
+            return expected, score
+
+        stats.add(value)
+        return None
+
+
+class SeasonalDetector(Detector):
+    """Per hour-of-day baseline (24 Welford buckets)"""
+    name = 'seasonal'
+    __slots__ = ('threshold', 'warmup', 'buckets')
+
+    def __init__(self, threshold=3.0, warmup=10):
+        self.threshold = threshold
+        self.warmup = warmup
+        self.buckets = [None] * 24
+
+    def update(self, value, timestamp):
+        hour = time.localtime(timestamp).tm_hour
+        stats = self.buckets[hour]
+        if stats is None:
+            stats = self.buckets[hour] = _Welford()
+
+        result = None
+        if stats.n >= self.warmup:
+            stdev = stats.stdev
+            if stdev > 0:
+                score = (value - stats.mean) / stdev
+                if abs(score) > self.threshold:
+                    result = (stats.mean, score)
+        stats.add(value)
+        return result
+
+
+ZSCORE_THRESHOLD = 2.5  # Standard deviations
+
+
+def default_detectors(zscore_threshold=ZSCORE_THRESHOLD):
+    """metric -> detector factories"""
+    return {
+        'latency': [
+            lambda: ZScoreDetector(threshold=zscore_threshold),
+            lambda: EWMADetector(alpha=0.1, threshold=3.0),
+            lambda: CUSUMDetector(k=0.5, h=5.0),
+            lambda: SeasonalDetector(threshold=3.0),
+        ],
+        'loss': [
+            lambda: EWMADetector(alpha=0.1, threshold=3.0, floor=5.0),
+            lambda: CUSUMDetector(k=1.0, h=5.0),
+        ],
+        'jitter': [
+            lambda: EWMADetector(alpha=0.1, threshold=3.0),
+            lambda: CUSUMDetector(k=0.5, h=5.0),
+        ],
+        'voice_jitter': [
+            lambda: EWMADetector(alpha=0.1, threshold=3.0, floor=1.0),
+            lambda: CUSUMDetector(k=0.5, h=5.0),
+        ],
+        'mos': [
+            lambda: EWMADetector(alpha=0.1, threshold=3.0, floor=0.2),
+            lambda: CUSUMDetector(k=0.5, h=5.0),
+        ],
+    }
+
+
+DEFAULT_DETECTORS = default_detectors()
+
+
+class DetectorBank:
+    """Detectors per (link, metric), with alert-rate accounting per detector"""
+    def __init__(self, detectors=None, zscore_threshold=ZSCORE_THRESHOLD):
+        source = default_detectors(zscore_threshold) if detectors is None else detectors
+        self.factories = {metric: list(factories) for metric, factories in source.items()}
+        self.state = {}
+        # (metric, detector) -> [samples, alerts]
+        self.counters = defaultdict(lambda: [0, 0])
+
+    def observe(self, link_id, metric, value, timestamp=None):
+        """Feed one sample; returns the list of Anomaly raised"""
+        factories = self.factories.get(metric)
+        if not factories or value is None:
+            return []
+
+        key = (link_id, metric)
+        detectors = self.state.get(key)
+        if detectors is None:
+            detectors = self.state[key] = [factory() for factory in factories]
+
+        timestamp = time.time() if timestamp is None else timestamp
+        anomalies = []
+        for detector in detectors:
+            counter = self.counters[(metric, detector.name)]
+            counter[0] += 1
+            result = detector.update(value, timestamp)
+            if result is not None:
+                counter[1] += 1
+                anomalies.append(Anomaly(link_id, metric, detector.name, value,
+                                         result[0], result[1], timestamp))
+        return anomalies
+
+    def alert_rates(self):
+        """{(metric, detector): alerts per sample}"""
+        return {key: alerts / samples for key, (samples, alerts) in self.counters.items()
+                if samples}
+
+    def forget(self, link_id):
+        """Drop the state of a link"""
+        for key in [k for k in self.state if k[0] == link_id]:
+            del self.state[key]
+
+
+def benchmark(links=5000, rounds=20):
+    """Samples per second across many links, and alert rates on clean noise"""
+    rng = random.Random(5)
+    bank = DetectorBank()
+    base = {f"link{i}": rng.uniform(5, 100) for i in range(links)}
+    now = time.time()
+
+    start = time.perf_counter()
+    for r in range(rounds):
+        for link_id, latency in base.items():
+            bank.observe(link_id, 'latency', rng.gauss(latency, latency * 0.05), now + r)
+            bank.observe(link_id, 'loss', max(0.0, rng.gauss(0.5, 0.5)), now + r)
+    elapsed = time.perf_counter() - start
+
+    samples = links * rounds * 2
+    print(f"{samples} samples over {links} links in {elapsed:.2f} s "
+          f"({samples / elapsed:,.0f} samples/s)")
+    print("Alert rates on Gaussian noise (false positives):")
+    for (metric, name), rate in sorted(bank.alert_rates().items()):
+        print(f"  {metric:8s} {name:10s} {rate * 100:6.2f}%")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
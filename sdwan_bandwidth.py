@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Bandwidth Measurement Service
+Long-lived iperf3 servers, a few per namespace on distinct ports, leased to
+one test at a time. Readiness comes from the servers' own "Server listening"
+lines (printed at startup and again after every test) instead of a fixed
+sleep. The scheduler serializes tests sharing an underlay link so they never
+distort each other, and client output is parsed as it arrives.
+"""
+
+import json
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+BASE_PORT = 5201
+SERVERS_PER_NAMESPACE = 2
+READY_TIMEOUT = 5.0
+
+
+def iperf3_version():
+    """(major, minor) of the installed iperf3, or None"""
+    try:
+        output = subprocess.run(['iperf3', '--version'], capture_output=True,
+                                text=True, timeout=5).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    for word in output.split():
+        parts = word.split('.')
+        if len(parts) >= 2 and parts[0].isdigit() and parts[1].isdigit():
+            return int(parts[0]), int(parts[1])
+    return None
+
+
+def _netns(namespace, cmd):
+    return cmd if namespace is None else ['ip', 'netns', 'exec', namespace] + cmd
+
+
+class IperfStreamParser:
+    """
+    Incremental parser for iperf3 JSON output.
+    Accepts `--json-stream` lines ({"event": ..., "data": ...}) as well as the
+    pretty-printed `-J` document, and turns both into the same events:
+    start, interval, end and error.
+    """
+    def __init__(self):
+        self.partial = ''
+        self.document = []
+
+    def feed(self, text):
+        """Consume a chunk of output; returns the events completed by it"""
+        events = []
+        lines = (self.partial + text).split('\n')
+        self.partial = lines.pop()
+        for line in lines:
+            events.extend(self._line(line))
+        return events
+
+    def close(self):
+        """Flush what is left at end of output"""
+        events = self._line(self.partial) if self.partial else []
+        self.partial = ''
+        return events
+
+    def _line(self, line):
+        stripped = line.strip()
+        if not self.document and stripped.startswith('{') and stripped.endswith('}'):
+            try:
+                message = json.loads(stripped)
+            except ValueError:
+                pass
+            else:
+                return self._message(message)
+
+        if stripped or self.document:
+            self.document.append(line)
+        # -J closes its document with a '}' in the first column
+        if line.rstrip() == '}':
+            text = '\n'.join(self.document)
+            self.document = []
+            try:
+                return self._message(json.loads(text))
+            except ValueError:
+                return [{'event': 'error', 'data': 'Unparsable iperf3 output'}]
+        return []
+
+    @staticmethod
+    def _message(message):
+        if 'event' in message:
+            return [message]
+
+        # Whole -J document: replay it as stream events
+        events = []
+        if 'start' in message:
+            events.append({'event': 'start', 'data': message['start']})
+        for interval in message.get('intervals', []):
+            events.append({'event': 'interval', 'data': interval})
+        if 'error' in message:
+            events.append({'event': 'error', 'data': message['error']})
+        elif 'end' in message:
+            events.append({'event': 'end', 'data': message['end']})
+        return events
+
+
+def summarize_end(end, intervals_mbps=()):
+    """bandwidth_test-style result from an iperf3 'end' section"""
+    sent = end.get('sum_sent') or end.get('sum', {})
+    received = end.get('sum_received', {})
+    return {
+        'success': True,
+        'bandwidth_mbps': sent.get('bits_per_second', 0) / 1_000_000,
+        'received_mbps': received.get('bits_per_second', 0) / 1_000_000,
+        'bytes_sent': sent.get('bytes', 0),
+        'retransmits': sent.get('retransmits', 0),
+        'intervals_mbps': list(intervals_mbps)
+    }
+
+
+class IperfServer:
+    """One persistent `iperf3 -s` in a namespace"""
+    def __init__(self, namespace, port, ready_timeout=READY_TIMEOUT):
+        self.namespace = namespace
+        self.port = port
+        self.ready = threading.Event()
+        self.listening = threading.Event()
+        self.proc = subprocess.Popen(
+            _netns(namespace, ['iperf3', '-s', '-p', str(port), '--forceflush']),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        self.reader = threading.Thread(target=self._read, daemon=True,
+                                       name=f"iperf3-{namespace}:{port}")
+        self.reader.start()
+
+        if not self.listening.wait(ready_timeout) or not self.alive():
+            self.stop()
+            raise RuntimeError(f"iperf3 server {namespace}:{port} did not start")
+
+    def _read(self):
+        # Also keeps the pipe drained so a chatty server never blocks
+        for line in self.proc.stdout:
+            if 'Server listening' in line:
+                self.listening.set()
+                self.ready.set()
+        # Process gone (e.g. port in use): wake waiters so they see it
+        self.proc.wait()
+        self.listening.set()
+        self.ready.set()
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def lease(self, timeout=READY_TIMEOUT):
+        """Wait until the server is back to listening, then mark it busy"""
+        if not self.ready.wait(timeout) or not self.alive():
+            return False
+        self.ready.clear()
+        return True
+
+    def rearm(self):
+        """Ready again without a new "Server listening" line (no test reached it)"""
+        self.ready.set()
+
+    def stop(self):
+        if self.alive():
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+
+class IperfServerPool:
+    """Persistent iperf3 servers per namespace, each on its own port"""
+    def __init__(self, servers_per_namespace=SERVERS_PER_NAMESPACE, base_port=BASE_PORT,
+                 port_attempts=20):
+        self.servers_per_namespace = servers_per_namespace
+        self.base_port = base_port
+        self.port_attempts = port_attempts
+        self.servers = defaultdict(list)  # namespace -> [IperfServer]
+        self.idle = defaultdict(list)
+        self.starting = defaultdict(int)  # namespace -> servers being started
+        self.available = threading.Condition()
+
+    def _start_server(self, namespace, used):
+        """
+        Start a server on the next free port (a busy port makes iperf3 exit,
+        including one taken by a concurrent start: the next port is tried)
+        """
+        used = set(used)
+        port = self.base_port
+        for _ in range(self.port_attempts):
+            while port in used:
+                port += 1
+            try:
+                return IperfServer(namespace, port)
+            except RuntimeError:
+                used.add(port)
+        raise RuntimeError(f"No free iperf3 port in {namespace}")
+
+    def acquire(self, namespace, timeout=30):
+        """Exclusive use of a ready server in namespace"""
+        deadline = time.monotonic() + timeout
+        with self.available:
+            while True:
+                # Replace servers that died since their last test
+                for server in [s for s in self.servers[namespace] if not s.alive()]:
+                    self.servers[namespace].remove(server)
+                    if server in self.idle[namespace]:
+                        self.idle[namespace].remove(server)
+
+                if self.idle[namespace]:
+                    server = self.idle[namespace].pop()
+                    break
+                if len(self.servers[namespace]) + self.starting[namespace] < self.servers_per_namespace:
+                    # Reserve the slot; the (slow) start runs outside the lock
+                    self.starting[namespace] += 1
+                    used = [s.port for s in self.servers[namespace]]
+                    server = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No iperf3 server available in {namespace}")
+                self.available.wait(remaining)
+
+        if server is None:
+            try:
+                server = self._start_server(namespace, used)
+            finally:
+                with self.available:
+                    self.starting[namespace] -= 1
+                    if server is not None:
+                        self.servers[namespace].append(server)
+                    self.available.notify_all()
+
+        if not server.lease():
+            with self.available:
+                self.servers[namespace].remove(server)
+            server.stop()
+            return self.acquire(namespace, max(0.0, deadline - time.monotonic()))
+        return server
+
+    def release(self, server, rearm=False):
+        """Return a leased server; rearm when the test never reached it"""
+        if rearm:
+            server.rearm()
+        with self.available:
+            if server in self.servers[server.namespace]:
+                self.idle[server.namespace].append(server)
+            self.available.notify()
+
+    def close(self):
+        with self.available:
+            for servers in self.servers.values():
+                for server in servers:
+                    server.stop()
+            self.servers.clear()
+            self.idle.clear()
+
+
+def run_client(client_ns, server_ip, port, duration=5, json_stream=False,
+               on_interval=None, grace=10):
+    """
+    Run an iperf3 client and parse its output while it runs.
+    on_interval(mbps) sees each per-second result; the test is aborted as
+    soon as iperf3 reports an error. result['started'] tells whether the
+    client reached the server.
+    """
+    cmd = ['iperf3', '-c', server_ip, '-p', str(port), '-t', str(duration),
+           '-J', '--forceflush']
+    if json_stream:
+        cmd.append('--json-stream')
+
+    try:
+        proc = subprocess.Popen(_netns(client_ns, cmd), stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL)
+    except OSError as e:
+        return {'success': False, 'error': str(e)}
+
+    parser = IperfStreamParser()
+    intervals = []
+    result = None
+    started = False
+    deadline = time.monotonic() + duration + grace
+    fd = proc.stdout.fileno()
+    try:
+        while result is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result = {'success': False, 'error': 'Timeout'}
+                break
+            if not select.select([fd], [], [], remaining)[0]:
+                continue
+            chunk = os.read(fd, 65536)
+            events = parser.feed(chunk.decode(errors='replace')) if chunk else parser.close()
+
+            for event in events:
+                if event['event'] == 'start':
+                    started = bool(event['data'].get('connected'))
+                elif event['event'] == 'interval':
+                    mbps = event['data']['sum']['bits_per_second'] / 1_000_000
+                    intervals.append(mbps)
+                    if on_interval:
+                        on_interval(mbps)
+                elif event['event'] == 'error':
+                    result = {'success': False, 'error': str(event['data'])}
+                    break
+                elif event['event'] == 'end':
+                    result = summarize_end(event['data'], intervals)
+                    break
+
+            if not chunk and result is None:
+                result = {'success': False, 'error': 'Bandwidth test failed'}
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+    result['started'] = started or result['success']
+    return result
+
+
+def underlay_key(link_id):
+    """
+    'site2->site1' and 'site1->site2' share the same underlay link, and so
+    do their tunnel variants 'site1->site2/gre' and 'site1->site2/vxlan'
+    """
+    return tuple(sorted(link_id.partition('/')[0].split('->')))
+
+
+class BandwidthScheduler:
+    """
+    Runs iperf3 tests on pooled servers. Tests on the same underlay link are
+    serialized (with an optional cooldown between them); tests on different
+    links run in parallel up to max_parallel.
+    """
+    def __init__(self, pool=None, max_parallel=4, cooldown=0.0):
+        self.pool = pool or IperfServerPool()
+        self.slots = threading.BoundedSemaphore(max_parallel)
+        self.cooldown = cooldown
+        self.link_locks = defaultdict(threading.Lock)
+        self.last_end = {}
+        self.lock = threading.Lock()
+        version = iperf3_version()
+        self.json_stream = version is not None and version >= (3, 17)
+
+    def _link_lock(self, key):
+        with self.lock:
+            return self.link_locks[key]
+
+    def measure(self, link_id, server_ns, client_ns, server_ip, duration=5, on_interval=None):
+        """One test; blocks while another test holds the same underlay link"""
+        key = underlay_key(link_id)
+        with self._link_lock(key):
+            wait = self.last_end.get(key, 0) + self.cooldown - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            with self.slots:
+                try:
+                    server = self.pool.acquire(server_ns)
+                except (RuntimeError, TimeoutError, OSError) as e:
+                    return {'success': False, 'error': str(e)}
+                result = None
+                try:
+                    result = run_client(client_ns, server_ip, server.port, duration,
+                                        self.json_stream, on_interval)
+                finally:
+                    # A client that never started a test leaves the server
+                    # listening without a new "Server listening" line
+                    self.pool.release(server, rearm=result is not None and not result.get('started'))
+                    self.last_end[key] = time.monotonic()
+                result.pop('started', None)
+
+        result['link_id'] = link_id
+        return result
+
+    def run(self, tests, duration=5):
+        """
+        Run [(link_id, server_ns, client_ns, server_ip)]; one worker per
+        underlay link, so a full-mesh sweep never overlaps on a link.
+        Returns the results in the order of tests.
+        """
+        results = [None] * len(tests)
+        by_link = defaultdict(list)
+        for index, test in enumerate(tests):
+            by_link[underlay_key(test[0])].append(index)
+
+        def worker(indexes):
+            for index in indexes:
+                results[index] = self.measure(*tests[index], duration=duration)
+
+        threads = [threading.Thread(target=worker, args=(indexes,), daemon=True)
+                   for indexes in by_link.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def close(self):
+        self.pool.close()
+
+
+if __name__ == '__main__':
+    # Usage: sdwan_bandwidth.py <server_ns> <client_ns> <server_ip> [duration]
+    if len(sys.argv) < 4:
+        print(f"Usage: {sys.argv[0]} <server_ns> <client_ns> <server_ip> [duration]")
+        sys.exit(1)
+    server_ns, client_ns, server_ip = sys.argv[1:4]
+    duration = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+
+    scheduler = BandwidthScheduler()
+    try:
+        for attempt in range(2):
+            start = time.perf_counter()
+            result = scheduler.measure(f"{client_ns}->{server_ns}", server_ns, client_ns,
+                                       server_ip, duration,
+                                       on_interval=lambda mbps: print(f"  {mbps:8.2f} Mbps"))
+            elapsed = time.perf_counter() - start
+            if result['success']:
+                print(f"Test {attempt + 1}: {result['bandwidth_mbps']:.2f} Mbps "
+                      f"({elapsed:.2f} s wall time)")
+            else:
+                print(f"Test {attempt + 1}: failed ({result['error']})")
+    finally:
+        scheduler.close()
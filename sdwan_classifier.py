@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Traffic Classifier
+Compiles an ordered rule list (protocol, source/destination prefixes, port
+ranges, DSCP) into per-field interval tables with rule bitmaps. A lookup is
+one binary search per field plus a few bitmap ANDs, independent of how the
+rules overlap; the first matching rule wins, as in an ACL.
+The same rules can be emitted as OpenFlow 1.3 matches for proactive install.
+"""
+
+import random
+import sys
+import time
+from bisect import bisect_right
+
+from sdwan_prefix import int_to_ip, ip_to_int, parse_prefix
+
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+
+# field name -> (min, max) of its value space
+FIELDS = {
+    'proto': (0, 255),
+    'src': (0, 0xFFFFFFFF),
+    'dst': (0, 0xFFFFFFFF),
+    'src_port': (0, 65535),
+    'dst_port': (0, 65535),
+    'dscp': (0, 63),
+}
+
+
+class ClassRule:
+    """One classification rule; None means 'any' for a field"""
+    def __init__(self, priority, proto=None, src=None, dst=None,
+                 src_ports=None, dst_ports=None, dscp=None, name=None):
+        self.priority = priority  # 0=normal, 1=high, 2=critical
+        self.proto = proto
+        self.src = src  # '10.1.0.0/24'
+        self.dst = dst
+        self.src_ports = _port_range(src_ports)  # 5060 or (16384, 32767)
+        self.dst_ports = _port_range(dst_ports)
+        self.dscp = dscp
+        self.name = name or self._describe()
+
+    def ranges(self):
+        """Inclusive (lo, hi) per field, None for wildcards"""
+        return {
+            'proto': None if self.proto is None else (self.proto, self.proto),
+            'src': _prefix_range(self.src),
+            'dst': _prefix_range(self.dst),
+            'src_port': self.src_ports,
+            'dst_port': self.dst_ports,
+            'dscp': None if self.dscp is None else (self.dscp, self.dscp),
+        }
+
+    def _describe(self):
+        parts = [{IPPROTO_TCP: 'tcp', IPPROTO_UDP: 'udp'}.get(self.proto, str(self.proto or 'ip'))]
+        if self.src:
+            parts.append(f"from {self.src}")
+        if self.dst:
+            parts.append(f"to {self.dst}")
+        for label, ports in (('sport', self.src_ports), ('dport', self.dst_ports)):
+            if ports:
+                parts.append(f"{label} {ports[0]}" if ports[0] == ports[1]
+                             else f"{label} {ports[0]}-{ports[1]}")
+        if self.dscp is not None:
+            parts.append(f"dscp {self.dscp}")
+        return ' '.join(parts)
+
+    def __repr__(self):
+        return f"ClassRule({self.name!r}, priority={self.priority})"
+
+
+def _port_range(ports):
+    if ports is None:
+        return None
+    if isinstance(ports, int):
+        return (ports, ports)
+    lo, hi = ports
+    if not 0 <= lo <= hi <= 65535:
+        raise ValueError(f"Invalid port range: {ports}")
+    return (lo, hi)
+
+
+def _prefix_range(prefix):
+    if prefix is None:
+        return None
+    network, length = parse_prefix(prefix)
+    return (network, network | (0xFFFFFFFF >> length))
+
+
+class _FieldTable:
+    """Elementary intervals of one field with the bitmap of rules covering each"""
+    __slots__ = ('bounds', 'masks', 'any_mask')
+
+    def __init__(self, rule_ranges):
+        self.any_mask = 0
+        toggles = {}
+        for index, value_range in enumerate(rule_ranges):
+            bit = 1 << index
+            if value_range is None:
+                # Wildcards are kept apart so interval bitmaps stay sparse
+                self.any_mask |= bit
+                continue
+            lo, hi = value_range
+            toggles[lo] = toggles.get(lo, 0) ^ bit
+            toggles[hi + 1] = toggles.get(hi + 1, 0) ^ bit
+
+        self.bounds = [0]
+        self.masks = [0]
+        interned = {0: 0}
+        mask = 0
+        for boundary in sorted(toggles):
+            mask ^= toggles[boundary]
+            mask = interned.setdefault(mask, mask)  # Share identical bitmaps
+            if boundary == self.bounds[-1]:
+                self.masks[-1] = mask
+            else:
+                self.bounds.append(boundary)
+                self.masks.append(mask)
+
+    def lookup(self, value):
+        if value is None:
+            return self.any_mask
+        return self.masks[bisect_right(self.bounds, value) - 1] | self.any_mask
+
+
+class TrafficClassifier:
+    """Compiled first-match classifier over an ordered rule list"""
+    def __init__(self, rules=(), default_priority=0):
+        self.default_priority = default_priority
+        self.compile(rules)
+
+    def compile(self, rules):
+        """(Re)build the lookup tables; rule order is match precedence"""
+        rules = list(rules)
+        per_field = {name: [] for name in FIELDS}
+        for rule in rules:
+            for name, value_range in rule.ranges().items():
+                per_field[name].append(value_range)
+
+        tables = {name: _FieldTable(ranges) for name, ranges in per_field.items()}
+
+        # Port-matching rules implicitly require a transport header
+        needs_ports = 0
+        for index, rule in enumerate(rules):
+            if rule.src_ports or rule.dst_ports:
+                needs_ports |= 1 << index
+
+        # Swap in one step so concurrent lookups never see mixed tables
+        self._state = (rules, tables, needs_ports)
+
+    @property
+    def rules(self):
+        return self._state[0]
+
+    def classify(self, proto, src_ip, dst_ip, src_port=None, dst_port=None, dscp=0):
+        """First matching rule for a packet, or None"""
+        rules, tables, needs_ports = self._state
+        if isinstance(src_ip, str):
+            src_ip = ip_to_int(src_ip)
+        if isinstance(dst_ip, str):
+            dst_ip = ip_to_int(dst_ip)
+
+        candidates = tables['proto'].lookup(proto)
+        if src_port is None and dst_port is None:
+            candidates &= ~needs_ports
+        for name, value in (('dst_port', dst_port), ('dst', dst_ip),
+                            ('src_port', src_port), ('src', src_ip), ('dscp', dscp)):
+            if not candidates:
+                return None
+            candidates &= tables[name].lookup(value)
+
+        if not candidates:
+            return None
+        return rules[(candidates & -candidates).bit_length() - 1]
+
+    def priority(self, proto, src_ip, dst_ip, src_port=None, dst_port=None, dscp=0):
+        """Traffic class of a packet (default when no rule matches)"""
+        rule = self.classify(proto, src_ip, dst_ip, src_port, dst_port, dscp)
+        return self.default_priority if rule is None else rule.priority
+
+
+def range_to_masks(lo, hi, bits=16):
+    """Cover an inclusive range with (value, mask) blocks"""
+    blocks = []
+    full = (1 << bits) - 1
+    while lo <= hi:
+        size = lo & -lo if lo else 1 << bits
+        while lo + size - 1 > hi:
+            size >>= 1
+        blocks.append((lo, full & ~(size - 1)))
+        lo += size
+    return blocks
+
+
+def openflow_matches(rule):
+    """
+    OFPMatch keyword arguments equivalent to a rule.
+    Port ranges expand into masked matches, so one rule may need several.
+    """
+    base = {'eth_type': 0x0800}
+    if rule.src:
+        network, length = parse_prefix(rule.src)
+        base['ipv4_src'] = _ofp_prefix(network, length)
+    if rule.dst:
+        network, length = parse_prefix(rule.dst)
+        base['ipv4_dst'] = _ofp_prefix(network, length)
+    if rule.dscp is not None:
+        base['ip_dscp'] = rule.dscp
+
+    if not rule.src_ports and not rule.dst_ports:
+        if rule.proto is not None:
+            base['ip_proto'] = rule.proto
+        return [base]
+
+    protos = [rule.proto] if rule.proto is not None else [IPPROTO_TCP, IPPROTO_UDP]
+    matches = []
+    for proto in protos:
+        prefix = 'tcp' if proto == IPPROTO_TCP else 'udp'
+        src_blocks = _port_blocks(rule.src_ports)
+        dst_blocks = _port_blocks(rule.dst_ports)
+        for src_block in src_blocks:
+            for dst_block in dst_blocks:
+                fields = dict(base, ip_proto=proto)
+                if src_block is not None:
+                    fields[f"{prefix}_src"] = src_block
+                if dst_block is not None:
+                    fields[f"{prefix}_dst"] = dst_block
+                matches.append(fields)
+    return matches
+
+
+def _ofp_prefix(network, length):
+    if length == 32:
+        return int_to_ip(network)
+    return (int_to_ip(network), int_to_ip((0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF))
+
+
+def _port_blocks(ports):
+    if ports is None:
+        return [None]
+    return [value if mask == 0xFFFF else (value, mask)
+            for value, mask in range_to_masks(*ports)]
+
+
+def benchmark(rule_count=10_000, packets=100_000):
+    """Compare the compiled classifier with an exact-port dict lookup"""
+    rng = random.Random(11)
+
+    ports = rng.sample(range(1, 65536), rule_count)
+    port_priority = {port: rng.randint(0, 2) for port in ports}
+
+    rules = []
+    for i in range(rule_count):
+        kind = i % 4
+        if kind == 0:
+            low = rng.randrange(1024, 60000)
+            rules.append(ClassRule(rng.randint(0, 2), proto=IPPROTO_UDP,
+                                   dst=f"10.{rng.randrange(40)}.{rng.randrange(256)}.0/24",
+                                   dst_ports=(low, low + rng.randrange(2000))))
+        elif kind == 1:
+            rules.append(ClassRule(rng.randint(0, 2), proto=IPPROTO_TCP, dst_ports=ports[i]))
+        elif kind == 2:
+            rules.append(ClassRule(rng.randint(0, 2), src=f"10.{rng.randrange(40)}.0.0/16",
+                                   dscp=rng.choice((0, 34, 46))))
+        else:
+            rules.append(ClassRule(rng.randint(0, 2), proto=IPPROTO_TCP, src_ports=ports[i]))
+
+    start = time.perf_counter()
+    classifier = TrafficClassifier(rules)
+    compile_time = time.perf_counter() - start
+
+    traffic = [
+        (rng.choice((IPPROTO_TCP, IPPROTO_UDP)),
+         ip_to_int(f"10.{rng.randrange(40)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"),
+         ip_to_int(f"10.{rng.randrange(40)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"),
+         rng.randrange(1, 65536), rng.randrange(1, 65536), rng.choice((0, 34, 46)))
+        for _ in range(packets)
+    ]
+
+    start = time.perf_counter()
+    for _, _, _, src_port, dst_port, _ in traffic:
+        if dst_port in port_priority:
+            port_priority[dst_port]
+        elif src_port in port_priority:
+            port_priority[src_port]
+    dict_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for packet in traffic:
+        classifier.priority(*packet)
+    classifier_time = time.perf_counter() - start
+
+    matches = sum(len(openflow_matches(rule)) for rule in rules)
+
+    print(f"Rules: {rule_count} (compiled in {compile_time * 1000:.0f} ms, "
+          f"{matches} OpenFlow matches)")
+    print(f"  dict port lookup:    {dict_time / packets * 1_000_000:6.2f} us/packet "
+          f"(exact ports only)")
+    print(f"  compiled classifier: {classifier_time / packets * 1_000_000:6.2f} us/packet "
+          f"(protocols, prefixes, port ranges, DSCP)")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -13,22 +13,69 @@ from ryu.controller import ofp_event
 from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER, DEAD_DISPATCHER
 from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_3
-from ryu.lib.packet import packet, ethernet, ipv4, tcp, udp, icmp, arp
+from ryu.lib.packet import packet, ethernet, ipv4, tcp, udp, icmp, arp, lldp
+from ryu.lib.packet import ether_types
 from ryu.lib import hub
+import struct
 import time
 import json
 import logging
 from collections import defaultdict
 from datetime import datetime
 
+from sdwan_elephants import ElephantDetector
+from sdwan_topology import TopologyGraph
+from sdwan_prefix import PrefixTrie
+from sdwan_classifier import (ClassRule, TrafficClassifier, openflow_matches,
+                              IPPROTO_TCP, IPPROTO_UDP)
+from sdwan_feed import MetricsFeedReader, MAX_SAMPLE_AGE
+from sdwan_state import DEFAULT_STATE_ADDR, FLOW_CLASSES, parse_address, serve_connection
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Exact-match rules used to pin elephant flows on a dedicated tunnel
+ELEPHANT_PRIORITY = 0xF000
+ELEPHANT_COOKIE = 0xE1E
+ELEPHANT_IDLE_TIMEOUT = 30
+
+# LLDP topology discovery
+LLDP_INTERVAL = 5        # seconds between probes on every port
+LLDP_LINK_TIMEOUT = 3 * LLDP_INTERVAL
+K_PATHS = 4              # Candidate paths kept per switch pair
+
+# Site subnets; each site bridge is named br-<site>
+SITES = {
+    'site1': ['10.1.0.0/24'],
+    'site2': ['10.2.0.0/24'],
+    'site3': ['10.3.0.0/24'],
+}
+
+# Traffic class policies, evaluated before the per-port priorities
+CLASS_POLICIES = [
+    ClassRule(2, proto=IPPROTO_UDP, dst=prefix, dst_ports=(16384, 32767),
+              name=f"RTP to {site}")
+    for site, prefixes in SITES.items() for prefix in prefixes
+]
+
+# Measured link metrics published by sdwan_monitor (see sdwan_feed)
+FEED_POLL_INTERVAL = 1  # seconds
+
+# Structured state for local readers (chatbot), see sdwan_state
+STATE_ADDR = DEFAULT_STATE_ADDR  # SDWAN_STATE_ADDR, loopback only by default
+
+# Proactive install of the class rules (set queue = class, NORMAL forwarding)
+PROACTIVE_CLASS_RULES = False
+CLASS_RULE_PRIORITY_BASE = 1000
+
 
 class PathMetrics:
     """Track metrics for each network path"""
-    def __init__(self, path_id):
+    def __init__(self, path_id, port_no=None, dpids=(), tunnel=None):
         self.path_id = path_id
+        self.port_no = port_no  # Egress port on the source switch
+        self.dpids = tuple(dpids)  # Switches traversed
+        self.tunnel = tunnel  # 'gre' / 'vxlan' when the path crosses a tunnel port
         self.latency = 0
         self.packet_loss = 0
         self.bandwidth_used = 0
@@ -74,12 +121,15 @@ class PathMetrics:
         """Convert to dictionary for JSON serialization"""
         return {
             'path_id': self.path_id,
+            'tunnel': self.tunnel,
             'latency_ms': self.latency,
             'packet_loss_percent': self.packet_loss,
             'bandwidth_used_mbps': self.bandwidth_used,
             'bandwidth_total_mbps': self.bandwidth_total,
             'available': self.available,
             'score': self.score,
+            'packet_count': self.packet_count,
+            'byte_count': self.byte_count,
             'last_update': datetime.fromtimestamp(self.last_update).isoformat()
         }
 
@@ -94,6 +144,9 @@ class FlowEntry:
         self.dst_port = dst_port
         self.priority = priority  # 0=normal, 1=high, 2=critical
         self.current_path = None
+        self.dpid = None
+        self.rule_key = None  # Switch rule carrying the flow, see flow_rules
+        self.dst_dpid = None  # Egress switch of the destination site
         self.creation_time = time.time()
         self.last_seen = time.time()
         self.packet_count = 0
@@ -125,20 +178,48 @@ class SDWANController(app_manager.RyuApp):
         # Path tracking: (src_dpid, dst_dpid) -> [PathMetrics]
         self.paths = defaultdict(list)
         
-        # Active flows: flow_id -> FlowEntry
+        # LLDP-discovered topology with cached k-shortest paths
+        self.topology = TopologyGraph(k=K_PATHS)
+        
+        # Port registry: dpid -> {port_no: (hw_addr, name)}
+        self.ports = {}
+        
+        # Last LLDP sighting: (src_dpid, src_port) -> timestamp
+        self.link_seen = {}
+        
+        # Active flows: (dpid, flow_id) -> FlowEntry; a flow crossing a site
+        # bridge and br-wan has one entry per switch, each with its own rule
         self.flows = {}
         
-        # Site to datapath mapping
+        # Installed rules: (dpid, priority, sorted 5-tuple match fields) -> {(dpid, flow_id)}
+        self.flow_rules = defaultdict(set)
+        
+        # Site to datapath mapping, learned from bridge names
         self.site_dpids = {}
+        self.bridge_names = {}  # dpid -> bridge name (LOCAL port)
+        
+        # Destination IP -> site, by longest-prefix match
+        self.sites = {}
+        self.site_prefixes = PrefixTrie()
+        self.load_sites(SITES)
         
         # Statistics
         self.stats = {
             'total_flows': 0,
             'path_switches': 0,
             'failovers': 0,
-            'packets_forwarded': 0
+            'packets_forwarded': 0,
+            'elephant_reroutes': 0,
+            'flows_expired': 0
         }
         
+        # Elephant flow detection: (dpid, flow_key) -> (path_id, rate_mbps)
+        self.elephant_detector = ElephantDetector()
+        self.elephant_routes = {}
+        
+        # Rate (Mbps) of elephants pinned on each path: path_id -> Mbps
+        self.elephant_load = defaultdict(float)
+        
         # QoS priority ports (SSH, HTTPS, DNS, VoIP)
         self.priority_ports = {
             22: 2,    # SSH - critical
@@ -148,9 +229,25 @@ class SDWANController(app_manager.RyuApp):
             80: 0     # HTTP - normal
         }
         
+        # Compiled classifier over CLASS_POLICIES and priority_ports
+        self.classifier = TrafficClassifier()
+        self._build_classifier()
+        
+        # Monitor measurements: (src_dpid, dst_dpid, tunnel) -> last tunnel-specific sample time
+        self.metrics_feed = MetricsFeedReader()
+        self.tunnel_measured = {}
+        
+        # Egress usage from port counters: (dpid, port_no) -> (tx_bytes, time), Mbps
+        self.port_tx = {}
+        self.port_rates = {}
+        
         # Start monitoring threads
+        self.started_at = time.time()
         self.monitor_thread = hub.spawn(self._monitor_loop)
         self.path_selection_thread = hub.spawn(self._path_selection_loop)
+        self.lldp_thread = hub.spawn(self._lldp_loop)
+        self.feed_thread = hub.spawn(self._feed_loop)
+        self.state_thread = hub.spawn(self._state_server)
         
         logger.info("SD-WAN Controller initialized")
     
@@ -172,6 +269,16 @@ class SDWANController(app_manager.RyuApp):
                                          ofproto.OFPCML_NO_BUFFER)]
         self.add_flow(datapath, 0, match, actions)
         
+        # Always punt LLDP so learned L2 rules never swallow discovery probes
+        match = parser.OFPMatch(eth_type=ether_types.ETH_TYPE_LLDP)
+        self.add_flow(datapath, 0xFFFF, match, actions)
+        
+        self.topology.add_switch(dpid)
+        datapath.send_msg(parser.OFPPortDescStatsRequest(datapath, 0))
+        
+        if PROACTIVE_CLASS_RULES:
+            self._install_class_rules(datapath)
+        
         # Request port statistics
         self._request_stats(datapath)
     
@@ -187,9 +294,12 @@ class SDWANController(app_manager.RyuApp):
             if datapath.id in self.datapaths:
                 del self.datapaths[datapath.id]
                 logger.warning(f"Switch disconnected: DPID={datapath.id}")
+                self._forget_elephants(datapath.id)
+                self._forget_flows(datapath.id)
                 self._handle_switch_failure(datapath.id)
     
-    def add_flow(self, datapath, priority, match, actions, buffer_id=None, idle_timeout=0, hard_timeout=0):
+    def add_flow(self, datapath, priority, match, actions, buffer_id=None, idle_timeout=0, hard_timeout=0,
+                 cookie=0, flags=0):
         """Add flow entry to switch"""
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
@@ -200,11 +310,13 @@ class SDWANController(app_manager.RyuApp):
             mod = parser.OFPFlowMod(datapath=datapath, buffer_id=buffer_id,
                                    priority=priority, match=match,
                                    instructions=inst, idle_timeout=idle_timeout,
-                                   hard_timeout=hard_timeout)
+                                   hard_timeout=hard_timeout, cookie=cookie,
+                                   flags=flags)
         else:
             mod = parser.OFPFlowMod(datapath=datapath, priority=priority,
                                    match=match, instructions=inst,
-                                   idle_timeout=idle_timeout, hard_timeout=hard_timeout)
+                                   idle_timeout=idle_timeout, hard_timeout=hard_timeout,
+                                   cookie=cookie, flags=flags)
         datapath.send_msg(mod)
     
     @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
@@ -220,8 +332,9 @@ class SDWANController(app_manager.RyuApp):
         pkt = packet.Packet(msg.data)
         eth = pkt.get_protocols(ethernet.ethernet)[0]
         
-        # Ignore LLDP packets
-        if eth.ethertype == 0x88cc:
+        # LLDP feeds topology discovery, never the MAC tables
+        if eth.ethertype == ether_types.ETH_TYPE_LLDP:
+            self._handle_lldp(dpid, in_port, pkt)
             return
         
         dst = eth.dst
@@ -247,11 +360,26 @@ class SDWANController(app_manager.RyuApp):
                 priority = self._get_packet_priority(pkt)
                 flow_id = self._create_flow_entry(pkt, dpid)
                 
-                # Select best path based on priority and metrics
-                selected_path = self._select_best_path(dpid, priority)
+                # Select best path towards the destination site
+                destination = self.resolve_destination(dpid, ip_pkt.dst)
+                dst_dpid = destination[1] if destination else None
+                selected_path = self._select_best_path(dpid, priority, dst_dpid)
+                if flow_id in self.flows:
+                    self.flows[flow_id].dst_dpid = dst_dpid
+                    if selected_path:
+                        self.flows[flow_id].current_path = selected_path.path_id
+                
+                # One rule per 5-tuple: its counters are the flow's own, so
+                # elephant detection and pinning never sweep up sibling flows
+                fields = self._flow_match_fields(pkt, in_port)
+                self.add_flow(datapath, priority + 1, parser.OFPMatch(**fields), actions,
+                              idle_timeout=60, flags=ofproto.OFPFF_SEND_FLOW_REM)
                 
-                match = parser.OFPMatch(in_port=in_port, eth_dst=dst, eth_src=src)
-                self.add_flow(datapath, priority + 1, match, actions, idle_timeout=60)
+                # Remember which rule carries the flow for FlowRemoved
+                rule_key = (dpid, priority + 1, tuple(sorted(fields.items())))
+                if flow_id in self.flows:
+                    self.flows[flow_id].rule_key = rule_key
+                    self.flow_rules[rule_key].add(flow_id)
                 
                 self.stats['total_flows'] += 1
                 logger.debug(f"Flow installed: {flow_id} priority={priority}")
@@ -266,23 +394,68 @@ class SDWANController(app_manager.RyuApp):
         datapath.send_msg(out)
         self.stats['packets_forwarded'] += 1
     
+    def _build_classifier(self):
+        """Compile class policies and priority ports into the classifier"""
+        rules = list(CLASS_POLICIES)
+        
+        # Destination port first, then source port, as a first-match list
+        for field in ('dst_ports', 'src_ports'):
+            for port, priority in self.priority_ports.items():
+                for proto in (IPPROTO_TCP, IPPROTO_UDP):
+                    rules.append(ClassRule(priority, proto=proto, **{field: port}))
+        
+        self.classifier.compile(rules)
+    
+    def _install_class_rules(self, datapath):
+        """Proactively install the compiled class rules on a switch"""
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        rules = self.classifier.rules
+        
+        for index, rule in enumerate(rules):
+            # Earlier rules win, so they get the higher OpenFlow priority
+            priority = CLASS_RULE_PRIORITY_BASE + len(rules) - index
+            actions = [parser.OFPActionSetQueue(rule.priority),
+                       parser.OFPActionOutput(ofproto.OFPP_NORMAL)]
+            for fields in openflow_matches(rule):
+                self.add_flow(datapath, priority, parser.OFPMatch(**fields), actions)
+        
+        logger.info(f"Installed {len(rules)} class rules on switch {datapath.id}")
+    
     def _get_packet_priority(self, pkt):
-        """Determine packet priority based on protocol and port"""
+        """Determine packet priority based on protocol, prefixes, ports and DSCP"""
+        ip_pkt = pkt.get_protocol(ipv4.ipv4)
+        if not ip_pkt:
+            return 0  # Normal priority
+        
         tcp_pkt = pkt.get_protocol(tcp.tcp)
         udp_pkt = pkt.get_protocol(udp.udp)
+        l4_pkt = tcp_pkt or udp_pkt
+        
+        return self.classifier.priority(
+            ip_pkt.proto, ip_pkt.src, ip_pkt.dst,
+            l4_pkt.src_port if l4_pkt else None,
+            l4_pkt.dst_port if l4_pkt else None,
+            ip_pkt.tos >> 2
+        )
+    
+    def _flow_match_fields(self, pkt, in_port):
+        """OFPMatch keyword arguments of an IPv4 packet's 5-tuple"""
+        eth = pkt.get_protocols(ethernet.ethernet)[0]
+        ip_pkt = pkt.get_protocol(ipv4.ipv4)
+        fields = {'in_port': in_port, 'eth_src': eth.src, 'eth_dst': eth.dst,
+                  'eth_type': ether_types.ETH_TYPE_IP, 'ip_proto': ip_pkt.proto,
+                  'ipv4_src': ip_pkt.src, 'ipv4_dst': ip_pkt.dst}
         
+        tcp_pkt = pkt.get_protocol(tcp.tcp)
+        udp_pkt = pkt.get_protocol(udp.udp)
         if tcp_pkt:
-            if tcp_pkt.dst_port in self.priority_ports:
-                return self.priority_ports[tcp_pkt.dst_port]
-            if tcp_pkt.src_port in self.priority_ports:
-                return self.priority_ports[tcp_pkt.src_port]
+            fields['tcp_src'] = tcp_pkt.src_port
+            fields['tcp_dst'] = tcp_pkt.dst_port
         elif udp_pkt:
-            if udp_pkt.dst_port in self.priority_ports:
-                return self.priority_ports[udp_pkt.dst_port]
-            if udp_pkt.src_port in self.priority_ports:
-                return self.priority_ports[udp_pkt.src_port]
-        
-        return 0  # Normal priority
+            fields['udp_src'] = udp_pkt.src_port
+            fields['udp_dst'] = udp_pkt.dst_port
+        return fields
     
     def _create_flow_entry(self, pkt, dpid):
         """Create flow entry from packet"""
@@ -307,15 +480,22 @@ class SDWANController(app_manager.RyuApp):
         priority = self._get_packet_priority(pkt)
         
         flow = FlowEntry(ip_pkt.src, ip_pkt.dst, protocol, src_port, dst_port, priority)
-        flow_id = flow.get_flow_id()
+        flow.dpid = dpid
+        flow_id = (dpid, flow.get_flow_id())
         self.flows[flow_id] = flow
         
         return flow_id
     
-    def _select_best_path(self, dpid, priority):
+    def _paths_from(self, dpid, dst_dpid=None):
+        """Candidate paths leaving a switch, optionally towards one switch"""
+        if dst_dpid is not None:
+            return self.paths.get((dpid, dst_dpid), [])
+        return [p for (src, _), path_list in self.paths.items() if src == dpid
+                for p in path_list]
+    
+    def _select_best_path(self, dpid, priority, dst_dpid=None):
         """Select best path based on metrics and priority"""
-        # Simulate path selection (in real implementation, would use actual paths)
-        available_paths = [p for p in self.paths.get(dpid, []) if p.available]
+        available_paths = [p for p in self._paths_from(dpid, dst_dpid) if p.available]
         
         if not available_paths:
             return None
@@ -336,14 +516,89 @@ class SDWANController(app_manager.RyuApp):
         # Mark all paths through this switch as unavailable
         for path_list in self.paths.values():
             for path in path_list:
-                if path.path_id == dpid:
+                if dpid in path.dpids:
                     path.available = False
                     path.calculate_score()
         
+        # Drop it from the topology; only pairs routed through it recompute
+        self.topology.remove_switch(dpid)
+        self.ports.pop(dpid, None)
+        for src, port in [l for l in self.link_seen if l[0] == dpid]:
+            del self.link_seen[(src, port)]
+        for key in [k for k in self.port_tx if k[0] == dpid]:
+            del self.port_tx[key]
+            self.port_rates.pop(key, None)
+        self._refresh_paths()
+        
         # Trigger path reselection for affected flows
         self._trigger_path_reselection()
         self.stats['failovers'] += 1
     
+    def _forget_elephants(self, dpid):
+        """Drop elephant state of a disconnected switch"""
+        for route_dpid, key in list(self.elephant_routes):
+            if route_dpid == dpid:
+                path_id, rate = self.elephant_routes.pop((route_dpid, key))
+                self.elephant_load[path_id] = max(0.0, self.elephant_load[path_id] - rate)
+        self.elephant_detector.forget_switch(dpid)
+    
+    def _forget_flows(self, dpid):
+        """Drop flows whose rules died with a disconnected switch"""
+        for rule_key in [k for k in self.flow_rules if k[0] == dpid]:
+            for flow_id in self.flow_rules.pop(rule_key):
+                flow = self.flows.get(flow_id)
+                if flow and flow.rule_key == rule_key:
+                    del self.flows[flow_id]
+    
+    @set_ev_cls(ofp_event.EventOFPFlowRemoved, MAIN_DISPATCHER)
+    def flow_removed_handler(self, ev):
+        """Retire flows as soon as the switch expires or deletes their rule"""
+        msg = ev.msg
+        datapath = msg.datapath
+        fields = dict(msg.match.items())
+        
+        key = tuple(sorted(fields.items()))
+        rule_key = (datapath.id, msg.priority, key)
+        
+        if msg.cookie == ELEPHANT_COOKIE:
+            # Pinned rule idled out: the elephant is gone, free its tunnel share
+            self._release_elephant(datapath, key)
+        
+        # The pinned rule shares the learned match and carries the elephant now:
+        # the learned rule idling out is expected, the flow moves to the pinned rule
+        route = self.elephant_routes.get((datapath.id, key))
+        pinned_key = (datapath.id, ELEPHANT_PRIORITY, key) if route else None
+        
+        # Rule counters cover every flow it carried: account them once per path
+        accounted_paths = set()
+        for flow_id in self.flow_rules.pop(rule_key, ()):
+            flow = self.flows.get(flow_id)
+            if not flow or flow.rule_key != rule_key:
+                continue  # Flow has since moved to another rule
+            
+            flow.update_stats(msg.packet_count, msg.byte_count)
+            if flow.current_path and flow.current_path not in accounted_paths:
+                accounted_paths.add(flow.current_path)
+                self._account_path(flow.current_path, msg.packet_count, msg.byte_count)
+            
+            if pinned_key:
+                flow.rule_key = pinned_key
+                flow.current_path = route[0]
+                self.flow_rules[pinned_key].add(flow_id)
+                continue
+            
+            del self.flows[flow_id]
+            self.stats['flows_expired'] += 1
+    
+    def _account_path(self, path_id, packet_count, byte_count):
+        """Add final flow counters to the path that carried them"""
+        for path_list in self.paths.values():
+            for path in path_list:
+                if path.path_id == path_id:
+                    path.packet_count += packet_count
+                    path.byte_count += byte_count
+                    return
+    
     def _trigger_path_reselection(self):
         """Force reselection of paths for all flows"""
         logger.info("Triggering path reselection for all active flows")
@@ -362,29 +617,309 @@ class SDWANController(app_manager.RyuApp):
     @set_ev_cls(ofp_event.EventOFPFlowStatsReply, MAIN_DISPATCHER)
     def flow_stats_reply_handler(self, ev):
         """Handle flow statistics reply"""
-        flows = []
+        datapath = ev.msg.datapath
+        
+        # Aggregate counters per match so an elephant keeps its history
+        # when its traffic moves from the learned rule to the pinned rule
+        samples = {}
+        matches = {}
         for stat in ev.msg.body:
-            flows.append({
-                'priority': stat.priority,
-                'packet_count': stat.packet_count,
-                'byte_count': stat.byte_count,
-                'duration': stat.duration_sec
-            })
+            if stat.priority == 0:
+                continue  # Table-miss entry
+            
+            fields = dict(stat.match.items())
+            key = tuple(sorted(fields.items()))
+            byte_count, duration = samples.get(key, (0, 0))
+            samples[key] = (byte_count + stat.byte_count,
+                            max(duration, stat.duration_sec))
+            matches[key] = fields
+        
+        elephants = self.elephant_detector.update(
+            datapath.id,
+            [(key, b, d) for key, (b, d) in samples.items()]
+        )
+        self._update_elephant_routes(datapath, elephants, matches)
+    
+    def _update_elephant_routes(self, datapath, elephants, matches):
+        """Pin new elephants on a tunnel and release former ones"""
+        dpid = datapath.id
+        
+        for route_dpid, key in list(self.elephant_routes):
+            if route_dpid == dpid and key not in elephants:
+                self._release_elephant(datapath, key, matches.get(key))
+        
+        for key in elephants:
+            if (dpid, key) not in self.elephant_routes and key in matches:
+                self._reroute_elephant(datapath, key, matches[key])
+    
+    def _least_utilized_path(self, dpid, dst_dpid):
+        """Available path towards dst_dpid with the lowest utilization, elephants included"""
+        candidates = [p for p in self._paths_from(dpid, dst_dpid)
+                      if p.available and p.port_no is not None]
+        if not candidates:
+            return None
+        
+        return min(candidates, key=lambda p: (
+            (p.bandwidth_used + self.elephant_load[p.path_id]) / p.bandwidth_total
+        ))
+    
+    def _reroute_elephant(self, datapath, key, fields):
+        """Move a single elephant to the least-utilized tunnel towards its site"""
+        dpid = datapath.id
+        
+        # Only tunnels to the elephant's own destination site are candidates;
+        # without one it stays on its default path
+        dst_ip = fields.get('ipv4_dst')
+        destination = self.resolve_destination(dpid, dst_ip) if isinstance(dst_ip, str) else None
+        if not destination or destination[1] is None or destination[1] == dpid:
+            return
+        path = self._least_utilized_path(dpid, destination[1])
+        if not path:
+            return
+        
+        parser = datapath.ofproto_parser
+        rate = self.elephant_detector.rate_mbps(dpid, key)
+        
+        match = parser.OFPMatch(**fields)
+        actions = [parser.OFPActionOutput(path.port_no)]
+        self.add_flow(datapath, ELEPHANT_PRIORITY, match, actions,
+                      idle_timeout=ELEPHANT_IDLE_TIMEOUT, cookie=ELEPHANT_COOKIE,
+                      flags=datapath.ofproto.OFPFF_SEND_FLOW_REM)
+        
+        self.elephant_routes[(dpid, key)] = (path.path_id, rate)
+        self.elephant_load[path.path_id] += rate
+        self.stats['elephant_reroutes'] += 1
+        logger.info(f"Elephant flow on switch {dpid} ({rate:.1f} Mbps) "
+                    f"moved to path {path.path_id}")
+    
+    def _release_elephant(self, datapath, key, fields=None):
+        """Return a former elephant to the default path"""
+        dpid = datapath.id
+        route = self.elephant_routes.pop((dpid, key), None)
+        if route is None:
+            return
+        
+        path_id, rate = route
+        self.elephant_load[path_id] = max(0.0, self.elephant_load[path_id] - rate)
+        
+        if fields is not None:
+            ofproto = datapath.ofproto
+            parser = datapath.ofproto_parser
+            mod = parser.OFPFlowMod(datapath=datapath,
+                                    command=ofproto.OFPFC_DELETE_STRICT,
+                                    priority=ELEPHANT_PRIORITY,
+                                    cookie=ELEPHANT_COOKIE,
+                                    cookie_mask=0xFFFFFFFFFFFFFFFF,
+                                    out_port=ofproto.OFPP_ANY,
+                                    out_group=ofproto.OFPG_ANY,
+                                    match=parser.OFPMatch(**fields))
+            datapath.send_msg(mod)
+        
+        logger.info(f"Elephant flow on switch {dpid} returned to default path")
+    
+    @set_ev_cls(ofp_event.EventOFPPortDescStatsReply, MAIN_DISPATCHER)
+    def port_desc_stats_reply_handler(self, ev):
+        """Register switch ports and probe them for neighbours"""
+        datapath = ev.msg.datapath
+        ports = self.ports.setdefault(datapath.id, {})
+        
+        for port in ev.msg.body:
+            name = port.name.decode() if isinstance(port.name, bytes) else port.name
+            if port.port_no == datapath.ofproto.OFPP_LOCAL:
+                self.bridge_names[datapath.id] = name
+                self._register_site_bridge(datapath.id, name)
+            if port.port_no > datapath.ofproto.OFPP_MAX:
+                continue  # LOCAL / reserved ports
+            ports[port.port_no] = (port.hw_addr, name)
+            self._send_lldp(datapath, port.port_no)
+    
+    @set_ev_cls(ofp_event.EventOFPPortStatus, MAIN_DISPATCHER)
+    def port_status_handler(self, ev):
+        """Track port additions, removals and link state changes"""
+        msg = ev.msg
+        datapath = msg.datapath
+        ofproto = datapath.ofproto
+        port = msg.desc
+        dpid = datapath.id
+        
+        if port.port_no > ofproto.OFPP_MAX:
+            return
+        
+        link_down = bool(port.state & ofproto.OFPPS_LINK_DOWN)
+        if msg.reason == ofproto.OFPPR_DELETE or link_down:
+            self.ports.get(dpid, {}).pop(port.port_no, None)
+            self._remove_links_on_port(dpid, port.port_no)
+        else:
+            name = port.name.decode() if isinstance(port.name, bytes) else port.name
+            self.ports.setdefault(dpid, {})[port.port_no] = (port.hw_addr, name)
+            self._send_lldp(datapath, port.port_no)
+    
+    def _send_lldp(self, datapath, port_no):
+        """Send an LLDP probe identifying (dpid, port) out of a port"""
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        hw_addr = self.ports.get(datapath.id, {}).get(port_no, ('00:00:00:00:00:00',))[0]
+        
+        pkt = packet.Packet()
+        pkt.add_protocol(ethernet.ethernet(dst=lldp.LLDP_MAC_NEAREST_BRIDGE,
+                                           src=hw_addr,
+                                           ethertype=ether_types.ETH_TYPE_LLDP))
+        tlvs = (
+            lldp.ChassisID(subtype=lldp.ChassisID.SUB_LOCALLY_ASSIGNED,
+                           chassis_id=f"dpid:{datapath.id:016x}".encode()),
+            lldp.PortID(subtype=lldp.PortID.SUB_PORT_COMPONENT,
+                        port_id=struct.pack('!I', port_no)),
+            lldp.TTL(ttl=LLDP_LINK_TIMEOUT),
+            lldp.End()
+        )
+        pkt.add_protocol(lldp.lldp(tlvs))
+        pkt.serialize()
+        
+        actions = [parser.OFPActionOutput(port_no)]
+        out = parser.OFPPacketOut(datapath=datapath, buffer_id=ofproto.OFP_NO_BUFFER,
+                                  in_port=ofproto.OFPP_CONTROLLER, actions=actions,
+                                  data=pkt.data)
+        datapath.send_msg(out)
+    
+    def _handle_lldp(self, dpid, in_port, pkt):
+        """Record the link an LLDP probe of ours travelled over"""
+        lldp_pkt = pkt.get_protocol(lldp.lldp)
+        if not lldp_pkt or len(lldp_pkt.tlvs) < 2:
+            return
+        
+        chassis_id = lldp_pkt.tlvs[0].chassis_id
+        port_id = lldp_pkt.tlvs[1].port_id
+        if not chassis_id.startswith(b'dpid:') or len(port_id) != 4:
+            return  # Foreign LLDP speaker
+        
+        src_dpid = int(chassis_id[5:], 16)
+        src_port = struct.unpack('!I', port_id)[0]
+        
+        self.link_seen[(src_dpid, src_port)] = time.time()
+        if self.topology.add_link(src_dpid, src_port, dpid, in_port):
+            logger.info(f"Link discovered: {src_dpid}:{src_port} -> {dpid}:{in_port}")
+            self._refresh_paths()
+    
+    def _remove_links_on_port(self, dpid, port_no):
+        """Forget links leaving or entering a port"""
+        changed = self.topology.remove_link(dpid, port_no)
+        self.link_seen.pop((dpid, port_no), None)
+        
+        for src, ports in list(self.topology.links.items()):
+            for src_port, (dst, dst_port, _) in list(ports.items()):
+                if dst == dpid and dst_port == port_no:
+                    changed |= self.topology.remove_link(src, src_port)
+                    self.link_seen.pop((src, src_port), None)
+        
+        if changed:
+            logger.warning(f"Link lost on {dpid}:{port_no}")
+            self._refresh_paths()
+    
+    def _lldp_loop(self):
+        """Periodic LLDP probing and link expiry"""
+        while True:
+            for dpid, datapath in list(self.datapaths.items()):
+                for port_no in list(self.ports.get(dpid, {})):
+                    self._send_lldp(datapath, port_no)
+            
+            now = time.time()
+            expired = [l for l, seen in self.link_seen.items()
+                       if now - seen > LLDP_LINK_TIMEOUT]
+            for src, port in expired:
+                del self.link_seen[(src, port)]
+                self.topology.remove_link(src, port)
+                logger.warning(f"Link expired: {src}:{port}")
+            if expired:
+                self._refresh_paths()
+            
+            hub.sleep(LLDP_INTERVAL)
+    
+    def load_sites(self, sites):
+        """Bulk (re)load site subnets: {site: [prefix, ...]}"""
+        self.sites = {site: list(prefixes) for site, prefixes in sites.items()}
+        self.site_prefixes.load(
+            (prefix, site) for site, prefixes in self.sites.items() for prefix in prefixes
+        )
+        logger.info(f"Site index loaded: {len(self.site_prefixes)} prefixes, "
+                    f"{len(self.sites)} sites")
+    
+    def _register_site_bridge(self, dpid, bridge_name):
+        """Map a site to its bridge DPID from the bridge's LOCAL port name"""
+        if not bridge_name.startswith('br-'):
+            return
+        site = bridge_name[3:]
+        if site in self.sites and self.site_dpids.get(site) != dpid:
+            self.site_dpids[site] = dpid
+            logger.info(f"Site {site} attached to switch {dpid}")
+            self._refresh_paths()
+    
+    def resolve_destination(self, dpid, dst_ip):
+        """
+        Resolve a destination IP seen on switch dpid to
+        (site, egress_dpid, candidate_paths), or None if no site owns it.
+        """
+        site = self.site_prefixes.lookup(dst_ip)
+        if site is None:
+            return None
+        egress_dpid = self.site_dpids.get(site)
+        if egress_dpid is None or egress_dpid == dpid:
+            return site, egress_dpid, []
+        return site, egress_dpid, self.paths.get((dpid, egress_dpid), [])
+    
+    def _path_endpoints(self):
+        """Switches between which candidate paths are maintained"""
+        site_dpids = [d for d in self.site_dpids.values() if d in self.datapaths]
+        return site_dpids or list(self.datapaths)
+    
+    def _tunnel_type(self, dpid, port_no):
+        """'gre' / 'vxlan' for tunnel ports, None otherwise"""
+        name = self.ports.get(dpid, {}).get(port_no, (None, ''))[1].lower()
+        for kind in ('gre', 'vxlan'):
+            if name.startswith(kind) or f"-{kind}" in name:
+                return kind
+        return None
+    
+    def _refresh_paths(self):
+        """Rebuild PathMetrics from the (cached) k-shortest paths"""
+        endpoints = self._path_endpoints()
+        paths = defaultdict(list)
+        
+        for src in endpoints:
+            for dst in endpoints:
+                if src == dst:
+                    continue
+                
+                # Keep measured metrics of paths that survive the change
+                existing = {p.path_id: p for p in self.paths.get((src, dst), [])}
+                for path in self.topology.k_shortest_paths(src, dst):
+                    metrics = existing.get(path.path_id)
+                    if metrics is None:
+                        tunnel = next((t for t in (self._tunnel_type(u, port)
+                                                   for u, port, _ in path.hops) if t), None)
+                        metrics = PathMetrics(path.path_id, port_no=path.hops[0][1],
+                                              dpids=path.dpids, tunnel=tunnel)
+                    paths[(src, dst)].append(metrics)
+        
+        self.paths = paths
     
     @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
     def port_stats_reply_handler(self, ev):
-        """Handle port statistics reply"""
-        ports = []
+        """Measure the egress rate of each port from successive tx_bytes"""
+        dpid = ev.msg.datapath.id
+        now = time.time()
         for stat in ev.msg.body:
-            ports.append({
-                'port_no': stat.port_no,
-                'rx_packets': stat.rx_packets,
-                'tx_packets': stat.tx_packets,
-                'rx_bytes': stat.rx_bytes,
-                'tx_bytes': stat.tx_bytes,
-                'rx_errors': stat.rx_errors,
-                'tx_errors': stat.tx_errors
-            })
+            key = (dpid, stat.port_no)
+            previous = self.port_tx.get(key)
+            self.port_tx[key] = (stat.tx_bytes, now)
+            if previous and now > previous[1] and stat.tx_bytes >= previous[0]:
+                self.port_rates[key] = (stat.tx_bytes - previous[0]) * 8 / (now - previous[1]) / 1e6
+        
+        # Once the monitor feeds measurements, usage is measured too
+        if self.metrics_feed.stats['received']:
+            for path in self._paths_from(dpid):
+                rate = self.port_rates.get((dpid, path.port_no))
+                if rate is not None:
+                    path.update_metrics(bandwidth=rate)
     
     def _monitor_loop(self):
         """Continuous monitoring loop"""
@@ -392,7 +927,7 @@ class SDWANController(app_manager.RyuApp):
             for dpid, datapath in list(self.datapaths.items()):
                 self._request_stats(datapath)
             
-            # Update path metrics (simulated for demo)
+            # Update path metrics (simulated until the monitor feeds measurements)
             self._update_path_metrics()
             
             hub.sleep(10)
@@ -403,8 +938,50 @@ class SDWANController(app_manager.RyuApp):
             hub.sleep(30)
             self._optimize_paths()
     
+    def _feed_loop(self):
+        """Apply monitor measurements as they arrive, then re-evaluate paths"""
+        while True:
+            hub.sleep(FEED_POLL_INTERVAL)
+            applied = sum(self._apply_link_sample(sample) for sample in self.metrics_feed.poll())
+            if applied:
+                self._optimize_paths()
+    
+    def _apply_link_sample(self, sample):
+        """
+        Update the paths of a monitored site pair ('site1->site2', or
+        'site1->site2/gre' for one tunnel). Returns the number of paths updated.
+        """
+        link, _, tunnel = sample.link_id.partition('/')
+        src_site, _, dst_site = link.partition('->')
+        src = self.site_dpids.get(src_site)
+        dst = self.site_dpids.get(dst_site)
+        if src is None or dst is None:
+            return 0
+        
+        paths = self.paths.get((src, dst), [])
+        if tunnel:
+            self.tunnel_measured[(src, dst, tunnel)] = sample.timestamp
+            targets = [p for p in paths if p.tunnel == tunnel]
+        else:
+            # Site-level probes cover the paths without a fresher per-tunnel sample
+            targets = [p for p in paths
+                       if p.tunnel is None or sample.timestamp - self.tunnel_measured.get(
+                           (src, dst, p.tunnel), 0) > MAX_SAMPLE_AGE]
+        
+        for path in targets:
+            if sample.bandwidth:
+                # iperf3 measures achievable capacity, not current usage
+                path.bandwidth_total = sample.bandwidth
+            # Usage comes from port counters, replacing any simulated value
+            path.update_metrics(latency=sample.latency, loss=sample.loss,
+                                bandwidth=self.port_rates.get((src, path.port_no), 0.0))
+        return len(targets)
+    
     def _update_path_metrics(self):
         """Update metrics for all paths"""
+        if self.metrics_feed.stats['received']:
+            return  # Measured by the monitor, see _feed_loop
+        
         # Simulated metric updates
         import random
         for path_list in self.paths.values():
@@ -421,16 +998,12 @@ class SDWANController(app_manager.RyuApp):
         logger.info("Running path optimization...")
         optimized = 0
         
+        # Expired flows are removed by flow_removed_handler
         for flow_id, flow in list(self.flows.items()):
-            if time.time() - flow.last_seen > 120:
-                # Remove stale flows
-                del self.flows[flow_id]
-                continue
-            
             # Check if better path available
             current_path = flow.current_path
             if current_path:
-                best_path = self._select_best_path(0, flow.priority)
+                best_path = self._select_best_path(flow.dpid, flow.priority, flow.dst_dpid)
                 if best_path and best_path.path_id != current_path:
                     flow.current_path = best_path.path_id
                     optimized += 1
@@ -439,21 +1012,69 @@ class SDWANController(app_manager.RyuApp):
             logger.info(f"Optimized {optimized} flows")
             self.stats['path_switches'] += optimized
     
+    def _state_server(self):
+        """Serve get_state() as line-delimited JSON to local readers"""
+        try:
+            server = hub.StreamServer(parse_address(STATE_ADDR), self._state_connection)
+        except OSError as e:
+            logger.warning(f"State server not started on {STATE_ADDR}: {e}")
+            return
+        logger.info(f"State server listening on {STATE_ADDR}")
+        server.serve_forever()
+    
+    def _state_connection(self, sock, address):
+        serve_connection(sock, self.get_state)
+    
+    def get_state(self):
+        """Datapaths, path metrics, active flows per class and counters, as plain JSON data"""
+        rules = defaultdict(int)
+        for rule_key in self.flow_rules:
+            rules[rule_key[0]] += 1
+        sites = {dpid: site for site, dpid in self.site_dpids.items()}
+        # One count per flow, however many switches it crosses
+        flows = {flow_id: flow for (_, flow_id), flow in self.flows.items()}
+        by_class = {name: 0 for name in FLOW_CLASSES.values()}
+        for flow in flows.values():
+            by_class[FLOW_CLASSES.get(flow.priority, 'normal')] += 1
+        
+        paths = []
+        for (src, dst), path_list in self.paths.items():
+            for path in path_list:
+                entry = path.to_dict()
+                entry['last_update'] = path.last_update
+                entry.update(src=src, dst=dst, src_site=sites.get(src), dst_site=sites.get(dst))
+                paths.append(entry)
+        
+        return {
+            'timestamp': time.time(),
+            'uptime_seconds': time.time() - self.started_at,
+            'datapaths': [{'dpid': dpid, 'name': self.bridge_names.get(dpid), 'site': sites.get(dpid),
+                           'ports': len(self.ports.get(dpid, {})), 'rules': rules[dpid]}
+                          for dpid in sorted(self.datapaths)],
+            'paths': paths,
+            'flows': {'active': len(flows), 'by_class': by_class},
+            'stats': dict(self.stats, active_elephants=len(self.elephant_routes)),
+        }
+    
     def get_stats_summary(self):
         """Get controller statistics summary"""
         return {
             'controller': {
                 'uptime_seconds': time.time(),
                 'connected_switches': len(self.datapaths),
-                'active_flows': len(self.flows),
+                'active_flows': len({flow_id for _, flow_id in self.flows}),
                 'total_flows_installed': self.stats['total_flows'],
                 'path_switches': self.stats['path_switches'],
                 'failovers': self.stats['failovers'],
-                'packets_forwarded': self.stats['packets_forwarded']
+                'flows_expired': self.stats['flows_expired'],
+                'packets_forwarded': self.stats['packets_forwarded'],
+                'elephant_reroutes': self.stats['elephant_reroutes'],
+                'active_elephants': len(self.elephant_routes),
+                'metrics_feed': dict(self.metrics_feed.stats)
             },
             'paths': {
-                path_key: [p.to_dict() for p in path_list]
-                for path_key, path_list in self.paths.items()
+                f"{src}->{dst}": [p.to_dict() for p in path_list]
+                for (src, dst), path_list in self.paths.items()
             },
             'timestamp': datetime.now().isoformat()
         }
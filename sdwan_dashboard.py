@@ -4,19 +4,141 @@ SD-WAN Real-time Dashboard
 Visual monitoring of network status, flows, and performance
 """
 
+import argparse
+import os
 import subprocess
-import sys
+import threading
 import time
 import curses
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from collections import defaultdict
 
-class SDWANDashboard:
+from sdwan_prober import ProberPool
+from sdwan_inventory import DEFAULT_TEST_PAIRS, TopologyInventory, link_label
+from sdwan_sketch import SketchStore
+from sdwan_screen import FILL, ListView, Panel, Screen
+from sdwan_ovsdb import OpenFlowStats, OVSDBClient
+from sdwan_history import WINDOWS, HistoryStore, band, sparkline
+from sdwan_web import DEFAULT_HOST, DEFAULT_PORT, DashboardHTTPServer, StateCache
+
+FRAME_INTERVAL = 0.25  # Render cadence; data comes from the collectors
+
+# Collector cadences (seconds)
+CONTROLLER_INTERVAL = 2
+OVS_INTERVAL = 5
+TOPOLOGY_INTERVAL = 10
+LINK_WORKERS = 8  # Links pinged in parallel
+
+TOP_N = 5  # Worst links panel
+OVS_BRIDGE_ROWS = 2  # Rows of 'bridge: flows' entries before '+N more'
+ALL_BRIDGES = '*'  # History key of the flow count summed over bridges
+TREND_BRIDGES = 3  # Busiest bridges trended when the selected link maps to none
+
+
+def link_score(result):
+    """Health score 0-100 of a probe result (as in the monitor); unreachable is 0"""
+    if not result['success']:
+        return 0.0
+    latency_score = max(0, 100 - result['latency'] / 2)
+    loss_score = max(0, 100 - result['loss'] * 10)
+    return latency_score * 0.5 + loss_score * 0.5
+
+
+def _joined(items, room):
+    """'a, b, c' cut to room characters with a '+N more' tail"""
+    text = ''
+    for count, item in enumerate(items):
+        candidate = f"{text}, {item}" if text else item
+        rest = len(items) - count - 1
+        if len(candidate) + (len(f" +{rest} more") if rest else 0) > room:
+            return f"{text} +{len(items) - count} more"
+        text = candidate
+    return text
+
+
+class DashboardSnapshot:
+    """
+    Latest data of each collector: section -> (version, changed_at, data).
+    Republishing equal data keeps the version, so nothing downstream redraws.
+    """
     def __init__(self):
+        self.lock = threading.Lock()
+        self.sections = {}
+    
+    def publish(self, section, data):
+        with self.lock:
+            previous = self.sections.get(section)
+            if previous is not None and previous[2] == data:
+                return
+            version = previous[0] + 1 if previous else 1
+            self.sections[section] = (version, time.time(), data)
+    
+    def read(self):
+        """Consistent copy of all sections (the data itself is never mutated)"""
+        with self.lock:
+            return dict(self.sections)
+
+
+class Collector(threading.Thread):
+    """Calls collect() every interval seconds and publishes the result"""
+    def __init__(self, section, collect, interval, snapshot, stop):
+        super().__init__(daemon=True, name=f"collect-{section}")
+        self.section = section
+        self.collect = collect
+        self.interval = interval
+        self.snapshot = snapshot
+        self.stop = stop
+    
+    def run(self):
+        while not self.stop.is_set():
+            started = time.monotonic()
+            try:
+                self.snapshot.publish(self.section, self.collect())
+            except Exception:
+                pass  # Keep the previous data; retried next interval
+            self.stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class SDWANDashboard:
+    def __init__(self, native=False):
         self.refresh_interval = 2
         
+        # In-process probers (no ping fork per measurement)
+        self.prober_pool = ProberPool() if native else None
+        
+        # Discovered sites -> full-mesh list of links to test
+        self.inventory = TopologyInventory()
+        
+        # RTT quantile sketches per link, one per minute over the last 15 minutes
+        self.latency_sketches = SketchStore(bucket_seconds=60, buckets=15)
+        
+        # Bucketed latency / loss / flow-count history for the trend sparklines
+        self.history = HistoryStore()
+        self.window = '1m'  # Trend window, cycled with 'w'
+        
+        # Links sorted worst first, filtered by text; re-sorted only on new data
+        self.link_view = ListView()
+        self.link_filter = ''
+        self.filter_editing = False
+        self.worst_links = []
+        self._view_key = None
+        
+        # Background collectors publish here; the render loop only reads
+        self.snapshot = DashboardSnapshot()
+        self.stop = threading.Event()
+        self.collectors = []
+        self.link_executor = None
+        
+        # Pushed OVSDB replica and OpenFlow table stats; ovs-vsctl/ovs-ofctl as fallback
+        self.ovsdb = OVSDBClient()
+        self.openflow = OpenFlowStats()
+        
     def get_ovs_status(self):
         """Get OVS bridge and port status"""
+        if self.ovsdb.connected:
+            return {'connected': True, 'bridges': self.ovsdb.bridges()}
+        
         try:
             result = subprocess.run(['ovs-vsctl', 'show'], 
                                   capture_output=True, text=True)
@@ -50,6 +172,11 @@ class SDWANDashboard:
     
     def get_flow_stats(self, bridge):
         """Get flow statistics from bridge"""
+        try:
+            return self.openflow.flow_count(bridge)
+        except OSError:
+            pass  # No management socket access: dump the flows
+        
         try:
             result = subprocess.run(['ovs-ofctl', 'dump-flows', bridge, '-O', 'OpenFlow13'],
                                   capture_output=True, text=True)
@@ -63,6 +190,18 @@ class SDWANDashboard:
     
     def ping_test_quick(self, source_ns, target_ip):
         """Quick ping test"""
+        if self.prober_pool:
+            try:
+                result = self.prober_pool.ping(source_ns, target_ip, count=3,
+                                               interval=0.2, timeout=1.0)
+                if result['success']:
+                    return {'success': True, 'latency': result['latency_ms'],
+                            'loss': result['packet_loss_percent'],
+                            'rtts': [r for r in result['rtts'] if r is not None]}
+                return {'success': False}
+            except OSError:
+                pass  # No namespace access: fall back to ping
+        
         try:
             result = subprocess.run(
                 ['ip', 'netns', 'exec', source_ns, 'ping', '-c', '3', '-W', '1', target_ip],
@@ -95,11 +234,69 @@ class SDWANDashboard:
             pass
         return 0
     
+    def collect_ovs(self):
+        """Bridges and their flow counts"""
+        ovs = self.get_ovs_status()
+        ovs['flows'] = {bridge: self.get_flow_stats(bridge) for bridge in ovs['bridges']}
+        now = time.time()
+        for bridge, flows in ovs['flows'].items():
+            self.history.add(bridge, 'flows', flows, now)
+        if ovs['connected']:
+            self.history.add(ALL_BRIDGES, 'flows', sum(ovs['flows'].values()), now)
+        return ovs
+    
+    def collect_topology(self):
+        """Namespace count and discovered sites [(name, subnet)]"""
+        self.inventory.refresh()
+        return {'namespaces': self.get_namespace_count(),
+                'sites': [(site.name, site.subnet) for site in self.inventory.sites.values()]}
+    
+    def collect_links(self):
+        """Ping every link in parallel: [(link_id, label, result)]"""
+        test_pairs = self.inventory.probe_matrix() or DEFAULT_TEST_PAIRS
+        results = self.link_executor.map(
+            lambda pair: self.ping_test_quick(pair[0], pair[1]), test_pairs)
+        
+        links = []
+        now = time.time()
+        for (source_ns, target_ip, link_id), result in zip(test_pairs, results):
+            if result['success']:
+                self.latency_sketches.extend(link_id, result.get('rtts') or [result['latency']])
+                result['p50'], result['p99'] = \
+                    self.latency_sketches.window(link_id).quantiles((0.5, 0.99))
+                self.history.add(link_id, 'latency', result['latency'], now)
+            self.history.add(link_id, 'loss', result['loss'] if result['success'] else 100.0, now)
+            links.append((link_id, link_label(link_id), result))
+        return links
+    
+    def start_collectors(self):
+        self.ovsdb.start()
+        self.link_executor = ThreadPoolExecutor(max_workers=LINK_WORKERS,
+                                                thread_name_prefix='link-ping')
+        for section, collect, interval in (
+                ('controller', self.get_controller_status, CONTROLLER_INTERVAL),
+                ('ovs', self.collect_ovs, OVS_INTERVAL),
+                ('topology', self.collect_topology, TOPOLOGY_INTERVAL),
+                ('links', self.collect_links, self.refresh_interval)):
+            collector = Collector(section, collect, interval, self.snapshot, self.stop)
+            collector.start()
+            self.collectors.append(collector)
+    
+    def stop_collectors(self):
+        self.stop.set()
+        self.ovsdb.close()
+        self.openflow.close()
+        if self.link_executor:
+            self.link_executor.shutdown(wait=False, cancel_futures=True)
+        if self.prober_pool:
+            self.prober_pool.close()
+    
     def draw_dashboard(self, stdscr):
         """Draw the dashboard"""
         curses.curs_set(0)
         stdscr.nodelay(1)
-        stdscr.timeout(100)
+        # getch() waits at most one frame: keys are handled at the frame rate
+        stdscr.timeout(int(FRAME_INTERVAL * 1000))
         
         # Initialize colors
         curses.start_color()
@@ -109,134 +306,292 @@ class SDWANDashboard:
         curses.init_pair(4, curses.COLOR_CYAN, curses.COLOR_BLACK)
         curses.init_pair(5, curses.COLOR_MAGENTA, curses.COLOR_BLACK)
         
+        # Paint stdscr once so getch() never refreshes it over the panels
+        stdscr.refresh()
+        screen = Screen(stdscr)
+        panels = {name: Panel(name) for name in
+                  ('header', 'controller', 'ovs', 'topology', 'worst', 'links', 'trends',
+                   'legend', 'footer')}
+        
         while True:
-            stdscr.clear()
-            height, width = stdscr.getmaxyx()
-            
-            # Title
-            title = "SD-WAN REAL-TIME DASHBOARD"
-            stdscr.addstr(0, (width - len(title)) // 2, title, 
-                         curses.A_BOLD | curses.color_pair(4))
-            
+            sections = self.snapshot.read()
+            width = stdscr.getmaxyx()[1]
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            stdscr.addstr(1, (width - len(current_time)) // 2, current_time)
-            
-            stdscr.addstr(2, 0, "═" * width, curses.color_pair(4))
-            
-            row = 4
-            
-            # Controller Status
-            stdscr.addstr(row, 2, "SDN CONTROLLER STATUS:", curses.A_BOLD)
-            row += 1
-            
-            controller = self.get_controller_status()
-            if controller['running']:
-                stdscr.addstr(row, 4, "● Status: RUNNING", curses.color_pair(1))
-                stdscr.addstr(row, 30, f"PID: {controller['pid']}")
-            else:
-                stdscr.addstr(row, 4, "● Status: NOT RUNNING", curses.color_pair(2))
-            
-            row += 2
-            
-            # OVS Status
-            stdscr.addstr(row, 2, "OPENVSWITCH STATUS:", curses.A_BOLD)
-            row += 1
+            links_version = self._version(sections, 'links')
+            self._sync_link_view(links_version, self._section(sections, 'links'))
+            view = self.link_view
             
-            ovs = self.get_ovs_status()
-            if ovs['connected']:
-                stdscr.addstr(row, 4, f"● Bridges: {len(ovs['bridges'])}", 
-                            curses.color_pair(1))
-                row += 1
-                for bridge in ovs['bridges'][:4]:
-                    flows = self.get_flow_stats(bridge)
-                    stdscr.addstr(row, 6, f"├─ {bridge}: {flows} flows")
-                    row += 1
-            else:
-                stdscr.addstr(row, 4, "● Status: DISCONNECTED", curses.color_pair(2))
-                row += 1
-            
-            row += 1
-            
-            # Network Topology
-            stdscr.addstr(row, 2, "NETWORK TOPOLOGY:", curses.A_BOLD)
-            row += 1
-            
-            ns_count = self.get_namespace_count()
-            stdscr.addstr(row, 4, f"● Namespaces: {ns_count}")
-            row += 1
-            stdscr.addstr(row, 4, f"● Sites: 3 (site1, site2, site3)")
-            row += 1
-            stdscr.addstr(row, 4, f"● Subnets: 10.1.0.0/24, 10.2.0.0/24, 10.3.0.0/24")
-            
-            row += 2
-            
-            # Link Status
-            stdscr.addstr(row, 2, "INTER-SITE CONNECTIVITY:", curses.A_BOLD)
-            row += 1
-            
-            # Test links
-            test_pairs = [
-                ('s1h1', '10.2.0.11', 'Site1 → Site2'),
-                ('s1h1', '10.3.0.11', 'Site1 → Site3'),
-                ('s2h1', '10.3.0.11', 'Site2 → Site3'),
-            ]
-            
-            for source_ns, target_ip, label in test_pairs:
-                result = self.ping_test_quick(source_ns, target_ip)
-                
-                if result['success']:
-                    latency = result['latency']
-                    loss = result['loss']
-                    
-                    if latency < 50 and loss < 1:
-                        status_color = curses.color_pair(1)  # Green
-                        status_symbol = "●"
-                    elif latency < 100 and loss < 5:
-                        status_color = curses.color_pair(3)  # Yellow
-                        status_symbol = "●"
-                    else:
-                        status_color = curses.color_pair(2)  # Red
-                        status_symbol = "●"
-                    
-                    stdscr.addstr(row, 4, status_symbol, status_color)
-                    stdscr.addstr(row, 6, f"{label:20s}")
-                    stdscr.addstr(row, 28, f"Latency: {latency:6.2f}ms  Loss: {loss:4.1f}%")
-                else:
-                    stdscr.addstr(row, 4, "●", curses.color_pair(2))
-                    stdscr.addstr(row, 6, f"{label:20s}")
-                    stdscr.addstr(row, 28, "UNREACHABLE", curses.color_pair(2))
-                
-                row += 1
-            
-            row += 2
-            
-            # Legend
-            stdscr.addstr(row, 2, "LEGEND:", curses.A_BOLD)
-            row += 1
-            stdscr.addstr(row, 4, "● Excellent (<50ms, <1% loss)", curses.color_pair(1))
-            row += 1
-            stdscr.addstr(row, 4, "● Good (<100ms, <5% loss)", curses.color_pair(3))
-            row += 1
-            stdscr.addstr(row, 4, "● Poor (>100ms or >5% loss)", curses.color_pair(2))
+            # Versions: a panel is rebuilt only when its section was republished
+            screen.frame([
+                (panels['header'], None, (current_time, width),
+                 lambda: self._header_rows(current_time, width)),
+                (panels['controller'], None, self._version(sections, 'controller'),
+                 lambda: self._controller_rows(self._section(sections, 'controller'))),
+                (panels['ovs'], None, (self._version(sections, 'ovs'), width),
+                 lambda: self._ovs_rows(self._section(sections, 'ovs'), width)),
+                (panels['topology'], None, (self._version(sections, 'topology'), width),
+                 lambda: self._topology_rows(self._section(sections, 'topology'), width)),
+                (panels['worst'], None, links_version, self._worst_rows),
+                # Only the visible page is built: cost does not grow with the mesh
+                (panels['links'], FILL,
+                 (links_version, self.link_filter, self.filter_editing, view.offset, view.cursor),
+                 lambda: self._link_rows(panels['links'].height, links_version)),
+                # Trends change when a sample arrives or the window rolls a bucket
+                (panels['trends'], None,
+                 (links_version, self._version(sections, 'ovs'), view.cursor,
+                  self.window, self.history.bucket(self.window)),
+                 lambda: self._trend_rows(self._section(sections, 'ovs'))),
+                (panels['legend'], None, 1, self._legend_rows),
+            ], footer=[
+                (panels['footer'], 2, (width, self.window), lambda: self._footer_rows(width)),
+            ])
             
-            # Footer
-            footer_row = height - 2
-            stdscr.addstr(footer_row, 0, "─" * width, curses.color_pair(4))
-            footer = "Press 'q' to quit | Refreshing every 2 seconds"
-            stdscr.addstr(footer_row + 1, (width - len(footer)) // 2, footer, 
-                         curses.color_pair(3))
-            
-            stdscr.refresh()
-            
-            # Check for quit
             key = stdscr.getch()
-            if key == ord('q') or key == ord('Q'):
+            if key == -1:
+                continue
+            if self.filter_editing:
+                self._edit_filter(key)
+            elif key == ord('q') or key == ord('Q'):
                 break
-            
-            time.sleep(self.refresh_interval)
+            elif key == ord('w') or key == ord('W'):
+                names = list(WINDOWS)
+                self.window = names[(names.index(self.window) + 1) % len(names)]
+            elif key == ord('/'):
+                self.filter_editing = True
+            elif key == 27:  # Esc
+                self.link_filter = ''
+            elif key == curses.KEY_RESIZE:
+                screen.resize()
+            else:
+                self.link_view.key(key)
+    
+    def _edit_filter(self, key):
+        """Keys while typing the filter: Enter keeps it, Esc clears it"""
+        if key in (curses.KEY_ENTER, 10, 13):
+            self.filter_editing = False
+        elif key == 27:
+            self.link_filter = ''
+            self.filter_editing = False
+        elif key in (curses.KEY_BACKSPACE, 127, 8):
+            self.link_filter = self.link_filter[:-1]
+        elif 32 <= key < 127:
+            self.link_filter += chr(key)
+    
+    def _sync_link_view(self, version, links):
+        """Sort (worst first) and filter only when the data or the filter changed"""
+        if (version, self.link_filter) == self._view_key:
+            return
+        self._view_key = (version, self.link_filter)
+        links = links or []
+        ranked = sorted(links, key=lambda link: (link_score(link[2]), link[1]))
+        self.worst_links = ranked[:TOP_N] if len(links) > TOP_N else []
+        needle = self.link_filter.lower()
+        if needle:
+            ranked = [link for link in ranked
+                      if needle in link[0].lower() or needle in link[1].lower()]
+        self.link_view.set_items(ranked)
+    
+    def _header_rows(self, current_time, width):
+        title = "SD-WAN REAL-TIME DASHBOARD"
+        return [
+            [((width - len(title)) // 2, title, curses.A_BOLD | curses.color_pair(4))],
+            [((width - len(current_time)) // 2, current_time, 0)],
+            [(0, "═" * width, curses.color_pair(4))],
+            [],
+        ]
+    
+    def _controller_rows(self, controller):
+        rows = [[(2, "SDN CONTROLLER STATUS:", curses.A_BOLD)]]
+        if controller is None:
+            rows.append([(4, "● Status: collecting...", curses.color_pair(3))])
+        elif controller['running']:
+            rows.append([(4, "● Status: RUNNING", curses.color_pair(1)),
+                         (30, f"PID: {controller['pid']}", 0)])
+        else:
+            rows.append([(4, "● Status: NOT RUNNING", curses.color_pair(2))])
+        rows.append([])
+        return rows
+    
+    def _ovs_rows(self, ovs, width):
+        rows = [[(2, "OPENVSWITCH STATUS:", curses.A_BOLD)]]
+        if ovs is None:
+            rows.append([(4, "● Status: collecting...", curses.color_pair(3))])
+        elif ovs['connected']:
+            total = sum(ovs['flows'].values())
+            rows.append([(4, f"● Bridges: {len(ovs['bridges'])}  Flows: {total}",
+                          curses.color_pair(1))])
+            # Bridges packed several per row; the rest summarized
+            entries = [f"{bridge}: {ovs['flows'].get(bridge, 0)}" for bridge in ovs['bridges']]
+            room = max(20, width - 18)  # Leaves space for the '+N more' tail
+            lines = ['']
+            for index, entry in enumerate(entries):
+                if lines[-1] and len(lines[-1]) + len(entry) + 2 > room:
+                    if len(lines) == OVS_BRIDGE_ROWS:
+                        lines[-1] += f"  +{len(entries) - index} more"
+                        break
+                    lines.append('')
+                lines[-1] = f"{lines[-1]}  {entry}" if lines[-1] else entry
+            rows.extend([(6, line, 0)] for line in lines if line)
+        else:
+            rows.append([(4, "● Status: DISCONNECTED", curses.color_pair(2))])
+        rows.append([])
+        return rows
+    
+    def _topology_rows(self, topology, width):
+        if topology is None:
+            return [[(2, "NETWORK TOPOLOGY:", curses.A_BOLD)],
+                    [(4, "● Namespaces: ...", 0)], []]
+        sites = topology['sites']
+        room = max(20, width - 24)
+        return [
+            [(2, "NETWORK TOPOLOGY:", curses.A_BOLD)],
+            [(4, f"● Namespaces: {topology['namespaces']}", 0)],
+            [(4, f"● Sites: {len(sites)} ({_joined([name for name, _ in sites], room)})", 0)],
+            [(4, f"● Subnets: {_joined([subnet for _, subnet in sites], room)}", 0)],
+            [],
+        ]
+    
+    def _link_row(self, label, result, attr=0):
+        if not result['success']:
+            return [(4, "●", curses.color_pair(2)), (6, f"{label:20s}", attr),
+                    (28, "UNREACHABLE", curses.color_pair(2))]
+        
+        latency = result['latency']
+        loss = result['loss']
+        if latency < 50 and loss < 1:
+            status_color = curses.color_pair(1)  # Green
+        elif latency < 100 and loss < 5:
+            status_color = curses.color_pair(3)  # Yellow
+        else:
+            status_color = curses.color_pair(2)  # Red
+        return [(4, "●", status_color), (6, f"{label:20s}", attr),
+                (28, f"Latency: {latency:6.2f}ms  Loss: {loss:4.1f}%  "
+                     f"p50/99: {result['p50']:.1f}/{result['p99']:.1f}", 0)]
+    
+    def _worst_rows(self):
+        if not self.worst_links:
+            return []  # Small mesh: the list itself shows every link
+        rows = [[(2, f"WORST LINKS (top {TOP_N}):", curses.A_BOLD)]]
+        for _, label, result in self.worst_links:
+            rows.append(self._link_row(label, result))
+        rows.append([])
+        return rows
+    
+    def _link_rows(self, height, version):
+        view = self.link_view
+        view.set_page(height - 2)  # Title and blank line
+        
+        title = f"INTER-SITE CONNECTIVITY ({len(view.items)} links, worst first"
+        if self.link_filter or self.filter_editing:
+            title += f", filter: {self.link_filter}{'_' if self.filter_editing else ''}"
+        if len(view.items) > view.page:
+            title += f", {view.offset + 1}-{min(len(view.items), view.offset + view.page)}"
+        rows = [[(2, title + "):", curses.A_BOLD)]]
+        
+        if not version:
+            rows.append([(4, "Probing links...", curses.color_pair(3))])
+        for index, (_, label, result) in view.visible():
+            rows.append(self._link_row(label, result,
+                                       curses.A_REVERSE if index == view.cursor else 0))
+        rows.append([])
+        return rows
+    
+    def _trend_rows(self, ovs):
+        """
+        Sparkline of bucket means plus the min-max band over the selected
+        window, for the link under the cursor, the flow count of its site
+        bridges (br-<site>) or of the busiest bridges, and the total
+        """
+        rows = [[(2, f"TRENDS ({self.window}):", curses.A_BOLD)]]
+        now = time.time()
+        
+        def trend(col_label, key, metric, unit, floor=None, digits=1):
+            series = self.history.series(key, metric, self.window, now)
+            low, high = band(series)
+            span = f"{low:.{digits}f}-{high:.{digits}f} {unit}" if low is not None else "no data"
+            return [(4, col_label, 0), (24, metric, curses.color_pair(4)),
+                    (33, sparkline(series, floor), curses.color_pair(1)), (65, span, 0)]
+        
+        selected = self.link_view.current()
+        link_id = None
+        if selected is not None:
+            link_id, label, _ = selected
+            rows.append(trend(f"{label:19s}", link_id, 'latency', 'ms'))
+            rows.append(trend('', link_id, 'loss', '%', floor=0.0))
+        if ovs and ovs['connected']:
+            for bridge in self._trend_bridges(ovs, link_id):
+                rows.append(trend(f"{bridge:19s}", bridge, 'flows', 'flows', digits=0))
+            rows.append(trend(f"{'All bridges':19s}", ALL_BRIDGES, 'flows', 'flows', digits=0))
+        rows.append([])
+        return rows
+    
+    @staticmethod
+    def _trend_bridges(ovs, link_id=None):
+        """Bridges of both ends of link_id, else the TREND_BRIDGES busiest"""
+        if link_id:
+            sites = link_id.partition('/')[0].split('->')
+            bridges = [f"br-{site}" for site in sites if f"br-{site}" in ovs['flows']]
+            if bridges:
+                return bridges
+        busiest = sorted(ovs['flows'].items(), key=lambda item: -item[1])
+        return [bridge for bridge, _ in busiest[:TREND_BRIDGES]]
+    
+    def _legend_rows(self):
+        return [
+            [(2, "LEGEND:", curses.A_BOLD),
+             (10, "● Excellent (<50ms, <1% loss)", curses.color_pair(1)),
+             (41, "● Good (<100ms, <5% loss)", curses.color_pair(3)),
+             (68, "● Poor (>100ms or >5% loss)", curses.color_pair(2))],
+        ]
+    
+    def _footer_rows(self, width):
+        footer = (f"'q' quit | ↑↓ PgUp PgDn scroll | '/' filter, Esc clear | "
+                  f"'w' trend window: {self.window} | probes every {self.refresh_interval}s")
+        return [
+            [(0, "─" * width, curses.color_pair(4))],
+            [((width - len(footer)) // 2, footer, curses.color_pair(3))],
+        ]
+    
+    @staticmethod
+    def _version(sections, name):
+        entry = sections.get(name)
+        return entry[0] if entry else 0
+    
+    @staticmethod
+    def _section(sections, name):
+        """Data of a snapshot section, None until first collected"""
+        entry = sections.get(name)
+        return entry[2] if entry else None
+    
+    def state_document(self, sections):
+        """Snapshot as JSON data for the web API, links worst first"""
+        document = {}
+        for name, (version, changed_at, data) in sections.items():
+            if name == 'links':
+                data = [dict({key: value for key, value in result.items() if key != 'rtts'},
+                             link=link_id, label=label, score=link_score(result))
+                        for link_id, label, result in
+                        sorted(data, key=lambda link: (link_score(link[2]), link[1]))]
+            document[name] = {'version': version, 'changed_at': changed_at, 'data': data}
+        return {'generated_at': time.time(), 'sections': document}
+    
+    def serve_web(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """HTTP mode: one set of collectors shared by every viewer"""
+        self.start_collectors()
+        server = DashboardHTTPServer((host, port), StateCache(self.snapshot, self.state_document))
+        print(f"Serving the dashboard on http://{host}:{port}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stop_collectors()
     
     def run(self):
         """Run the dashboard"""
+        self.start_collectors()
+        os.environ.setdefault('ESCDELAY', '25')  # Esc clears the filter without a 1 s lag
         try:
             curses.wrapper(self.draw_dashboard)
         except KeyboardInterrupt:
@@ -245,14 +600,28 @@ class SDWANDashboard:
             print(f"Error: {e}")
             import traceback
             traceback.print_exc()
+        finally:
+            self.stop_collectors()
 
 
 def main():
+    parser = argparse.ArgumentParser(description='SD-WAN real-time dashboard')
+    parser.add_argument('--native', action='store_true',
+                        help='in-process probers instead of forking ping')
+    parser.add_argument('--web', nargs='?', const=f"{DEFAULT_HOST}:{DEFAULT_PORT}",
+                        metavar='[HOST:]PORT',
+                        help=f'serve over HTTP instead of curses (default: {DEFAULT_HOST}:{DEFAULT_PORT})')
+    args = parser.parse_args()
+    
+    dashboard = SDWANDashboard(native=args.native)
+    if args.web:
+        host, _, port = args.web.rpartition(':')
+        dashboard.serve_web(host or DEFAULT_HOST, int(port))
+        return
+    
     print("Starting SD-WAN Dashboard...")
     print("Loading...")
     time.sleep(1)
-    
-    dashboard = SDWANDashboard()
     dashboard.run()
     
     print("\nDashboard closed.")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Elephant Flow Detection
+Ranks flows by rate from successive OpenFlow flow-stats replies using a
+Space-Saving heavy-hitter sketch, so memory per switch stays bounded no
+matter how many flows the switch carries.
+"""
+
+import time
+
+
+class SpaceSavingSketch:
+    """Space-Saving heavy-hitter sketch with a fixed number of counters"""
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        # key -> [count, error]
+        self.counters = {}
+
+    def update(self, key, weight):
+        """Add weight to key, evicting the smallest counter when full"""
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return counter
+
+        if len(self.counters) < self.capacity:
+            counter = [weight, 0]
+        else:
+            victim = min(self.counters, key=lambda k: self.counters[k][0])
+            floor = self.counters.pop(victim)[0]
+            counter = [floor + weight, floor]
+
+        self.counters[key] = counter
+        return counter
+
+    def decay(self, factor):
+        """Age all counters so the sketch follows the current traffic mix"""
+        for counter in self.counters.values():
+            counter[0] *= factor
+            counter[1] *= factor
+
+    def discard(self, key):
+        """Forget a key"""
+        self.counters.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.counters
+
+    def top(self, n=None):
+        """Return [(key, count, error)] sorted by decreasing count"""
+        ranked = sorted(
+            ((k, c[0], c[1]) for k, c in self.counters.items()),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return ranked if n is None else ranked[:n]
+
+
+class ElephantDetector:
+    """Detect elephant flows per switch from cumulative flow counters"""
+    def __init__(self, capacity=64, decay=0.5, threshold_mbps=10.0):
+        self.capacity = capacity
+        self.decay = decay
+        self.threshold_mbps = threshold_mbps
+
+        # dpid -> SpaceSavingSketch of smoothed rates (bytes/s)
+        self.sketches = {}
+
+        # dpid -> {key: (byte_count, timestamp)}, only for sketched keys
+        self.last_seen = {}
+
+    def update(self, dpid, samples, now=None):
+        """
+        Feed one stats reply for a switch.
+        samples: iterable of (key, byte_count, duration_sec)
+        Returns the set of keys currently classified as elephants.
+        """
+        now = time.time() if now is None else now
+        sketch = self.sketches.setdefault(dpid, SpaceSavingSketch(self.capacity))
+        last_seen = self.last_seen.setdefault(dpid, {})
+
+        sketch.decay(self.decay)
+
+        for key, byte_count, duration in samples:
+            previous = last_seen.get(key)
+            if previous and byte_count >= previous[0] and now > previous[1]:
+                rate = (byte_count - previous[0]) / (now - previous[1])
+            else:
+                # First sighting (or counters reset): use the lifetime average
+                rate = byte_count / max(duration, 1)
+
+            # Scale so a steady rate converges to its own value
+            sketch.update(key, rate * (1 - self.decay))
+            last_seen[key] = (byte_count, now)
+
+        # Keep per-key history bounded by the sketch size
+        for key in [k for k in last_seen if k not in sketch]:
+            del last_seen[key]
+
+        return self.elephants(dpid)
+
+    def rate_mbps(self, dpid, key):
+        """Estimated rate of a tracked flow in Mbps"""
+        sketch = self.sketches.get(dpid)
+        if not sketch or key not in sketch:
+            return 0.0
+        return sketch.counters[key][0] * 8 / 1_000_000
+
+    def elephants(self, dpid):
+        """Keys whose guaranteed rate is above the elephant threshold"""
+        sketch = self.sketches.get(dpid)
+        if not sketch:
+            return set()
+
+        threshold = self.threshold_mbps * 1_000_000 / 8
+        return {key for key, count, error in sketch.top() if count - error >= threshold}
+
+    def ranking(self, dpid, n=10):
+        """Top flows of a switch as [(key, rate_mbps)]"""
+        sketch = self.sketches.get(dpid)
+        if not sketch:
+            return []
+        return [(key, count * 8 / 1_000_000) for key, count, _ in sketch.top(n)]
+
+    def forget_switch(self, dpid):
+        """Drop all state for a disconnected switch"""
+        self.sketches.pop(dpid, None)
+        self.last_seen.pop(dpid, None)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Result Export
+Every probe result becomes one compact record, queued without blocking and
+written in batches by a background thread: JSON Lines by default, Parquet
+when pyarrow is installed and requested. Files rotate by size and age.
+load() reads a directory back, through pyarrow when available.
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.json as pa_json
+    import pyarrow.parquet as pq
+except ImportError:  # JSON Lines only
+    pa = None
+
+# Record columns (None when not measured by the probe kind)
+FIELDS = (
+    ('ts', 'float64'),         # Unix time of the result
+    ('kind', 'string'),        # ping / voice / bandwidth
+    ('link', 'string'),        # site1->site2[/gre]
+    ('src', 'string'),         # Source namespace
+    ('dst', 'string'),         # Target IP
+    ('ok', 'bool'),
+    ('latency', 'float64'),    # ms (one-way for voice)
+    ('latency_min', 'float64'),
+    ('latency_max', 'float64'),
+    ('loss', 'float64'),       # %
+    ('jitter', 'float64'),     # ms
+    ('mos', 'float64'),
+    ('bandwidth', 'float64'),  # Mbps
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+
+FORMATS = ('jsonl', 'parquet')
+BATCH_SIZE = 1000
+FLUSH_INTERVAL = 1.0          # seconds a record may wait in memory
+ROTATE_BYTES = 64 * 1024 * 1024
+ROTATE_SECONDS = 3600
+MAX_PENDING = 100_000         # Records queued before new ones are dropped
+
+
+def _schema():
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in FIELDS])
+
+
+class _JsonLinesFile:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', buffering=1024 * 1024)
+
+    def write(self, records):
+        self.file.write(''.join(
+            json.dumps({k: v for k, v in record.items() if v is not None},
+                       separators=(',', ':')) + '\n'
+            for record in records))
+        self.file.flush()
+
+    def size(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetFile:
+    def __init__(self, path):
+        self.path = path
+        self.schema = _schema()
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, records):
+        columns = {name: [record.get(name) for record in records] for name in FIELD_NAMES}
+        self.writer.write_table(pa.table(columns, schema=self.schema))
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def close(self):
+        self.writer.close()
+
+
+class ResultExporter:
+    """
+    Non-blocking record sink. write() only enqueues; a daemon thread
+    batches, writes and rotates, so a slow disk delays files, not probes.
+    """
+    def __init__(self, directory, fmt='jsonl', batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, rotate_bytes=ROTATE_BYTES,
+                 rotate_seconds=ROTATE_SECONDS, max_pending=MAX_PENDING):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        if fmt == 'parquet' and pa is None:
+            raise RuntimeError("Parquet export needs pyarrow")
+
+        self.directory = directory
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        os.makedirs(directory, exist_ok=True)
+
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.written = 0
+        self.current = None
+        self.opened_at = 0
+        self.file_index = 0
+
+        self.thread = threading.Thread(target=self._run, daemon=True, name='result-export')
+        self.thread.start()
+
+    def write(self, record):
+        """Queue one record (dict with FIELD_NAMES keys); never blocks"""
+        try:
+            self.pending.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self.pending.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                record = False  # Timer expired
+
+            if record is None:  # close()
+                self._flush(batch)
+                if self.current:
+                    self.current.close()
+                return
+            if record:
+                batch.append(record)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        self._rotate(batch[0].get('ts') or time.time())
+        try:
+            self.current.write(batch)
+            self.written += len(batch)
+        except OSError as e:
+            self.dropped += len(batch)
+            print(f"Export write failed ({e}); {len(batch)} records dropped", file=sys.stderr)
+
+    def _rotate(self, first_ts):
+        now = time.time()
+        if (self.current is not None and self.current.size() < self.rotate_bytes
+                and now - self.opened_at < self.rotate_seconds):
+            return
+        if self.current is not None:
+            self.current.close()
+
+        # Named after the first record so load() can skip files by time range
+        self.file_index += 1
+        name = f"probes-{time.strftime('%Y%m%d-%H%M%S', time.localtime(first_ts))}-{self.file_index:03d}"
+        path = os.path.join(self.directory, f"{name}.{self.fmt}")
+        self.current = _ParquetFile(path) if self.fmt == 'parquet' else _JsonLinesFile(path)
+        self.opened_at = now
+
+    def close(self):
+        """Flush everything queued and stop the writer thread"""
+        self.pending.put(None)
+        self.thread.join()
+
+
+def probe_record(kind, link, src, dst, result, ts=None):
+    """Compact record from a ping / voice / bandwidth result dict"""
+    ok = bool(result.get('success'))
+    return {
+        'ts': time.time() if ts is None else ts,
+        'kind': kind,
+        'link': link,
+        'src': src,
+        'dst': dst,
+        'ok': ok,
+        'latency': result.get('latency_ms', result.get('one_way_delay_ms')) if ok else None,
+        'latency_min': result.get('latency_min') if ok else None,
+        'latency_max': result.get('latency_max', result.get('delay_max_ms')) if ok else None,
+        'loss': result.get('packet_loss_percent'),
+        'jitter': result.get('jitter_ms') if ok else None,
+        'mos': result.get('mos') if ok else None,
+        'bandwidth': result.get('bandwidth_mbps') if ok else None,
+    }
+
+
+def export_files(directory, start=None, end=None):
+    """Export files of a directory, skipping those entirely outside [start, end]"""
+    files = []
+    for name in sorted(os.listdir(directory)):
+        if not name.startswith('probes-') or not name.endswith(FORMATS):
+            continue
+        path = os.path.join(directory, name)
+        if start is not None and os.path.getmtime(path) < start:
+            continue  # Last write before the window
+        if end is not None:
+            try:
+                opened = time.mktime(time.strptime(name[7:22], '%Y%m%d-%H%M%S'))
+            except ValueError:
+                opened = None
+            if opened is not None and opened > end:
+                continue
+        files.append(path)
+    return files
+
+
+def load(directory, start=None, end=None):
+    """
+    Records of an export directory in [start, end].
+    With pyarrow: one pyarrow.Table (Parquet and JSON Lines are both read by
+    the native readers). Without: a list of dicts.
+    """
+    files = export_files(directory, start, end)
+
+    if pa is not None:
+        schema = _schema()
+        tables = []
+        for path in files:
+            if path.endswith('.parquet'):
+                tables.append(pq.read_table(path, schema=schema))
+            else:
+                options = pa_json.ParseOptions(explicit_schema=schema)
+                tables.append(pa_json.read_json(path, parse_options=options))
+        if not tables:
+            return schema.empty_table()
+        table = pa.concat_tables(tables)
+        if start is not None or end is not None:
+            mask = None
+            if start is not None:
+                mask = pc.greater_equal(table['ts'], start)
+            if end is not None:
+                upper = pc.less_equal(table['ts'], end)
+                mask = upper if mask is None else pc.and_(mask, upper)
+            table = table.filter(mask)
+        return table
+
+    records = []
+    for path in files:
+        if path.endswith('.parquet'):
+            continue  # Needs pyarrow
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                ts = record['ts']
+                if (start is None or ts >= start) and (end is None or ts <= end):
+                    records.append(record)
+    return records
+
+
+def benchmark(records=1_000_000, directory='/tmp/sdwan-export-bench', fmt='jsonl'):
+    """Time enqueue (probe-loop cost), background write and reload"""
+    import shutil
+    shutil.rmtree(directory, ignore_errors=True)
+    links = [f"site{a}->site{b}" for a in range(1, 4) for b in range(1, 4) if a != b]
+    base = time.time() - records
+
+    exporter = ResultExporter(directory, fmt, max_pending=records)
+    start = time.perf_counter()
+    for i in range(records):
+        exporter.write({'ts': base + i, 'kind': 'ping', 'link': links[i % 6], 'src': 's1h1',
+                        'dst': '10.2.0.11', 'ok': True, 'latency': 10.0 + i % 13,
+                        'latency_min': 9.0, 'latency_max': 12.0, 'loss': 0.0, 'jitter': 0.4})
+    enqueue = time.perf_counter() - start
+    exporter.close()
+    total = time.perf_counter() - start
+
+    size = sum(os.path.getsize(p) for p in export_files(directory))
+    start = time.perf_counter()
+    loaded = load(directory)
+    load_time = time.perf_counter() - start
+
+    print(f"{records} records ({fmt}): enqueue {enqueue / records * 1e6:.2f} us/record, "
+          f"written in {total:.1f} s, {size / records:.0f} bytes/record")
+    print(f"Reloaded {len(loaded)} records in {load_time:.2f} s "
+          f"({'pyarrow' if pa is not None else 'json module'})")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+              fmt=sys.argv[2] if len(sys.argv) > 2 else 'jsonl')
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Metrics Feed
+Single-writer ring buffer in a memory-mapped file (/dev/shm by default)
+carrying per-link measurements from the monitor to the controller.
+Records have a fixed binary layout and a sequence number written last
+(seqlock style), so the reader never parses text, detects torn or
+overwritten slots, and drops duplicate or stale samples.
+"""
+
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+DEFAULT_FEED_PATH = os.environ.get('SDWAN_METRICS_FEED', '/dev/shm/sdwan-metrics')
+DEFAULT_SLOTS = 4096
+MAX_SAMPLE_AGE = 60.0  # seconds; older samples are not worth applying
+
+FEED_MAGIC = b'SDMF'
+FEED_VERSION = 1
+# magic, version, slot count, record size, next sequence to write
+HEADER = struct.Struct('<4sIIIQ')
+HEADER_SIZE = 64
+# sequence, timestamp, link id, latency ms, loss %, jitter ms, bandwidth Mbps
+LINK_ID_SIZE = 32  # bytes of UTF-8
+RECORD = struct.Struct(f'<Qd{LINK_ID_SIZE}sffff')
+SEQUENCE = struct.Struct('<Q')
+NEXT_SEQ_OFFSET = 16
+
+NAN = float('nan')
+
+
+class MetricsSample:
+    """One link measurement; None for metrics not measured"""
+    __slots__ = ('sequence', 'timestamp', 'link_id', 'latency', 'loss', 'jitter', 'bandwidth')
+
+    def __init__(self, sequence, timestamp, link_id, latency, loss, jitter, bandwidth):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.link_id = link_id
+        self.latency = latency
+        self.loss = loss
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+
+    def __repr__(self):
+        return (f"MetricsSample(#{self.sequence} {self.link_id} latency={self.latency} "
+                f"loss={self.loss} jitter={self.jitter} bandwidth={self.bandwidth})")
+
+
+def _encode(value):
+    return NAN if value is None else value
+
+
+def _decode(value):
+    return None if math.isnan(value) else value
+
+
+class MetricsFeedWriter:
+    """Monitor side: appends samples, overwriting the oldest slot when full"""
+    def __init__(self, path=DEFAULT_FEED_PATH, slots=DEFAULT_SLOTS):
+        size = HEADER_SIZE + slots * RECORD.size
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            fd = None
+        resume = False
+        if fd is not None:
+            header = os.pread(fd, HEADER.size, 0)
+            resume = (os.fstat(fd).st_size == size and len(header) == HEADER.size
+                      and HEADER.unpack(header)[:4] == (FEED_MAGIC, FEED_VERSION, slots, RECORD.size))
+            if not resume:
+                os.close(fd)
+
+        if not resume:
+            # New ring in a new file: readers still mapping the old one notice the inode change
+            temp = f"{path}.{os.getpid()}.tmp"
+            fd = os.open(temp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            os.ftruncate(fd, size)
+            os.replace(temp, path)
+        try:
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        self.slots = slots
+        if resume:
+            # Keep counting from the previous writer so readers see no rewind
+            self.next_seq = HEADER.unpack_from(self.map)[4]
+        else:
+            self.next_seq = 1
+            HEADER.pack_into(self.map, 0, FEED_MAGIC, FEED_VERSION, slots, RECORD.size, 1)
+
+    def publish(self, link_id, latency=None, loss=None, jitter=None, bandwidth=None, timestamp=None):
+        """
+        Write one sample; returns its sequence number. ValueError if link_id
+        does not fit in LINK_ID_SIZE bytes: a cut id would never match a link.
+        """
+        raw_link = link_id.encode()
+        if len(raw_link) > LINK_ID_SIZE:
+            raise ValueError(f"Link id longer than {LINK_ID_SIZE} bytes: {link_id!r}")
+        sequence = self.next_seq
+        offset = HEADER_SIZE + (sequence % self.slots) * RECORD.size
+
+        # Invalidate the slot, fill it, then commit the sequence number
+        SEQUENCE.pack_into(self.map, offset, 0)
+        RECORD.pack_into(self.map, offset, 0, time.time() if timestamp is None else timestamp,
+                         raw_link, _encode(latency), _encode(loss),
+                         _encode(jitter), _encode(bandwidth))
+        SEQUENCE.pack_into(self.map, offset, sequence)
+
+        self.next_seq = sequence + 1
+        SEQUENCE.pack_into(self.map, NEXT_SEQ_OFFSET, self.next_seq)
+        return sequence
+
+    def close(self):
+        self.map.close()
+
+
+class MetricsFeedReader:
+    """
+    Controller side: returns the samples written since the last poll.
+    Samples overwritten before being read are counted as overruns; samples
+    not newer than the last one seen for the same link, or older than
+    max_age, are dropped.
+    """
+    def __init__(self, path=DEFAULT_FEED_PATH, max_age=MAX_SAMPLE_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.map = None
+        self.inode = None
+        self.slots = 0
+        self.next_seq = None  # Next sequence to read
+        self.last_timestamp = {}  # link_id -> timestamp of the last accepted sample
+        self.stats = {'received': 0, 'stale': 0, 'duplicates': 0, 'overruns': 0, 'torn': 0}
+
+    def _open(self):
+        """(Re)map the feed file; False if there is no valid feed"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self.close()
+            return False
+        if self.map is not None and stat.st_ino == self.inode:
+            return True
+
+        self.close()
+        if stat.st_size < HEADER_SIZE:
+            return False
+        with open(self.path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, slots, record_size, next_seq = HEADER.unpack_from(buffer)
+        if (magic != FEED_MAGIC or version != FEED_VERSION or record_size != RECORD.size
+                or len(buffer) < HEADER_SIZE + slots * RECORD.size):
+            buffer.close()
+            return False
+
+        self.map = buffer
+        self.inode = stat.st_ino
+        self.slots = slots
+        # Start with what the ring still holds
+        self.next_seq = max(1, next_seq - slots + 1)
+        return True
+
+    def poll(self, now=None):
+        """New, fresh samples in sequence order"""
+        if not self._open():
+            return []
+
+        buffer = self.map
+        written = SEQUENCE.unpack_from(buffer, NEXT_SEQ_OFFSET)[0]
+        if written < self.next_seq:
+            # Writer restarted on a fresh ring
+            self.next_seq = max(1, written - self.slots + 1)
+        if written - self.next_seq > self.slots - 1:
+            oldest = written - self.slots + 1
+            self.stats['overruns'] += oldest - self.next_seq
+            self.next_seq = oldest
+
+        now = time.time() if now is None else now
+        samples = []
+        for sequence in range(self.next_seq, written):
+            offset = HEADER_SIZE + (sequence % self.slots) * RECORD.size
+            record = RECORD.unpack_from(buffer, offset)
+            # A changed sequence after the copy means the writer lapped us mid-read
+            if record[0] != sequence or SEQUENCE.unpack_from(buffer, offset)[0] != sequence:
+                self.stats['torn'] += 1
+                continue
+
+            _, timestamp, raw_link, latency, loss, jitter, bandwidth = record
+            link_id = raw_link.rstrip(b'\0').decode(errors='replace')
+            if timestamp <= self.last_timestamp.get(link_id, 0):
+                self.stats['duplicates'] += 1
+                continue
+            if now - timestamp > self.max_age:
+                self.stats['stale'] += 1
+                continue
+
+            self.last_timestamp[link_id] = timestamp
+            self.stats['received'] += 1
+            samples.append(MetricsSample(sequence, timestamp, link_id, _decode(latency),
+                                         _decode(loss), _decode(jitter), _decode(bandwidth)))
+        self.next_seq = written
+        return samples
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+            self.inode = None
+
+
+def benchmark(samples=200_000, path='/dev/shm/sdwan-metrics-bench'):
+    """Writer and reader cost per sample"""
+    writer = MetricsFeedWriter(path)
+    reader = MetricsFeedReader(path)
+    reader.poll()
+
+    links = [f"site{i % 8}->site{(i + 1) % 8}" for i in range(64)]
+    start = time.perf_counter()
+    base = time.time()
+    read = 0
+    for i in range(samples):
+        writer.publish(links[i % 64], 10.0 + i % 7, 0.1, 0.5, timestamp=base + i * 1e-6)
+        if i % 1000 == 999:
+            read += len(reader.poll(now=base))
+    elapsed = time.perf_counter() - start
+    read += len(reader.poll(now=base))
+
+    print(f"{samples} samples written and {read} read in {elapsed * 1000:.0f} ms "
+          f"({elapsed / samples * 1_000_000:.2f} us/sample round trip)")
+    print(f"Reader stats: {reader.stats}")
+    writer.close()
+    reader.close()
+    os.unlink(path)
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
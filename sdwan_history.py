@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Metric History
+Fixed-size, preallocated ring buffers of per-bucket aggregates for the
+dashboard trends. Every series keeps one ring per display window (1 min,
+15 min, 1 h), each split into the same number of buckets as a sparkline has
+points. A sample updates the current bucket of each ring, so rendering
+reads finished aggregates instead of downsampling raw samples every frame.
+"""
+
+import math
+import random
+import sys
+import time
+from array import array
+
+WINDOWS = {'1m': 60, '15m': 900, '1h': 3600}  # Window name -> seconds
+POINTS = 30  # Buckets per window = sparkline width
+
+SPARK_BLOCKS = '▁▂▃▄▅▆▇█'
+
+NAN = float('nan')
+
+
+class BucketRing:
+    """POINTS buckets of `step` seconds: min, max, sum and count per bucket"""
+    __slots__ = ('step', 'points', 'index', 'minimum', 'maximum', 'total', 'count')
+
+    def __init__(self, seconds, points=POINTS):
+        self.step = seconds / points
+        self.points = points
+        self.index = array('q', [-1] * points)  # Absolute bucket number held by each slot
+        self.minimum = array('d', [NAN] * points)
+        self.maximum = array('d', [NAN] * points)
+        self.total = array('d', [0.0] * points)
+        self.count = array('L', [0] * points)
+
+    def add(self, value, timestamp):
+        bucket = int(timestamp // self.step)
+        slot = bucket % self.points
+        if self.index[slot] != bucket:
+            # Slot held an older bucket (or none): reuse it
+            self.index[slot] = bucket
+            self.minimum[slot] = self.maximum[slot] = value
+            self.total[slot] = value
+            self.count[slot] = 1
+            return
+        if value < self.minimum[slot]:
+            self.minimum[slot] = value
+        if value > self.maximum[slot]:
+            self.maximum[slot] = value
+        self.total[slot] += value
+        self.count[slot] += 1
+
+    def series(self, now):
+        """(mean, min, max) per bucket, oldest first, None for empty buckets"""
+        last = int(now // self.step)
+        result = []
+        for bucket in range(last - self.points + 1, last + 1):
+            slot = bucket % self.points
+            if self.index[slot] == bucket and self.count[slot]:
+                result.append((self.total[slot] / self.count[slot],
+                               self.minimum[slot], self.maximum[slot]))
+            else:
+                result.append(None)
+        return result
+
+
+class HistoryStore:
+    """Series keyed by (key, metric), e.g. ('site1->site2', 'latency'), created on first sample"""
+    def __init__(self, windows=WINDOWS, points=POINTS):
+        self.windows = windows
+        self.points = points
+        self.rings = {}  # (key, metric) -> {window name: BucketRing}
+
+    def add(self, key, metric, value, timestamp=None):
+        if value is None:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        rings = self.rings.get((key, metric))
+        if rings is None:
+            rings = self.rings[(key, metric)] = {name: BucketRing(seconds, self.points)
+                                                 for name, seconds in self.windows.items()}
+        for ring in rings.values():
+            ring.add(value, timestamp)
+
+    def series(self, key, metric, window, now=None):
+        rings = self.rings.get((key, metric))
+        if rings is None:
+            return [None] * self.points
+        return rings[window].series(time.time() if now is None else now)
+
+    def bucket(self, window, now=None):
+        """Changes when any series of this window rolls to a new bucket"""
+        return int((time.time() if now is None else now) // (self.windows[window] / self.points))
+
+
+def sparkline(series, floor=None):
+    """One block character per bucket mean, scaled to the visible range; ' ' when empty"""
+    means = [point[0] for point in series if point is not None]
+    if not means:
+        return ' ' * len(series)
+    low = min(means) if floor is None else floor
+    high = max(means)
+    span = high - low
+    top = len(SPARK_BLOCKS) - 1
+    chars = []
+    for point in series:
+        if point is None:
+            chars.append(' ')
+        elif span <= 0:
+            chars.append(SPARK_BLOCKS[0])
+        else:
+            level = (point[0] - low) / span * top
+            chars.append(SPARK_BLOCKS[max(0, min(top, int(math.floor(level + 0.5))))])
+    return ''.join(chars)
+
+
+def band(series):
+    """(min, max) over the window, or (None, None)"""
+    points = [point for point in series if point is not None]
+    if not points:
+        return None, None
+    return min(point[1] for point in points), max(point[2] for point in points)
+
+
+def benchmark(links=900, seconds=3600, interval=2.0):
+    """Record an hour of 2 s samples for many links, then render every sparkline"""
+    rng = random.Random(4)
+    history = HistoryStore()
+    base = time.time() - seconds
+    steps = int(seconds / interval)
+
+    start = time.perf_counter()
+    for step in range(steps):
+        now = base + step * interval
+        for link in range(links // 30):  # A slice of the links per tick keeps this quick
+            history.add(link, 'latency', 20 + rng.gauss(0, 2) + (step > steps * 0.8) * 15, now)
+    samples = steps * (links // 30)
+    add_time = time.perf_counter() - start
+
+    for link in range(links // 30, links):
+        history.add(link, 'latency', 20.0, base + seconds)
+
+    start = time.perf_counter()
+    for window in WINDOWS:
+        for link in range(links):
+            series = history.series(link, 'latency', window, base + seconds)
+            sparkline(series)
+            band(series)
+    render_time = time.perf_counter() - start
+
+    print(f"{samples} samples: {add_time / samples * 1e6:.2f} us/sample (3 windows updated)")
+    print(f"{links} links x {len(WINDOWS)} windows rendered in {render_time * 1000:.1f} ms")
+    for window in WINDOWS:
+        series = history.series(0, 'latency', window, base + seconds)
+        low, high = band(series)
+        print(f"  {window:>3}: {sparkline(series)}  {low:.1f}-{high:.1f} ms")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 900)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Intent Index
+Matches chatbot questions (French or English) to intents. Examples are
+normalized once (lowercase, no accents, plural folded, stop words dropped)
+into an inverted token index holding precomputed BM25 weights, so a query
+costs one dictionary lookup per token whatever the number of intents. A
+question can carry several intents; an intent is kept only if it explains
+a query token that better-scoring intents do not.
+"""
+
+import math
+import random
+import re
+import sys
+import time
+import unicodedata
+
+K1 = 1.2   # BM25 term-frequency saturation
+B = 0.75   # BM25 length normalization
+MIN_SCORE_RATIO = 0.25  # Secondary intents score at least this share of the best
+
+STOP_WORDS = frozenset("""
+    a au aux avec ce ces cet cette d de des donne donner du elle en est et il ils j je
+    l la le les leur m me moi mon ma mes n ne nos notre ou par pas pour qu que quel quelle
+    quelles quels qui s sa se ses son sont sur t ta te tes ton un une vos votre y
+    combien comment dis montre peux pourrais stp svp
+    an and any are at be can could do does for give how i in is it many me much my
+    of on or our please show tell that the there to us what which with you your
+""".split())
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    """Lowercase, accents removed"""
+    decomposed = unicodedata.normalize('NFD', text.lower())
+    return ''.join(char for char in decomposed if unicodedata.category(char) != 'Mn')
+
+
+def _fold(token):
+    # Plural folding, applied identically to examples and queries
+    if len(token) > 4 and token[-1] in 'sx':
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Index tokens of a text: normalized, folded, without stop words"""
+    return [_fold(token) for token in _TOKEN.findall(normalize(text)) if token not in STOP_WORDS]
+
+
+class IntentIndex:
+    """
+    intents: {name: [example phrases or keywords]}. All examples of an
+    intent form one BM25 document; weights are computed at build time.
+    """
+    def __init__(self, intents, k1=K1, b=B):
+        documents = {name: [token for example in examples for token in tokenize(example)]
+                     for name, examples in intents.items()}
+        average = sum(len(tokens) for tokens in documents.values()) / max(1, len(documents)) or 1.0
+
+        frequencies = {}  # token -> {intent: occurrences}
+        for name, tokens in documents.items():
+            for token in tokens:
+                counts = frequencies.setdefault(token, {})
+                counts[name] = counts.get(name, 0) + 1
+
+        count = len(documents)
+        self.postings = {}  # token -> ((intent, weight), ...)
+        for token, counts in frequencies.items():
+            idf = math.log(1 + (count - len(counts) + 0.5) / (len(counts) + 0.5))
+            self.postings[token] = tuple(
+                (name, idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(documents[name]) / average)))
+                for name, tf in counts.items())
+
+    def scores(self, query):
+        """[(intent, score, matched tokens)] best first"""
+        totals = {}
+        matched = {}
+        for token in set(tokenize(query)):
+            for name, weight in self.postings.get(token, ()):
+                totals[name] = totals.get(name, 0.0) + weight
+                matched.setdefault(name, set()).add(token)
+        ranked = sorted(totals.items(), key=lambda item: -item[1])
+        return [(name, score, matched[name]) for name, score in ranked]
+
+    def match(self, query, min_ratio=MIN_SCORE_RATIO):
+        """
+        Intents of the query, in the order the question mentions them.
+        "état du contrôleur" gives only the controller intent (it explains
+        both tokens); "latence et pertes" gives latency, then loss.
+        """
+        ranked = self.scores(query)
+        if not ranked:
+            return []
+        position = {}
+        for index, token in enumerate(tokenize(query)):
+            position.setdefault(token, index)
+        best = ranked[0][1]
+        covered = set()
+        intents = []
+        for name, score, tokens in ranked:
+            if score < best * min_ratio:
+                break
+            if tokens - covered:
+                intents.append(name)
+                covered |= tokens
+        first = {name: min(position[token] for token in tokens) for name, _, tokens in ranked}
+        return sorted(intents, key=first.get)
+
+
+def benchmark(queries=2000):
+    """Match time as the intent count grows, against a scan of every keyword per query"""
+    rng = random.Random(7)
+    words = [f"mot{i}" for i in range(20000)]
+    probe = ["quel est l'état du contrôleur", "latence et pertes entre les sites",
+             "combien de flows sur br-wan ?", "show me the network status please"]
+
+    for size in (10, 100, 1000):
+        intents = {f"intent{i}": rng.sample(words, 8) for i in range(size)}
+        intents.update({'controller': ['contrôleur', 'état du contrôleur'],
+                        'status': ['état du réseau', 'network status'], 'latency': ['latence'], 'loss': ['pertes'], 'flows': ['flows']})
+        start = time.perf_counter()
+        index = IntentIndex(intents)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(queries):
+            index.match(probe[i % len(probe)])
+        indexed = (time.perf_counter() - start) / queries
+
+        # The previous matcher: normalize every keyword, substring-test it, per query
+        keywords = [(keyword, name) for name, examples in intents.items() for keyword in examples]
+        start = time.perf_counter()
+        for i in range(queries):
+            text = normalize(probe[i % len(probe)])
+            for keyword, name in keywords:
+                if normalize(keyword) in text:
+                    break
+        scanned = (time.perf_counter() - start) / queries
+
+        print(f"{size + 5:5d} intents ({len(keywords)} keywords): index {indexed * 1e6:6.1f} us/query, "
+              f"keyword scan {scanned * 1e6:8.1f} us/query, built in {build * 1000:.1f} ms")
+    for query in probe:
+        print(f"  {query!r} -> {index.match(query)}")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Topology Inventory
+Discovers the network namespaces under /var/run/netns, their addresses and
+their tunnel interfaces (GRE / VXLAN) through rtnetlink, groups them into
+sites by LAN subnet and derives the full-mesh probe matrix, with one variant
+per tunnel between site routers. Discovery is cached: namespaces are
+re-listed on every call (one directory scan) and re-dumped only when the
+listing changes or the rescan interval expires.
+"""
+
+import json
+import os
+import re
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from sdwan_prefix import int_to_ip, ip_to_int, parse_prefix
+from sdwan_prober import NETNS_DIR, open_socket
+
+NETLINK_ROUTE = 0
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+
+IFLA_IFNAME = 3
+IFLA_LINKINFO = 18
+IFLA_INFO_KIND = 1
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+NLMSG_HEADER = struct.Struct('=IHHII')
+IFINFOMSG = struct.Struct('=BxHiII')
+IFADDRMSG = struct.Struct('=BBBBI')
+RTATTR = struct.Struct('=HH')
+
+# Interface kinds that carry inter-site tunnels
+TUNNEL_KINDS = {
+    'gre': 'gre', 'gretap': 'gre', 'ip6gre': 'gre', 'ip6gretap': 'gre',
+    'vxlan': 'vxlan',
+}
+
+RESCAN_INTERVAL = 60  # seconds between full re-dumps of unchanged namespaces
+
+SITE_NAME = re.compile(r'^s(?:ite)?(\d+)')
+
+# Probes used by every tool when no namespace can be discovered
+# (namespace, target_ip, link_id)
+DEFAULT_TEST_PAIRS = [
+    ('s1h1', '10.2.0.11', 'site1->site2'),
+    ('s1h1', '10.3.0.11', 'site1->site3'),
+    ('s2h1', '10.3.0.11', 'site2->site3'),
+    ('s2h1', '10.1.0.11', 'site2->site1'),
+]
+
+
+# ----------------------------------------------------------------------
+# rtnetlink dumps
+# ----------------------------------------------------------------------
+
+def _attributes(data, offset=0):
+    """rtattr type -> payload over data[offset:]"""
+    attrs = {}
+    while offset + RTATTR.size <= len(data):
+        length, attr_type = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        attrs[attr_type & 0x3FFF] = data[offset + RTATTR.size:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+
+
+def _dump(sock, msg_type, body):
+    """Send one dump request; yields (type, payload) of each reply message"""
+    sequence = int(time.monotonic() * 1000) & 0xFFFFFFFF
+    header = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), msg_type,
+                               NLM_F_REQUEST | NLM_F_DUMP, sequence, 0)
+    sock.send(header + body)
+
+    while True:
+        data = sock.recv(65536)
+        offset = 0
+        while offset + NLMSG_HEADER.size <= len(data):
+            length, reply_type, _, reply_seq, _ = NLMSG_HEADER.unpack_from(data, offset)
+            if length < NLMSG_HEADER.size:
+                return
+            payload = data[offset + NLMSG_HEADER.size:offset + length]
+            offset += (length + 3) & ~3
+            if reply_seq != sequence:
+                continue
+            if reply_type == NLMSG_DONE:
+                return
+            if reply_type == NLMSG_ERROR:
+                errno = -struct.unpack_from('=i', payload)[0]
+                if errno:
+                    raise OSError(errno, os.strerror(errno))
+                return
+            yield reply_type, payload
+
+
+def _netlink_scan(namespace):
+    """(interfaces {name: kind}, addresses [(ifname, ip, prefixlen)]) via rtnetlink"""
+    sock = open_socket(namespace, socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        sock.settimeout(2)
+        names = {}
+        interfaces = {}
+        for msg_type, payload in _dump(sock, RTM_GETLINK,
+                                       IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)):
+            if msg_type != RTM_NEWLINK:
+                continue
+            _, _, index, _, _ = IFINFOMSG.unpack_from(payload)
+            attrs = _attributes(payload, IFINFOMSG.size)
+            name = attrs.get(IFLA_IFNAME, b'').rstrip(b'\0').decode()
+            kind = None
+            if IFLA_LINKINFO in attrs:
+                info = _attributes(attrs[IFLA_LINKINFO])
+                if IFLA_INFO_KIND in info:
+                    kind = info[IFLA_INFO_KIND].rstrip(b'\0').decode()
+            names[index] = name
+            interfaces[name] = kind
+
+        addresses = []
+        for msg_type, payload in _dump(sock, RTM_GETADDR,
+                                       IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)):
+            if msg_type != RTM_NEWADDR:
+                continue
+            family, prefixlen, _, _, index = IFADDRMSG.unpack_from(payload)
+            attrs = _attributes(payload, IFADDRMSG.size)
+            raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+            if family == socket.AF_INET and raw:
+                addresses.append((names.get(index, str(index)),
+                                  socket.inet_ntoa(raw[:4]), prefixlen))
+        return interfaces, addresses
+    finally:
+        sock.close()
+
+
+def _ip_scan(namespace):
+    """Same as _netlink_scan through `ip -j` (no CAP_SYS_ADMIN needed for setns)"""
+    base = ['ip'] + (['-n', namespace] if namespace else [])
+    links = json.loads(subprocess.run(base + ['-j', '-d', 'link', 'show'], capture_output=True,
+                                      text=True, timeout=5, check=True).stdout or '[]')
+    addrs = json.loads(subprocess.run(base + ['-j', '-4', 'addr', 'show'], capture_output=True,
+                                      text=True, timeout=5, check=True).stdout or '[]')
+
+    interfaces = {link['ifname']: link.get('linkinfo', {}).get('info_kind') for link in links}
+    addresses = [(entry['ifname'], info['local'], info['prefixlen'])
+                 for entry in addrs for info in entry.get('addr_info', [])
+                 if info.get('family') == 'inet']
+    return interfaces, addresses
+
+
+def scan_namespace(namespace):
+    """Interfaces and IPv4 addresses of a namespace"""
+    try:
+        return _netlink_scan(namespace)
+    except OSError:
+        pass
+    try:
+        return _ip_scan(namespace)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return {}, []
+
+
+def list_namespaces():
+    """{name: inode} of /var/run/netns (inode changes when a namespace is recreated)"""
+    try:
+        entries = os.scandir(NETNS_DIR)
+    except OSError:
+        return {}
+    with entries:
+        return {entry.name: entry.inode() for entry in entries}
+
+
+# ----------------------------------------------------------------------
+# Inventory
+# ----------------------------------------------------------------------
+
+class Namespace:
+    """One discovered namespace"""
+    def __init__(self, name, interfaces, addresses):
+        self.name = name
+        self.interfaces = interfaces  # ifname -> link kind (None for plain)
+        self.addresses = addresses    # [(ifname, ip, prefixlen)]
+        self.site = None
+
+    @property
+    def tunnels(self):
+        """[(ifname, 'gre'|'vxlan', ip, prefixlen)] of addressed tunnel interfaces"""
+        return [(ifname, TUNNEL_KINDS[self.interfaces[ifname]], ip, prefixlen)
+                for ifname, ip, prefixlen in self.addresses
+                if self.interfaces.get(ifname) in TUNNEL_KINDS]
+
+    @property
+    def is_router(self):
+        """Tunnel endpoint, or attached to several subnets (LAN + WAN)"""
+        if self.tunnels:
+            return True
+        networks = {parse_prefix(f"{ip}/{prefixlen}") for _, ip, prefixlen in self.lan_addresses()}
+        return len(networks) > 1
+
+    def lan_addresses(self):
+        """Non-loopback, non-tunnel addresses"""
+        return [(ifname, ip, prefixlen) for ifname, ip, prefixlen in self.addresses
+                if not ip.startswith('127.') and self.interfaces.get(ifname) not in TUNNEL_KINDS]
+
+    def __eq__(self, other):
+        return (isinstance(other, Namespace) and self.name == other.name
+                and self.interfaces == other.interfaces and self.addresses == other.addresses)
+
+    def __repr__(self):
+        return f"Namespace({self.name!r}, site={self.site!r}, router={self.is_router})"
+
+
+class Site:
+    """Namespaces sharing a LAN subnet"""
+    def __init__(self, name, subnet):
+        self.name = name
+        self.subnet = subnet  # '10.1.0.0/24'
+        self.hosts = []       # [(namespace, ip)]
+        self.routers = []     # [Namespace]
+
+    def __repr__(self):
+        return f"Site({self.name!r}, {self.subnet}, hosts={len(self.hosts)})"
+
+
+class TopologyInventory:
+    """Cached discovery of namespaces, sites and tunnels"""
+    def __init__(self, rescan_interval=RESCAN_INTERVAL):
+        self.rescan_interval = rescan_interval
+        self.namespaces = {}
+        self.sites = {}
+        self.version = 0  # Bumped whenever the discovered topology changes
+        self._listing = None
+        self._scanned_at = 0
+        self.lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Rediscover if the namespace listing changed or the cache expired; True if changed"""
+        with self.lock:
+            listing = list_namespaces()
+            if (not force and listing == self._listing
+                    and time.monotonic() - self._scanned_at < self.rescan_interval):
+                return False
+
+            namespaces = {}
+            for name in sorted(listing):
+                interfaces, addresses = scan_namespace(name)
+                namespaces[name] = Namespace(name, interfaces, sorted(addresses))
+
+            self._listing = listing
+            self._scanned_at = time.monotonic()
+            if namespaces == self.namespaces:
+                return False
+
+            self.namespaces = namespaces
+            self.sites = self._group_sites(namespaces)
+            self.version += 1
+            return True
+
+    @staticmethod
+    def _group_sites(namespaces):
+        """Sites are the LAN subnets that contain at least one host namespace"""
+        subnets = {}
+        for ns in namespaces.values():
+            if ns.is_router:
+                continue
+            for _, ip, prefixlen in ns.lan_addresses():
+                network, _ = parse_prefix(f"{ip}/{prefixlen}")
+                subnets.setdefault(f"{int_to_ip(network)}/{prefixlen}", []).append((ns, ip))
+
+        sites = {}
+        for subnet, members in sorted(subnets.items(), key=lambda item: ip_to_int(item[0].split('/')[0])):
+            # s1h1 / site1-host1 -> site1; otherwise the subnet names the site
+            numbers = {match.group(1) for match in (SITE_NAME.match(ns.name) for ns, _ in members) if match}
+            name = f"site{numbers.pop()}" if len(numbers) == 1 else subnet
+            site = Site(name, subnet)
+            site.hosts = sorted(((ns.name, ip) for ns, ip in members), key=lambda h: ip_to_int(h[1]))
+            for ns, _ in members:
+                ns.site = name
+            sites[name] = site
+
+        network_to_site = {site.subnet: site for site in sites.values()}
+        for ns in namespaces.values():
+            if not ns.is_router:
+                continue
+            for _, ip, prefixlen in ns.lan_addresses():
+                network, _ = parse_prefix(f"{ip}/{prefixlen}")
+                site = network_to_site.get(f"{int_to_ip(network)}/{prefixlen}")
+                if site is not None:
+                    site.routers.append(ns)
+                    ns.site = site.name
+                    break
+        return sites
+
+    def probe_matrix(self, tunnels=False):
+        """
+        N x N (namespace, target_ip, link_id) probes between sites, first host
+        to first host. tunnels=True adds one probe per tunnel between site
+        routers, with link ids such as 'site1->site2/gre'.
+        """
+        self.refresh()
+        sites = self.sites
+        probes = []
+        for src in sites.values():
+            for dst in sites.values():
+                if src is dst or not src.hosts or not dst.hosts:
+                    continue
+                probes.append((src.hosts[0][0], dst.hosts[0][1], f"{src.name}->{dst.name}"))
+
+        if tunnels:
+            probes.extend(self.tunnel_probes())
+        return probes
+
+    def tunnel_probes(self):
+        """Router-to-router probes across each tunnel, peer found by shared tunnel subnet"""
+        endpoints = {}  # tunnel subnet -> [(namespace, kind, ip)]
+        for site in self.sites.values():
+            for router in site.routers:
+                for _, kind, ip, prefixlen in router.tunnels:
+                    network, _ = parse_prefix(f"{ip}/{prefixlen}")
+                    endpoints.setdefault((network, prefixlen), []).append((router, kind, ip))
+
+        probes = []
+        for members in endpoints.values():
+            for router, kind, _ in members:
+                for peer, _, peer_ip in members:
+                    if peer.site != router.site:
+                        probes.append((router.name, peer_ip, f"{router.site}->{peer.site}/{kind}"))
+        return sorted(probes, key=lambda probe: probe[2])
+
+    def namespace_of(self, ip):
+        """Name of the namespace holding address ip, or None"""
+        self.refresh()
+        for ns in self.namespaces.values():
+            if any(address == ip for _, address, _ in ns.addresses):
+                return ns.name
+        return None
+
+    def link_id(self, source_ns, target_ip):
+        """
+        'siteA->siteB' from a namespace to the site owning target_ip, with
+        '/gre' or '/vxlan' when target_ip is a tunnel address; None if
+        either end is not in a known site
+        """
+        self.refresh()
+        source = self.namespaces.get(source_ns)
+        target = self.namespaces.get(self.namespace_of(target_ip))
+        if source is None or target is None or source.site is None or target.site is None:
+            return None
+        link = f"{source.site}->{target.site}"
+        for _, kind, ip, _ in target.tunnels:
+            if ip == target_ip:
+                return f"{link}/{kind}"
+        return link
+
+    def site_names(self):
+        self.refresh()
+        return list(self.sites)
+
+
+def link_label(link_id):
+    """'site1->site2/gre' -> 'Site1 → Site2 (gre)'"""
+    link, _, tunnel = link_id.partition('/')
+    label = ' → '.join(part.capitalize() for part in link.split('->'))
+    return f"{label} ({tunnel})" if tunnel else label
+
+
+if __name__ == '__main__':
+    inventory = TopologyInventory()
+    start = time.perf_counter()
+    inventory.refresh()
+    elapsed = time.perf_counter() - start
+    print(f"Discovered {len(inventory.namespaces)} namespaces, {len(inventory.sites)} sites "
+          f"in {elapsed * 1000:.1f} ms")
+    for site in inventory.sites.values():
+        routers = ', '.join(r.name for r in site.routers) or '-'
+        hosts = ', '.join(f"{ns} ({ip})" for ns, ip in site.hosts)
+        print(f"  {site.name:8s} {site.subnet:18s} hosts: {hosts}  routers: {routers}")
+
+    start = time.perf_counter()
+    probes = inventory.probe_matrix(tunnels='--tunnels' in sys.argv)
+    print(f"Probe matrix ({(time.perf_counter() - start) * 1000:.2f} ms, cached):")
+    for source_ns, target_ip, link_id in probes:
+        print(f"  {link_id:24s} {source_ns} -> {target_ip}")
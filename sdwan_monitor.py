@@ -4,61 +4,92 @@ SD-WAN Network Monitoring and Health Check System
 Monitors latency, packet loss, bandwidth, and triggers anomaly detection
 """
 
+import argparse
+import asyncio
 import subprocess
 import json
 import time
 import sys
 from datetime import datetime
 from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import statistics
 
+from sdwan_prober import ProberPool
+from sdwan_tsdb import TimeSeriesStore
+from sdwan_anomaly import DetectorBank
+from sdwan_bandwidth import BandwidthScheduler
+from sdwan_inventory import DEFAULT_TEST_PAIRS, TopologyInventory, link_label
+from sdwan_voice import DSCP_EF, mos_rating, voice_test
+from sdwan_feed import DEFAULT_FEED_PATH, MetricsFeedWriter
+from sdwan_sketch import SketchStore, format_percentiles
+from sdwan_export import FORMATS, ResultExporter, probe_record
+
+# metric -> (label, unit) used in anomaly reports
+ANOMALY_LABELS = {
+    'latency': ('Latency', 'ms'),
+    'loss': ('Packet loss', '%'),
+    'jitter': ('Jitter', 'ms'),
+    'voice_jitter': ('Voice jitter', 'ms'),
+    'mos': ('MOS', ''),
+}
+
 class NetworkMonitor:
-    def __init__(self):
+    def __init__(self, native=False, store_dir=None, feed_path=None, export_dir=None,
+                 export_format='jsonl'):
         self.metrics_history = defaultdict(lambda: {
             'latency': deque(maxlen=100),
             'loss': deque(maxlen=100),
-            'bandwidth': deque(maxlen=100)
+            'bandwidth': deque(maxlen=100),
+            'voice_jitter': deque(maxlen=100),
+            'mos': deque(maxlen=100)
         })
         self.anomaly_threshold = 2.5  # Standard deviations
         self.alert_count = 0
         
-    def ping_test(self, source_ns, target_ip, count=10):
-        """Perform ping test from namespace to target"""
+        # Per-packet RTT quantile sketches per link and minute (last hour)
+        self.latency_sketches = SketchStore(bucket_seconds=60, buckets=60)
+        
+        # Streaming detectors per link (z-score, EWMA, CUSUM, seasonal)
+        self.detectors = DetectorBank(zscore_threshold=self.anomaly_threshold)
+        
+        # In-process probers (no ping fork per measurement)
+        self.prober_pool = ProberPool() if native else None
+        
+        # Persistent per-link history (raw + 1 min / 1 h rollups)
+        self.store = TimeSeriesStore(store_dir) if store_dir else None
+        
+        # Shared-memory ring read by the controller (measured path metrics)
+        self.feed = MetricsFeedWriter(feed_path) if feed_path else None
+        self.feed_rejected = defaultdict(int)  # link_id -> samples too long to publish
+        
+        # Every probe result as a JSON Lines / Parquet record (background writer)
+        self.exporter = ResultExporter(export_dir, export_format) if export_dir else None
+        
+        # Discovered namespaces / sites / tunnels -> full-mesh probe matrix
+        self.inventory = TopologyInventory()
+        
+        # iperf3 server pool and per-link test scheduler, started on first use
+        self.bandwidth = None
+        
+    def ping_test(self, source_ns, target_ip, count=10, deadline=15):
+        """Perform ping test from namespace to target, returning within deadline seconds"""
+        if self.prober_pool:
+            try:
+                return self.prober_pool.ping(source_ns, target_ip, count=count,
+                                             interval=0.2, timeout=1.0, deadline=deadline)
+            except OSError:
+                pass  # No namespace access: fall back to ping
+        
         try:
             cmd = [
                 'ip', 'netns', 'exec', source_ns,
                 'ping', '-c', str(count), '-i', '0.2', '-W', '1', target_ip
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=deadline)
             
             if result.returncode == 0:
-                # Parse ping output
-                output = result.stdout
-                
-                # Extract packet loss
-                loss_line = [l for l in output.split('\n') if 'packet loss' in l]
-                if loss_line:
-                    loss = float(loss_line[0].split('%')[0].split()[-1])
-                else:
-                    loss = 0
-                
-                # Extract latency statistics
-                stats_line = [l for l in output.split('\n') if 'rtt min/avg/max' in l or 'min/avg/max' in l]
-                if stats_line:
-                    stats = stats_line[0].split('=')[-1].strip().split('/')
-                    latency_min = float(stats[0])
-                    latency_avg = float(stats[1])
-                    latency_max = float(stats[2].split()[0])
-                    
-                    return {
-                        'success': True,
-                        'latency_ms': latency_avg,
-                        'latency_min': latency_min,
-                        'latency_max': latency_max,
-                        'packet_loss_percent': loss,
-                        'packets_sent': count,
-                        'packets_received': count - int(count * loss / 100)
-                    }
+                return self._parse_ping_output(result.stdout, count)
             
             return {'success': False, 'error': 'Ping failed'}
             
@@ -67,55 +98,154 @@ class NetworkMonitor:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def bandwidth_test(self, server_ns, client_ns, server_ip, duration=5):
-        """Perform bandwidth test using iperf3"""
+    def _parse_ping_output(self, output, count):
+        """Parse ping summary lines into a result dict"""
+        # Extract packet loss
+        loss_line = [l for l in output.split('\n') if 'packet loss' in l]
+        if loss_line:
+            loss = float(loss_line[0].split('%')[0].split()[-1])
+        else:
+            loss = 0
+        
+        # Extract latency statistics
+        stats_line = [l for l in output.split('\n') if 'rtt min/avg/max' in l or 'min/avg/max' in l]
+        if stats_line:
+            stats = stats_line[0].split('=')[-1].strip().split('/')
+            latency_min = float(stats[0])
+            latency_avg = float(stats[1])
+            latency_max = float(stats[2].split()[0])
+            
+            return {
+                'success': True,
+                'latency_ms': latency_avg,
+                'latency_min': latency_min,
+                'latency_max': latency_max,
+                'packet_loss_percent': loss,
+                'packets_sent': count,
+                'packets_received': count - int(count * loss / 100)
+            }
+        
+        return {'success': False, 'error': 'Ping failed'}
+    
+    async def async_ping_test(self, source_ns, target_ip, count=10, deadline=15, executor=None):
+        """
+        Asynchronous ping test, same result dict as ping_test. Native probes
+        run on executor and stop by themselves at the deadline.
+        """
+        if self.prober_pool:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, self.ping_test, source_ns, target_ip, count, deadline)
+        
+        cmd = [
+            'ip', 'netns', 'exec', source_ns,
+            'ping', '-c', str(count), '-i', '0.2', '-W', '1', target_ip
+        ]
         try:
-            # Start iperf3 server
-            server_proc = subprocess.Popen(
-                ['ip', 'netns', 'exec', server_ns, 'iperf3', '-s', '-1'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
-            
-            # Wait for server to start
-            time.sleep(1)
-            
-            # Run iperf3 client
-            cmd = [
-                'ip', 'netns', 'exec', client_ns,
-                'iperf3', '-c', server_ip, '-t', str(duration), '-J'
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=duration+5)
-            
-            # Kill server
-            server_proc.terminate()
-            server_proc.wait(timeout=2)
-            
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                bandwidth_bps = data['end']['sum_sent']['bits_per_second']
-                bandwidth_mbps = bandwidth_bps / 1_000_000
-                
-                return {
-                    'success': True,
-                    'bandwidth_mbps': bandwidth_mbps,
-                    'bytes_sent': data['end']['sum_sent']['bytes'],
-                    'retransmits': data['end']['sum_sent'].get('retransmits', 0)
-                }
-            
-            return {'success': False, 'error': 'Bandwidth test failed'}
-            
-        except subprocess.TimeoutExpired:
-            if server_proc:
-                server_proc.kill()
-            return {'success': False, 'error': 'Timeout'}
         except Exception as e:
-            if server_proc:
-                server_proc.kill()
             return {'success': False, 'error': str(e)}
+        
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=deadline)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return {'success': False, 'error': 'Timeout'}
+        
+        if proc.returncode == 0:
+            return self._parse_ping_output(stdout.decode(errors='replace'), count)
+        return {'success': False, 'error': 'Ping failed'}
     
-    def check_link_health(self, source_ns, target_ip, link_id):
-        """Comprehensive link health check"""
+    async def probe_all(self, test_pairs, count=20, max_concurrency=16, deadline=15):
+        """
+        Probe every (namespace, target_ip, link_id) concurrently, at most
+        max_concurrency at a time (native probes: one thread each).
+        Returns [(pair, result)] in the order of test_pairs.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                      thread_name_prefix='probe') if self.prober_pool else None
+        
+        async def probe(source_ns, target_ip):
+            async with semaphore:
+                return await self.async_ping_test(source_ns, target_ip, count, deadline, executor)
+        
+        try:
+            results = await asyncio.gather(*(probe(ns, ip) for ns, ip, _ in test_pairs))
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+        return list(zip(test_pairs, results))
+    
+    def probe_all_concurrently(self, test_pairs, count=20, max_concurrency=16, deadline=15):
+        """Blocking wrapper around probe_all for the monitoring loops"""
+        return asyncio.run(self.probe_all(test_pairs, count, max_concurrency, deadline))
+    
+    def bandwidth_test(self, server_ns, client_ns, server_ip, duration=5, link_id=None):
+        """
+        Perform bandwidth test using iperf3 (persistent servers, at most one
+        test at a time per underlay link)
+        """
+        if self.bandwidth is None:
+            self.bandwidth = BandwidthScheduler()
+        
+        # Inventory link ids key the per-underlay serialization; the host
+        # pair is only a last resort when the namespaces belong to no site
+        link_id = (link_id or self.inventory.link_id(client_ns, server_ip)
+                   or f"{client_ns}->{server_ns}")
+        result = self.bandwidth.measure(link_id, server_ns, client_ns, server_ip, duration)
+        self._record_bandwidth(link_id, client_ns, server_ip, result)
+        return result
+    
+    def run_bandwidth_tests(self, test_pairs, duration=5):
+        """iperf3 sweep of the probe matrix: parallel across underlay links, serialized on each"""
+        if self.bandwidth is None:
+            self.bandwidth = BandwidthScheduler()
+        
+        tests = []
+        for client_ns, server_ip, link_id in test_pairs:
+            server_ns = self.inventory.namespace_of(server_ip)
+            if server_ns is None:
+                print(f"Bandwidth {link_label(link_id)}: ✗ (Target namespace not found)")
+                continue
+            tests.append((link_id, server_ns, client_ns, server_ip))
+        
+        print(f"\nBandwidth sweep: {len(tests)} links, {duration}s each")
+        for test, result in zip(tests, self.bandwidth.run(tests, duration)):
+            link_id, _, client_ns, server_ip = test
+            self._record_bandwidth(link_id, client_ns, server_ip, result)
+            if result['success']:
+                print(f"  {link_label(link_id)}: {result['bandwidth_mbps']:.2f} Mbps")
+            else:
+                print(f"  {link_label(link_id)}: ✗ ({result['error']})")
+    
+    def _record_bandwidth(self, link_id, client_ns, server_ip, result):
+        if self.exporter:
+            self.exporter.write(probe_record('bandwidth', link_id, client_ns, server_ip, result))
+        
+        if result['success']:
+            self.metrics_history[link_id]['bandwidth'].append(result['bandwidth_mbps'])
+            if self.store:
+                self.store.record(link_id, {'bandwidth': result['bandwidth_mbps']})
+            self._publish(link_id, bandwidth=result['bandwidth_mbps'])
+    
+    def _publish(self, link_id, **metrics):
+        """Send a sample to the controller feed; ids it cannot carry are reported once"""
+        if not self.feed:
+            return
+        try:
+            self.feed.publish(link_id, **metrics)
+        except ValueError as e:
+            if not self.feed_rejected[link_id]:
+                print(f"⚠️  Not published to the controller: {e}")
+            self.feed_rejected[link_id] += 1
+    
+    def check_link_health(self, source_ns, target_ip, link_id, ping_result=None):
+        """Comprehensive link health check (ping_result: already probed)"""
         print(f"\n{'='*60}")
         print(f"Link Health Check: {source_ns} -> {target_ip}")
         print(f"Link ID: {link_id} | Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -123,7 +253,10 @@ class NetworkMonitor:
         
         # Ping test
         print("Running ping test...", end=' ')
-        ping_result = self.ping_test(source_ns, target_ip, count=20)
+        if ping_result is None:
+            ping_result = self.ping_test(source_ns, target_ip, count=20)
+        if self.exporter:
+            self.exporter.write(probe_record('ping', link_id, source_ns, target_ip, ping_result))
         
         if ping_result['success']:
             latency = ping_result['latency_ms']
@@ -136,9 +269,19 @@ class NetworkMonitor:
             # Store metrics
             self.metrics_history[link_id]['latency'].append(latency)
             self.metrics_history[link_id]['loss'].append(loss)
+            rtts = [r for r in ping_result.get('rtts') or [] if r is not None]
+            self.latency_sketches.extend(link_id, rtts or [latency])
+            jitter = self._rtt_jitter(ping_result.get('rtts'))
+            if self.store:
+                self.store.record(link_id, {
+                    'latency': latency,
+                    'loss': loss,
+                    'jitter': jitter
+                })
+            self._publish(link_id, latency=latency, loss=loss, jitter=jitter)
             
             # Anomaly detection
-            self._detect_anomalies(link_id, latency, loss)
+            self._detect_anomalies(link_id, latency, loss, jitter)
             
             # Health score
             health_score = self._calculate_health_score(latency, loss)
@@ -147,9 +290,55 @@ class NetworkMonitor:
         else:
             print(f"✗ ({ping_result.get('error', 'Unknown error')})")
             self.alert_count += 1
+            self._publish(link_id, loss=100.0)
         
         print()
     
+    def check_voice_quality(self, source_ns, target_ip, link_id, duration=5, dscp=DSCP_EF):
+        """RTP-like stream (20 ms pacing) to the namespace owning target_ip: jitter, bursts, MOS"""
+        print(f"Running voice test (DSCP {dscp}, {duration}s)...", end=' ')
+        target_ns = self.inventory.namespace_of(target_ip)
+        if target_ns is None:
+            print("✗ (Target namespace not found)")
+            return {'success': False, 'error': 'Target namespace not found'}
+        
+        result = voice_test(source_ns, target_ns, target_ip, duration, dscp)
+        if self.exporter:
+            self.exporter.write(probe_record('voice', link_id, source_ns, target_ip, result))
+        if not result['success']:
+            print(f"✗ ({result.get('error', 'Unknown error')})")
+            self.alert_count += 1
+            return result
+        
+        print("✓")
+        print(f"  One-way delay: {result['one_way_delay_ms']:.2f} ms | "
+              f"Jitter (RFC 3550): {result['jitter_ms']:.2f} ms | "
+              f"Reordered: {result['reordered']}")
+        print(f"  Loss: {result['packet_loss_percent']:.1f}% in {result['loss_bursts']} bursts "
+              f"(max {result['max_burst']} packets)")
+        print(f"  MOS: {result['mos']:.2f} (R={result['r_factor']:.0f}, {mos_rating(result['mos'])})")
+        
+        self.metrics_history[link_id]['voice_jitter'].append(result['jitter_ms'])
+        self.metrics_history[link_id]['mos'].append(result['mos'])
+        if self.store:
+            self.store.record(link_id, {
+                'voice_jitter': result['jitter_ms'],
+                'voice_delay': result['one_way_delay_ms'],
+                'mos': result['mos']
+            })
+        
+        now = time.time()
+        self._observe(link_id, 'voice_jitter', result['jitter_ms'], now)
+        self._observe(link_id, 'mos', result['mos'], now)
+        return result
+    
+    def _rtt_jitter(self, rtts):
+        """Mean absolute RTT difference between consecutive replies (ms)"""
+        received = [r for r in rtts or [] if r is not None]
+        if len(received) < 2:
+            return None
+        return sum(abs(b - a) for a, b in zip(received, received[1:])) / (len(received) - 1)
+    
     def _calculate_health_score(self, latency, loss):
         """Calculate link health score (0-100)"""
         # Latency component (50% weight)
@@ -171,30 +360,26 @@ class NetworkMonitor:
         else:
             return "🔴 Poor"
     
-    def _detect_anomalies(self, link_id, current_latency, current_loss):
-        """Detect anomalies using statistical analysis"""
-        history = self.metrics_history[link_id]
-        
-        if len(history['latency']) < 10:
-            return  # Need more data points
-        
-        # Calculate statistics
-        latency_mean = statistics.mean(history['latency'])
-        latency_stdev = statistics.stdev(history['latency'])
-        
-        loss_mean = statistics.mean(history['loss'])
-        
-        # Check for latency anomaly
-        if latency_stdev > 0:
-            latency_zscore = (current_latency - latency_mean) / latency_stdev
-            if abs(latency_zscore) > self.anomaly_threshold:
-                print(f"  ⚠️  ANOMALY DETECTED: Latency spike ({current_latency:.2f}ms vs avg {latency_mean:.2f}ms)")
-                self.alert_count += 1
+    def _detect_anomalies(self, link_id, current_latency, current_loss, current_jitter=None):
+        """Detect anomalies with the streaming detectors (O(1) per sample)"""
+        now = time.time()
+        for metric, value in (('latency', current_latency), ('loss', current_loss),
+                              ('jitter', current_jitter)):
+            self._observe(link_id, metric, value, now)
+    
+    def _observe(self, link_id, metric, value, now):
+        """Feed one sample to the detectors; one alert whichever detectors agree"""
+        anomalies = self.detectors.observe(link_id, metric, value, now)
+        if not anomalies:
+            return
         
-        # Check for loss anomaly
-        if current_loss > loss_mean + 5:
-            print(f"  ⚠️  ANOMALY DETECTED: High packet loss ({current_loss:.1f}% vs avg {loss_mean:.1f}%)")
-            self.alert_count += 1
+        expected = anomalies[0].expected
+        detectors = ', '.join(a.detector for a in anomalies)
+        label, unit = ANOMALY_LABELS[metric]
+        direction = 'spike' if value > expected else 'drop'
+        print(f"  ⚠️  ANOMALY DETECTED: {label} {direction} "
+              f"({value:.2f}{unit} vs expected {expected:.2f}{unit}) [{detectors}]")
+        self.alert_count += 1
     
     def display_metrics_summary(self):
         """Display summary of all collected metrics"""
@@ -203,35 +388,61 @@ class NetworkMonitor:
         print(f"{'='*60}")
         
         for link_id, metrics in self.metrics_history.items():
-            if len(metrics['latency']) > 0:
+            if len(metrics['latency']) > 0 or len(metrics['mos']) > 0:
                 print(f"\nLink: {link_id}")
+            
+            if len(metrics['latency']) > 0:
                 print(f"  Latency: avg={statistics.mean(metrics['latency']):.2f}ms, "
                       f"min={min(metrics['latency']):.2f}ms, "
                       f"max={max(metrics['latency']):.2f}ms")
                 
-                if len(metrics['latency']) > 1:
-                    print(f"  Latency StdDev: {statistics.stdev(metrics['latency']):.2f}ms")
+                percentiles = format_percentiles(self.latency_sketches.window(link_id))
+                if percentiles:
+                    print(f"  Latency percentiles: {percentiles}")
                 
                 print(f"  Packet Loss: avg={statistics.mean(metrics['loss']):.2f}%, "
                       f"max={max(metrics['loss']):.2f}%")
+            
+            if len(metrics['mos']) > 0:
+                print(f"  Voice: MOS avg={statistics.mean(metrics['mos']):.2f}, "
+                      f"min={min(metrics['mos']):.2f} | "
+                      f"jitter avg={statistics.mean(metrics['voice_jitter']):.2f}ms")
+        
+        overall = self.latency_sketches.window(seconds=3600)
+        if overall.count:
+            print(f"\nAll links (last hour, {overall.count} samples): {format_percentiles(overall)}")
         
         print(f"\nTotal Anomalies Detected: {self.alert_count}")
+        
+        rates = self.detectors.alert_rates()
+        if rates:
+            print("Detector alert rates:")
+            for (metric, detector), rate in sorted(rates.items()):
+                print(f"  {metric:12s} {detector:10s} {rate * 100:5.1f}%")
         print(f"{'='*60}\n")
     
-    def continuous_monitoring(self, interval=15):
-        """Run continuous monitoring loop"""
+    def test_pairs(self, tunnels=False):
+        """(namespace, target_ip, link_id) for every site pair, from the inventory"""
+        return self.inventory.probe_matrix(tunnels) or DEFAULT_TEST_PAIRS
+    
+    def continuous_monitoring(self, interval=15, concurrent=False, max_concurrency=16, deadline=15,
+                              tunnels=False, voice=False, dscp=DSCP_EF, bandwidth_interval=None):
+        """
+        Run continuous monitoring loop (concurrent: probe all links at once,
+        tunnels: also probe each GRE/VXLAN tunnel between site routers,
+        voice: add a voice-quality stream per site pair,
+        bandwidth_interval: seconds between iperf3 sweeps, None for none)
+        """
         print("Starting continuous network monitoring...")
         print(f"Interval: {interval} seconds")
+        if bandwidth_interval:
+            print(f"Bandwidth sweep every {bandwidth_interval} seconds")
+        if concurrent:
+            print(f"Concurrent probing: up to {max_concurrency} probes, {deadline}s deadline")
         print("Press Ctrl+C to stop\n")
         
-        # Define test pairs (namespace, target_ip, link_id)
-        test_pairs = [
-            ('s1h1', '10.2.0.11', 'site1->site2'),
-            ('s1h1', '10.3.0.11', 'site1->site3'),
-            ('s2h1', '10.3.0.11', 'site2->site3'),
-        ]
-        
         iteration = 0
+        next_bandwidth = time.monotonic()
         try:
             while True:
                 iteration += 1
@@ -239,9 +450,25 @@ class NetworkMonitor:
                 print(f"Monitoring Iteration #{iteration} - {datetime.now().strftime('%H:%M:%S')}")
                 print(f"{'#'*60}")
                 
-                for source_ns, target_ip, link_id in test_pairs:
-                    self.check_link_health(source_ns, target_ip, link_id)
-                    time.sleep(2)
+                # Re-read every iteration: new sites are picked up without a restart
+                test_pairs = self.test_pairs(tunnels)
+                
+                if concurrent:
+                    probed = self.probe_all_concurrently(test_pairs, 20, max_concurrency, deadline)
+                    for (source_ns, target_ip, link_id), result in probed:
+                        self.check_link_health(source_ns, target_ip, link_id, result)
+                else:
+                    for source_ns, target_ip, link_id in test_pairs:
+                        self.check_link_health(source_ns, target_ip, link_id)
+                        time.sleep(2)
+                
+                if voice:
+                    self.run_voice_tests(test_pairs, dscp)
+                
+                # Saturating tests run on their own, slower cadence
+                if bandwidth_interval and time.monotonic() >= next_bandwidth:
+                    self.run_bandwidth_tests(test_pairs)
+                    next_bandwidth = time.monotonic() + bandwidth_interval
                 
                 # Display summary every 5 iterations
                 if iteration % 5 == 0:
@@ -254,47 +481,39 @@ class NetworkMonitor:
             print("\n\nMonitoring stopped by user")
             self.display_metrics_summary()
     
-    def run_comprehensive_test(self):
+    def run_voice_tests(self, test_pairs, dscp=DSCP_EF, duration=5):
+        """Voice-quality stream on each site pair (tunnel variants are skipped)"""
+        for source_ns, target_ip, link_id in test_pairs:
+            if '/' in link_id:
+                continue
+            print(f"\nVoice quality: {link_label(link_id)}")
+            self.check_voice_quality(source_ns, target_ip, link_id, duration, dscp)
+    
+    def run_comprehensive_test(self, concurrent=False, tunnels=False, voice=False, dscp=DSCP_EF,
+                               bandwidth=False, max_concurrency=16):
         """Run comprehensive one-time test"""
         print("\n" + "="*70)
         print("SD-WAN COMPREHENSIVE NETWORK TEST")
         print("="*70)
         
-        test_scenarios = [
-            {
-                'name': 'Site 1 to Site 2 Connectivity',
-                'source': 's1h1',
-                'target': '10.2.0.11',
-                'link_id': 'site1->site2'
-            },
-            {
-                'name': 'Site 1 to Site 3 Connectivity',
-                'source': 's1h1',
-                'target': '10.3.0.11',
-                'link_id': 'site1->site3'
-            },
-            {
-                'name': 'Site 2 to Site 3 Connectivity',
-                'source': 's2h1',
-                'target': '10.3.0.11',
-                'link_id': 'site2->site3'
-            },
-            {
-                'name': 'Site 2 to Site 1 (Reverse)',
-                'source': 's2h1',
-                'target': '10.1.0.11',
-                'link_id': 'site2->site1'
-            }
-        ]
+        test_pairs = self.test_pairs(tunnels)
+        print(f"Testing {len(test_pairs)} links across {len(self.inventory.sites) or 3} sites")
         
-        results = []
-        for scenario in test_scenarios:
-            self.check_link_health(
-                scenario['source'],
-                scenario['target'],
-                scenario['link_id']
-            )
-            time.sleep(1)
+        if concurrent:
+            probed = self.probe_all_concurrently(test_pairs, max_concurrency=max_concurrency)
+            for (source_ns, target_ip, link_id), result in probed:
+                self.check_link_health(source_ns, target_ip, link_id, result)
+        else:
+            for source_ns, target_ip, link_id in test_pairs:
+                print(f"\n{link_label(link_id)} Connectivity")
+                self.check_link_health(source_ns, target_ip, link_id)
+                time.sleep(1)
+        
+        if voice:
+            self.run_voice_tests(test_pairs, dscp)
+        
+        if bandwidth:
+            self.run_bandwidth_tests(test_pairs)
         
         self.display_metrics_summary()
         
@@ -309,13 +528,56 @@ class NetworkMonitor:
 
 
 def main():
-    monitor = NetworkMonitor()
+    parser = argparse.ArgumentParser(description='SD-WAN network monitor')
+    parser.add_argument('--continuous', nargs='?', type=int, const=15, metavar='INTERVAL',
+                        help='monitor continuously (default interval: 15 s)')
+    parser.add_argument('--async', dest='concurrent', action='store_true',
+                        help='probe all links concurrently')
+    parser.add_argument('--max-concurrency', type=int, default=16, metavar='N',
+                        help='probes in flight at once with --async (default: 16)')
+    parser.add_argument('--native', action='store_true',
+                        help='in-process probers instead of forking ping')
+    parser.add_argument('--tunnels', action='store_true',
+                        help='also probe each GRE/VXLAN tunnel between site routers')
+    parser.add_argument('--voice', action='store_true',
+                        help='add an RTP-like voice stream per site pair (jitter, MOS)')
+    parser.add_argument('--dscp', type=int, default=DSCP_EF,
+                        help=f'DSCP of the voice stream (default: {DSCP_EF}, EF)')
+    parser.add_argument('--bandwidth', nargs='?', type=int, const=300, metavar='INTERVAL',
+                        help='iperf3 sweep of every link (continuous: every INTERVAL s, default 300)')
+    parser.add_argument('--feed', nargs='?', const=DEFAULT_FEED_PATH, metavar='PATH',
+                        help=f'publish measurements to the controller (default: {DEFAULT_FEED_PATH})')
+    parser.add_argument('--store', metavar='DIR',
+                        help='persist link metrics in a time-series store')
+    parser.add_argument('--export', metavar='DIR',
+                        help='write every probe result to rotating files in DIR')
+    parser.add_argument('--export-format', choices=FORMATS, default='jsonl',
+                        help='export file format (parquet needs pyarrow)')
+    args = parser.parse_args()
     
-    if len(sys.argv) > 1 and sys.argv[1] == '--continuous':
-        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 15
-        monitor.continuous_monitoring(interval)
-    else:
-        monitor.run_comprehensive_test()
+    monitor = NetworkMonitor(native=args.native, store_dir=args.store, feed_path=args.feed,
+                             export_dir=args.export, export_format=args.export_format)
+    
+    try:
+        if args.continuous is not None:
+            monitor.continuous_monitoring(args.continuous, concurrent=args.concurrent,
+                                          max_concurrency=args.max_concurrency,
+                                          tunnels=args.tunnels, voice=args.voice, dscp=args.dscp,
+                                          bandwidth_interval=args.bandwidth)
+        else:
+            monitor.run_comprehensive_test(concurrent=args.concurrent, tunnels=args.tunnels,
+                                           voice=args.voice, dscp=args.dscp,
+                                           bandwidth=args.bandwidth is not None,
+                                           max_concurrency=args.max_concurrency)
+    finally:
+        if monitor.bandwidth:
+            monitor.bandwidth.close()
+        if monitor.store:
+            monitor.store.close()
+        if monitor.feed:
+            monitor.feed.close()
+        if monitor.exporter:
+            monitor.exporter.close()
 
 
 if __name__ == '__main__':
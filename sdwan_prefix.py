@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Prefix Index
+Compressed binary radix (Patricia) trie over IPv4 used to map a packet's
+destination address to the site that owns it by longest-prefix match.
+Lookups walk at most one node per prefix bit.
+"""
+
+import random
+import socket
+import sys
+import time
+
+
+def ip_to_int(ip):
+    """Dotted-quad IPv4 address to integer"""
+    return int.from_bytes(socket.inet_aton(ip), 'big')
+
+
+def int_to_ip(value):
+    """Integer to dotted-quad IPv4 address"""
+    return socket.inet_ntoa(value.to_bytes(4, 'big'))
+
+
+def parse_prefix(prefix):
+    """'10.1.0.0/24' -> (network_int, length), host bits cleared"""
+    if '/' in prefix:
+        address, length = prefix.split('/')
+        length = int(length)
+    else:
+        address, length = prefix, 32
+    if not 0 <= length <= 32:
+        raise ValueError(f"Invalid prefix length: {prefix}")
+    return ip_to_int(address) & _mask(length), length
+
+
+def _mask(length):
+    return (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+
+
+class _Node:
+    __slots__ = ('key', 'length', 'value', 'has_value', 'children')
+
+    def __init__(self, key, length):
+        self.key = key
+        self.length = length
+        self.value = None
+        self.has_value = False
+        self.children = [None, None]
+
+
+class PrefixTrie:
+    """Longest-prefix-match index: IPv4 prefix -> value"""
+    def __init__(self, entries=None):
+        self._root = _Node(0, 0)
+        self._size = 0
+        if entries:
+            self.load(entries)
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, prefix, value):
+        """Add or replace the value of a prefix such as '10.2.0.0/24'"""
+        key, length = parse_prefix(prefix)
+        if self._insert(self._root, key, length, value):
+            self._size += 1
+
+    @staticmethod
+    def _insert(root, key, length, value):
+        """Insert into the trie rooted at root; True if the prefix is new"""
+        node = root
+        while True:
+            if length == node.length:
+                is_new = not node.has_value
+                node.value = value
+                node.has_value = True
+                return is_new
+
+            bit = (key >> (31 - node.length)) & 1
+            child = node.children[bit]
+            if child is None:
+                leaf = _Node(key, length)
+                leaf.value = value
+                leaf.has_value = True
+                node.children[bit] = leaf
+                return True
+
+            common = min(length, child.length, 32 - (key ^ child.key).bit_length())
+            if common == child.length:
+                node = child
+                continue
+
+            # Split the edge at the first differing bit
+            split = _Node(key & _mask(common), common)
+            split.children[(child.key >> (31 - common)) & 1] = child
+            node.children[bit] = split
+            if common == length:
+                split.value = value
+                split.has_value = True
+            else:
+                leaf = _Node(key, length)
+                leaf.value = value
+                leaf.has_value = True
+                split.children[(key >> (31 - common)) & 1] = leaf
+            return True
+
+    def load(self, entries):
+        """
+        Bulk reload from an iterable of (prefix, value).
+        The new trie is built aside and swapped in, so concurrent lookups
+        see either the old or the new index, never a half-built one.
+        """
+        root = _Node(0, 0)
+        size = 0
+        for prefix, value in entries:
+            key, length = parse_prefix(prefix)
+            if self._insert(root, key, length, value):
+                size += 1
+        self._root, self._size = root, size
+
+    def lookup(self, ip, default=None):
+        """Value of the longest prefix containing ip"""
+        match = self.lookup_prefix(ip)
+        return default if match is None else match[1]
+
+    def lookup_prefix(self, ip):
+        """(prefix, value) of the longest prefix containing ip, or None"""
+        address = ip_to_int(ip) if isinstance(ip, str) else ip
+        node = self._root
+        best = None
+        while node is not None:
+            if (address ^ node.key) >> (32 - node.length):
+                break
+            if node.has_value:
+                best = node
+            if node.length == 32:
+                break
+            node = node.children[(address >> (31 - node.length)) & 1]
+
+        if best is None:
+            return None
+        return f"{int_to_ip(best.key)}/{best.length}", best.value
+
+    def items(self):
+        """All (prefix, value) pairs in address order"""
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.has_value:
+                yield f"{int_to_ip(node.key)}/{node.length}", node.value
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append(child)
+
+
+def benchmark(prefixes=5000, lookups=200_000):
+    """Time bulk load and lookups for a large branch deployment"""
+    rng = random.Random(3)
+    entries = [(f"10.{i // 256}.{i % 256}.0/24", f"branch{i}") for i in range(prefixes)]
+    entries += [(f"172.{16 + i % 16}.{rng.randrange(256)}.0/{rng.choice((20, 22, 28))}", f"dc{i}")
+                for i in range(prefixes // 10)]
+    addresses = [ip_to_int(f"10.{rng.randrange(prefixes // 256 + 1)}.{rng.randrange(256)}."
+                           f"{rng.randrange(1, 255)}") for _ in range(lookups)]
+
+    trie = PrefixTrie()
+    start = time.perf_counter()
+    trie.load(entries)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for address in addresses:
+        trie.lookup_prefix(address)
+    elapsed = time.perf_counter() - start
+
+    print(f"Prefixes loaded: {len(trie)} in {load * 1000:.1f} ms")
+    print(f"Lookups: {lookups} in {elapsed * 1000:.1f} ms "
+          f"({elapsed / lookups * 1_000_000:.2f} us/lookup)")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
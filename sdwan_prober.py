@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Native Prober
+In-process ICMP / UDP echo probing inside network namespaces.
+Sockets are created once per namespace by a helper thread that enters
+/var/run/netns/<ns> with setns(2) and are then reused for every probe, so a
+probe costs a few system calls instead of forking `ip netns exec ping`.
+Results use the same dict layout as NetworkMonitor.ping_test, plus the
+per-packet RTTs.
+"""
+
+import ctypes
+import os
+import random
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+
+NETNS_DIR = '/var/run/netns'
+CLONE_NEWNET = 0x40000000
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# Probe payload: send timestamp (ns) + sequence number
+PAYLOAD = struct.Struct('!QH')
+
+POLL_SLICE = 0.02  # seconds; longest wait before a probe rechecks its echoes
+
+_libc = None
+
+
+def _setns(fd):
+    """Move the calling thread into the network namespace behind fd"""
+    global _libc
+    if hasattr(os, 'setns'):
+        os.setns(fd, CLONE_NEWNET)
+        return
+    if _libc is None:
+        _libc = ctypes.CDLL(None, use_errno=True)
+    if _libc.setns(fd, CLONE_NEWNET) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def open_socket(namespace, family, sock_type, proto=0):
+    """
+    Create a socket inside a network namespace (None = current one).
+    setns only affects the calling thread, so a short-lived helper thread
+    enters the namespace; the socket stays bound to it after the thread exits.
+    """
+    if namespace is None:
+        return socket.socket(family, sock_type, proto)
+
+    result = {}
+
+    def worker():
+        try:
+            with open(os.path.join(NETNS_DIR, namespace)) as ns_file:
+                _setns(ns_file.fileno())
+            result['socket'] = socket.socket(family, sock_type, proto)
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=worker, name=f"netns-{namespace}", daemon=True)
+    thread.start()
+    thread.join()
+
+    if 'error' in result:
+        raise result['error']
+    return result['socket']
+
+
+def _checksum(data):
+    """RFC 1071 Internet checksum"""
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def summarize(rtts):
+    """Build a ping_test-style result from per-packet RTTs (None = lost)"""
+    sent = len(rtts)
+    received = [r for r in rtts if r is not None]
+    loss = (sent - len(received)) * 100.0 / sent if sent else 100.0
+
+    if not received:
+        return {'success': False, 'error': 'No reply', 'packets_sent': sent,
+                'packet_loss_percent': loss, 'rtts': rtts}
+
+    return {
+        'success': True,
+        'latency_ms': sum(received) / len(received),
+        'latency_min': min(received),
+        'latency_max': max(received),
+        'packet_loss_percent': loss,
+        'packets_sent': sent,
+        'packets_received': len(received),
+        'rtts': rtts
+    }
+
+
+class _EchoProber:
+    """
+    Send paced timestamped probes and match the echoes. Probes to several
+    targets share the socket concurrently: echoes are matched by (target,
+    sequence), whichever probe happens to read them.
+    """
+    def __init__(self, namespace=None):
+        self.namespace = namespace
+        self.sock = None
+        self.sequence = random.randrange(0x10000)
+        self.lock = threading.Lock()  # Guards sequence and in_flight
+        self.in_flight = {}  # (target, sequence) -> (rtts, slot, send time in ns, timeout in ns)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def probe(self, target_ip, count=10, interval=0.2, timeout=1.0, deadline=None):
+        """
+        Send count probes interval seconds apart; RTTs in ms. With deadline
+        (seconds), the probe returns by then with the probes sent so far.
+        """
+        return summarize(self._probe(target_ip, count, interval, timeout, deadline))
+
+    def _probe(self, target_ip, count, interval, timeout, deadline=None):
+        rtts = [None] * count
+        keys = []
+        next_send = time.monotonic()
+        stop_at = next_send + deadline if deadline is not None else float('inf')
+        last_deadline = 0
+        index = 0
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= stop_at:
+                    del rtts[index:]  # Never sent: not counted as lost
+                    break
+                if index < count and now >= next_send:
+                    with self.lock:
+                        self.sequence = (self.sequence + 1) & 0xFFFF
+                        key = (target_ip, self.sequence)
+                        send_ns = time.monotonic_ns()
+                        self.in_flight[key] = (rtts, index, send_ns, timeout * 1e9)
+                        self._send(target_ip, self.sequence, send_ns)
+                    keys.append(key)
+                    index += 1
+                    next_send = now + interval
+                    last_deadline = now + timeout
+                    continue
+
+                if index >= count and (now >= last_deadline or not any(r is None for r in rtts)):
+                    break
+
+                # Another probe may read our echoes: look at rtts again soon
+                wait = min((next_send if index < count else last_deadline) - now,
+                           stop_at - now, POLL_SLICE)
+                readable, _, _ = select.select([self.sock], [], [], max(0.0, wait))
+                if readable:
+                    self._dispatch()
+        finally:
+            with self.lock:
+                for key in keys:
+                    self.in_flight.pop(key, None)
+        return rtts
+
+    def _dispatch(self):
+        """Read every queued echo and record it in the probe that sent it"""
+        while True:
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except BlockingIOError:
+                return  # Empty, or a concurrent probe read it first
+            arrival_ns = time.monotonic_ns()
+            sequence = self._parse(data, address)
+            if sequence is None:
+                continue
+            with self.lock:
+                entry = self.in_flight.pop((address[0], sequence), None)
+            if entry is None:
+                continue  # Late reply of a finished probe
+            rtts, slot, send_ns, timeout_ns = entry
+            if arrival_ns - send_ns <= timeout_ns:
+                rtts[slot] = (arrival_ns - send_ns) / 1e6
+
+
+class ICMPProber(_EchoProber):
+    """ICMP echo prober; uses ping sockets when allowed, raw sockets otherwise"""
+    def __init__(self, namespace=None):
+        super().__init__(namespace)
+        self.identifier = random.randrange(0x10000)
+        try:
+            self.sock = open_socket(namespace, socket.AF_INET, socket.SOCK_DGRAM,
+                                    socket.IPPROTO_ICMP)
+            self.raw = False
+        except PermissionError:
+            self.sock = open_socket(namespace, socket.AF_INET, socket.SOCK_RAW,
+                                    socket.IPPROTO_ICMP)
+            self.raw = True
+        self.sock.setblocking(False)
+
+    def _send(self, target_ip, sequence, send_ns):
+        payload = PAYLOAD.pack(send_ns, sequence)
+        header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, self.identifier, sequence)
+        checksum = _checksum(header + payload)
+        header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, self.identifier, sequence)
+        self.sock.sendto(header + payload, (target_ip, 0))
+
+    def _parse(self, data, address):
+        """Sequence number of an echo reply, None for anything else"""
+        if self.raw:
+            data = data[(data[0] & 0x0F) * 4:]  # Strip the IP header
+        if len(data) < 8:
+            return None
+
+        icmp_type, _, _, identifier, sequence = struct.unpack('!BBHHH', data[:8])
+        if icmp_type != ICMP_ECHO_REPLY:
+            return None
+        # Ping sockets rewrite the identifier; the kernel already filtered
+        if self.raw and identifier != self.identifier:
+            return None
+        return sequence
+
+
+class UDPProber(_EchoProber):
+    """UDP echo prober against an echo responder (see UDPEchoResponder)"""
+    def __init__(self, namespace=None, port=7):
+        super().__init__(namespace)
+        self.port = port
+        self.sock = open_socket(namespace, socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def _send(self, target_ip, sequence, send_ns):
+        self.sock.sendto(PAYLOAD.pack(send_ns, sequence), (target_ip, self.port))
+
+    def _parse(self, data, address):
+        if len(data) < PAYLOAD.size:
+            return None
+        return PAYLOAD.unpack(data[:PAYLOAD.size])[1]
+
+
+class UDPEchoResponder:
+    """Echo UDP datagrams back to their sender from inside a namespace"""
+    def __init__(self, namespace=None, port=7, address='0.0.0.0'):
+        self.sock = open_socket(namespace, socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((address, port))
+        self.sock.settimeout(0.5)
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True,
+                                       name=f"udp-echo-{namespace}")
+        self.thread.start()
+
+    def _serve(self):
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.sock.sendto(data, address)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+
+class ProberPool:
+    """Long-lived probers, one per (namespace, kind)"""
+    def __init__(self):
+        self.probers = {}
+        self.lock = threading.Lock()
+
+    def get(self, namespace, kind='icmp', port=7):
+        key = (namespace, kind, port if kind == 'udp' else None)
+        with self.lock:
+            prober = self.probers.get(key)
+            if prober is None:
+                prober = ICMPProber(namespace) if kind == 'icmp' else UDPProber(namespace, port)
+                self.probers[key] = prober
+            return prober
+
+    def ping(self, namespace, target_ip, count=10, interval=0.2, timeout=1.0, kind='icmp',
+             deadline=None):
+        """Probe target_ip from namespace with a pooled prober"""
+        return self.get(namespace, kind).probe(target_ip, count, interval, timeout, deadline)
+
+    def close(self):
+        with self.lock:
+            for prober in self.probers.values():
+                prober.close()
+            self.probers.clear()
+
+
+if __name__ == '__main__':
+    # Usage: sdwan_prober.py <target_ip> [namespace] [count]
+    target = sys.argv[1] if len(sys.argv) > 1 else '127.0.0.1'
+    ns = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != '-' else None
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    pool = ProberPool()
+    start = time.perf_counter()
+    result = pool.ping(ns, target, count=count, interval=0.05)
+    elapsed = time.perf_counter() - start
+    rtts = ', '.join('lost' if r is None else f"{r:.3f}" for r in result['rtts'])
+    print(f"{ns or 'default'} -> {target}: {result.get('packet_loss_percent', 100):.1f}% loss")
+    print(f"  RTTs (ms): {rtts}")
+    print(f"  Probe run: {elapsed * 1000:.1f} ms for {count} packets")
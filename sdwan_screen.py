@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Screen Renderer
+Differential curses output for the dashboard. The screen is a stack of
+panels, each in its own window holding the rows it last drew. A panel is
+rebuilt only when its data version changes, only the rows that differ are
+rewritten, and every changed window reaches the terminal in one doupdate().
+"""
+
+import curses
+import os
+import pty
+import select
+import sys
+
+FILL = -1  # Panel height: whatever rows the other panels leave
+FILL_MIN_ROWS = 5  # A FILL panel keeps these; panels below it are dropped first
+
+
+class Panel:
+    """One window of the screen; rows are tuples of (col, text, attr) segments"""
+    def __init__(self, name):
+        self.name = name
+        self.window = None
+        self.top = self.height = self.width = None
+        self.rows = []       # Rows currently on screen
+        self.version = None  # Data version they were built from
+        self.content = []    # Rows last built, possibly taller than the window
+        self.built_version = None
+
+    def place(self, top, height, width):
+        """(Re)create the window if the layout moved or resized it"""
+        if self.window is not None and (top, height, width) == (self.top, self.height, self.width):
+            return
+        if (height, width) != (self.height, self.width):
+            self.built_version = None  # Content may depend on the size (pages, centering)
+        self.window = curses.newwin(height, width, top, 0)
+        self.top, self.height, self.width = top, height, width
+        self.rows = []
+        self.version = None
+
+    def build(self, version, build):
+        """Rows for version, calling build() only when the version changed"""
+        if version != self.built_version:
+            self.content = [tuple(row) for row in build()]
+            self.built_version = version
+        return self.content
+
+    def draw(self, rows):
+        """Rewrite the rows that differ from the previous frame; count of rows written"""
+        rows = rows[:self.height]
+        written = 0
+        for y in range(max(len(rows), len(self.rows))):
+            row = rows[y] if y < len(rows) else ()
+            if y < len(self.rows) and self.rows[y] == row:
+                continue
+            self.window.move(y, 0)
+            self.window.clrtoeol()
+            for col, text, attr in row:
+                self._put(y, col, text, attr)
+            written += 1
+        self.rows = rows
+        return written
+
+    def _put(self, y, col, text, attr):
+        room = self.width - col
+        if room <= 0:
+            return
+        try:
+            self.window.addnstr(y, col, text, room, attr)
+        except curses.error:
+            pass  # Writing the bottom-right cell moves the cursor off the window
+
+
+class Screen:
+    """Stacks panels from the top (and a footer from the bottom), clipped to the terminal"""
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.stats = {'frames': 0, 'panels_drawn': 0, 'rows_written': 0}
+        self.invalidated = False
+        self.layout = None  # (panel name, top, rows) of the last frame
+
+    def resize(self):
+        """After KEY_RESIZE: forget every window and repaint from scratch"""
+        curses.update_lines_cols()
+        self.stdscr.clear()
+        self.stdscr.noutrefresh()
+        self.invalidated = True
+        self.layout = None
+
+    def frame(self, panels, footer=()):
+        """
+        Draw one frame. panels and footer are lists of
+        (panel, height, version, build); build() returns the rows and is only
+        called when version changed. height None sizes the panel to its rows;
+        one panel may be FILL: it is placed before being built, so build()
+        can read panel.height. Panels that do not fit are not shown.
+        """
+        height, width = self.stdscr.getmaxyx()
+        if self.invalidated:
+            for panel, *_ in list(panels) + list(footer):
+                panel.window = None
+            self.invalidated = False
+
+        panels = [(panel, len(panel.build(version, build)) if rows is None else rows, version, build)
+                  for panel, rows, version, build in panels]
+        footer = [(panel, len(panel.build(version, build)) if rows is None else rows, version, build)
+                  for panel, rows, version, build in footer]
+
+        bottom = height - sum(spec[1] for spec in footer)
+        fixed = sum(spec[1] for spec in panels if spec[1] != FILL)
+        filling = panels
+        panels = [(panel, max(FILL_MIN_ROWS, bottom - fixed) if rows == FILL else rows,
+                   version, build)
+                  for panel, rows, version, build in panels]
+        placed = []
+        top = 0
+        # Panels above the FILL panel leave it its minimum rows
+        reserve = FILL_MIN_ROWS if any(rows == FILL for _, rows, _, _ in filling) else 0
+        for spec, (_, requested, _, _) in zip(panels, filling):
+            if spec[1] <= 0:
+                continue  # Nothing to show this frame
+            if requested == FILL:
+                reserve = 0
+            rows = min(spec[1], bottom - top - reserve)
+            if rows <= 0:
+                continue  # Does not fit
+            placed.append((spec, top, rows))
+            top += rows
+        for spec in footer:
+            if bottom >= 0 and bottom + spec[1] <= height:
+                placed.append((spec, bottom, spec[1]))
+            bottom += spec[1]
+
+        # Panels moved, appeared or vanished: blank the screen once and repaint
+        # every panel, so nothing of a panel no longer shown stays behind
+        layout = tuple((spec[0].name, top, rows) for spec, top, rows in placed)
+        relayout = layout != self.layout
+        if relayout:
+            self.layout = layout
+            self.stdscr.erase()
+            self.stdscr.noutrefresh()
+
+        for (panel, _, version, build), top, rows in placed:
+            panel.place(top, rows, width)
+            if version != panel.version:
+                self.stats['rows_written'] += panel.draw(panel.build(version, build))
+                self.stats['panels_drawn'] += 1
+                panel.version = version
+            elif not relayout:
+                continue
+            if relayout:
+                panel.window.touchwin()
+            panel.window.noutrefresh()
+
+        curses.doupdate()
+        self.stats['frames'] += 1
+
+
+class ListView:
+    """Cursor and scroll offset over a list; only visible() needs rendering"""
+    def __init__(self):
+        self.items = []
+        self.offset = 0
+        self.cursor = 0
+        self.page = 1  # Visible rows, set by the renderer
+
+    def set_items(self, items):
+        """New items; the cursor keeps its position (not its item) in the list"""
+        self.items = items
+        self.move(0)
+
+    def set_page(self, rows):
+        self.page = max(1, rows)
+        self.move(0)
+
+    def move(self, delta):
+        """Move the cursor, scrolling just enough to keep it visible"""
+        last = max(0, len(self.items) - 1)
+        self.cursor = max(0, min(last, self.cursor + delta))
+        if self.cursor < self.offset:
+            self.offset = self.cursor
+        elif self.cursor >= self.offset + self.page:
+            self.offset = self.cursor - self.page + 1
+        self.offset = max(0, min(self.offset, max(0, len(self.items) - self.page)))
+
+    def key(self, key):
+        """Handle a navigation key; True if it was one"""
+        moves = {curses.KEY_UP: -1, ord('k'): -1, curses.KEY_DOWN: 1, ord('j'): 1,
+                 curses.KEY_PPAGE: -self.page, curses.KEY_NPAGE: self.page,
+                 curses.KEY_HOME: -len(self.items), ord('g'): -len(self.items),
+                 curses.KEY_END: len(self.items), ord('G'): len(self.items)}
+        if key not in moves:
+            return False
+        self.move(moves[key])
+        return True
+
+    def visible(self):
+        """(index, item) of the rows on screen"""
+        return list(enumerate(self.items[self.offset:self.offset + self.page], start=self.offset))
+
+    def current(self):
+        return self.items[self.cursor] if self.items else None
+
+
+def _demo(stdscr, mode, frames):
+    """Mostly static 40-row screen with a ticking clock"""
+    curses.curs_set(0)
+    static = [f"  ● site{i % 30 + 1}->site{(i + 7) % 30 + 1}   Latency: {10 + i % 9:6.2f}ms  Loss:  0.0%"
+              for i in range(36)]
+    if mode == 'full':
+        for frame in range(frames):
+            stdscr.clear()
+            stdscr.addstr(0, 2, f"SD-WAN DASHBOARD  frame {frame}")
+            for y, line in enumerate(static, start=2):
+                stdscr.addstr(y, 0, line)
+            stdscr.refresh()
+        return
+
+    screen = Screen(stdscr)
+    header, body = Panel('header'), Panel('body')
+    for frame in range(frames):
+        screen.frame([
+            (header, 2, frame, lambda: [[(2, f"SD-WAN DASHBOARD  frame {frame}", 0)]]),
+            (body, len(static), 1, lambda: [[(0, line, 0)] for line in static]),
+        ])
+
+
+def _terminal_bytes(mode, frames):
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.environ.update(TERM='xterm-256color', LINES='45', COLUMNS='100')
+        curses.wrapper(_demo, mode, frames)
+        os._exit(0)
+    total = 0
+    while True:
+        if not select.select([fd], [], [], 5)[0]:
+            break
+        try:
+            data = os.read(fd, 65536)
+        except OSError:
+            break
+        if not data:
+            break
+        total += len(data)
+    os.waitpid(pid, 0)
+    return total
+
+
+def benchmark(frames=100):
+    """Terminal bytes for a mostly static screen: clear() each frame vs panels"""
+    full = _terminal_bytes('full', frames)
+    diff = _terminal_bytes('diff', frames)
+    print(f"{frames} frames: clear+redraw {full / frames:.0f} bytes/frame, "
+          f"differential {diff / frames:.0f} bytes/frame ({full / max(diff, 1):.0f}x less)")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
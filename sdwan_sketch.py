@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Quantile Sketches
+DDSketch-style log-bucketed histograms: every quantile is returned within a
+fixed relative error (1% by default), memory is capped by collapsing the
+lowest buckets (the tail the SLAs care about stays exact to the bound), and
+two sketches with the same accuracy merge by adding bucket counts. Sketches
+are kept per link and per time bucket so percentiles can be computed over
+any window, for one link or merged across links.
+"""
+
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+
+DEFAULT_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 2048
+MIN_VALUE = 1e-3  # Values below (e.g. 0 ms) are counted in the zero bin
+
+PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch over positive values"""
+    __slots__ = ('accuracy', 'gamma', 'log_gamma', 'max_bins', 'bins',
+                 'zero_count', 'count', 'total', 'min', 'max')
+
+    def __init__(self, accuracy=DEFAULT_ACCURACY, max_bins=DEFAULT_MAX_BINS):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins = {}  # bin index -> count; bin i covers (gamma^(i-1), gamma^i]
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value, weight=1):
+        if value is None:
+            return
+        self.count += weight
+        self.total += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        if value < MIN_VALUE:
+            self.zero_count += weight
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        bins = self.bins
+        bins[index] = bins.get(index, 0) + weight
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def _collapse(self):
+        """Fold the lowest bins together until the cap holds"""
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        folded = sum(self.bins.pop(i) for i in indexes[:excess])
+        self.bins[target] += folded
+
+    def merge(self, other):
+        """Add other's counts into this sketch (same accuracy required)"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        bins = self.bins
+        for index, count in other.bins.items():
+            bins[index] = bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(bins) > self.max_bins:
+            self._collapse()
+        return self
+
+    def copy(self):
+        clone = QuantileSketch(self.accuracy, self.max_bins)
+        return clone.merge(self)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, qs=PERCENTILES):
+        """Values at the given quantiles (one pass over the sorted bins)"""
+        if not self.count:
+            return [None] * len(qs)
+
+        ranks = sorted((q * (self.count - 1), position) for position, q in enumerate(qs))
+        results = [None] * len(qs)
+        pending = iter(ranks)
+        rank, position = next(pending)
+
+        seen = self.zero_count
+        while seen > rank:
+            results[position] = max(self.min, 0.0)
+            rank, position = next(pending, (None, None))
+            if rank is None:
+                return results
+
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            while seen > rank:
+                # Bin midpoint in relative terms: within accuracy of any value in it
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                results[position] = min(max(value, self.min), self.max)
+                rank, position = next(pending, (None, None))
+                if rank is None:
+                    return results
+
+        for _, position in [(rank, position)] + list(pending):
+            results[position] = self.max
+        return results
+
+    def percentiles(self):
+        """{'p50', 'p90', 'p99', 'p99.9'} -> value"""
+        return dict(zip(('p50', 'p90', 'p99', 'p99.9'), self.quantiles(PERCENTILES)))
+
+
+class SketchStore:
+    """
+    Sketches per (link, time bucket), keeping the last `buckets` buckets.
+    Windows and link groups are answered by merging bucket sketches.
+    """
+    def __init__(self, bucket_seconds=60, buckets=60, accuracy=DEFAULT_ACCURACY,
+                 max_bins=DEFAULT_MAX_BINS):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.accuracy = accuracy
+        self.max_bins = max_bins
+        self.sketches = defaultdict(dict)  # link_id -> {bucket start: QuantileSketch}
+
+    def _bucket(self, timestamp):
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+    def add(self, link_id, value, timestamp=None):
+        self.extend(link_id, (value,), timestamp)
+
+    def extend(self, link_id, values, timestamp=None):
+        """Add several samples of one link taken at the same time"""
+        bucket = self._bucket(time.time() if timestamp is None else timestamp)
+        per_link = self.sketches[link_id]
+        sketch = per_link.get(bucket)
+        if sketch is None:
+            sketch = per_link[bucket] = QuantileSketch(self.accuracy, self.max_bins)
+            self._expire(per_link, bucket)
+        sketch.extend(values)
+
+    def _expire(self, per_link, newest):
+        oldest = newest - (self.buckets - 1) * self.bucket_seconds
+        for bucket in [b for b in per_link if b < oldest]:
+            del per_link[bucket]
+
+    def links(self):
+        return list(self.sketches)
+
+    def window(self, links=None, seconds=None, now=None):
+        """
+        Merged sketch of the given links (None = all) over the last `seconds`
+        (None = everything retained).
+        """
+        if links is None:
+            links = self.sketches.keys()
+        elif isinstance(links, str):
+            links = (links,)
+        start = None
+        if seconds is not None:
+            start = self._bucket((time.time() if now is None else now) - seconds)
+
+        merged = QuantileSketch(self.accuracy, self.max_bins)
+        for link_id in links:
+            for bucket, sketch in self.sketches.get(link_id, {}).items():
+                if start is None or bucket >= start:
+                    merged.merge(sketch)
+        return merged
+
+    def percentiles(self, links=None, seconds=None):
+        return self.window(links, seconds).percentiles()
+
+
+def format_percentiles(sketch, unit='ms'):
+    """'p50=1.23 p90=... p99=... p99.9=...' or '' when empty"""
+    if not sketch.count:
+        return ''
+    return ' '.join(f"{name}={value:.2f}{unit}" for name, value in sketch.percentiles().items())
+
+
+def benchmark(samples=200_000):
+    """Accuracy against exact percentiles, memory and merge cost"""
+    rng = random.Random(9)
+    # Mostly ~20 ms with a heavy tail of congestion spikes
+    values = [rng.lognormvariate(3, 0.3) if rng.random() > 0.02 else rng.uniform(100, 800)
+              for _ in range(samples)]
+
+    start = time.perf_counter()
+    parts = [QuantileSketch() for _ in range(8)]
+    for i, value in enumerate(values):
+        parts[i % 8].add(value)
+    add_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    merged = QuantileSketch()
+    for part in parts:
+        merged.merge(part)
+    merge_time = time.perf_counter() - start
+
+    exact = sorted(values)
+    print(f"{samples} samples: {add_time / samples * 1e6:.2f} us/add, "
+          f"merge of 8 sketches {merge_time * 1000:.2f} ms, {len(merged.bins)} bins")
+    for q, estimate in zip(PERCENTILES, merged.quantiles(PERCENTILES)):
+        truth = exact[int(q * (samples - 1))]
+        print(f"  p{q * 100:g}: {estimate:8.3f} ms (exact {truth:8.3f}, "
+              f"error {abs(estimate - truth) / truth * 100:.2f}%)")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Controller State
+Line-delimited JSON over TCP between the controller and its local readers
+(the chatbot). A reader sends a query name per line ('state' or one of its
+sections) and gets one JSON document per line: connected datapaths, path
+metrics, active flows per class and controller counters. One persistent
+connection replaces a docker ps and an ovs-ofctl per bridge per question.
+StateServer is a stand-in serving any state function, for tests.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_STATE_ADDR = os.environ.get('SDWAN_STATE_ADDR', '127.0.0.1:6699')
+QUERY_TIMEOUT = 2.0  # seconds
+
+FLOW_CLASSES = {0: 'normal', 1: 'high', 2: 'critical'}  # FlowEntry.priority
+
+
+def parse_address(address):
+    """'host:port' or 'port' -> (host, port); the host defaults to loopback"""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def serve_connection(sock, state):
+    """
+    Answer queries on one connection until the peer closes it. state()
+    returns the full document; a section query returns {section: ...}.
+    """
+    reader = sock.makefile('rb')
+    try:
+        for line in reader:
+            query = line.strip().decode(errors='replace') or 'state'
+            document = state()
+            if query != 'state':
+                document = ({query: document[query]} if query in document
+                            else {'error': f"unknown query: {query}"})
+            sock.sendall(json.dumps(document, separators=(',', ':')).encode() + b'\n')
+    except OSError:
+        pass  # Reader went away
+    finally:
+        reader.close()
+        sock.close()
+
+
+class ControllerStateClient:
+    """Persistent connection to the controller's state server; OSError when unavailable"""
+    def __init__(self, address=DEFAULT_STATE_ADDR, timeout=QUERY_TIMEOUT):
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.lock = threading.Lock()
+
+    def query(self, what='state'):
+        with self.lock:
+            try:
+                if self.sock is None:
+                    self.sock = socket.create_connection(self.address, timeout=self.timeout)
+                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self.reader = self.sock.makefile('rb')
+                self.sock.sendall(what.encode() + b'\n')
+                line = self.reader.readline()
+                if not line:
+                    raise ConnectionError("State server closed the connection")
+            except OSError:
+                self._drop()
+                raise
+        document = json.loads(line)
+        if 'error' in document:
+            raise ValueError(document['error'])
+        return document
+
+    def _drop(self):
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+        self.sock = self.reader = None
+
+    def close(self):
+        with self.lock:
+            self._drop()
+
+
+class _StateHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        serve_connection(self.request, self.server.state)
+
+
+class StateServer(socketserver.ThreadingTCPServer):
+    """Stand-in for the controller's state server, serving state() on a thread per connection"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, state):
+        super().__init__(parse_address(address) if isinstance(address, str) else address,
+                         _StateHandler)
+        self.state = state
+
+
+def sample_state(sites=3):
+    """A state document shaped like SDWANController.get_state(), for the stand-in"""
+    now = time.time()
+    names = [f"site{i}" for i in range(1, sites + 1)]
+    return {
+        'timestamp': now,
+        'uptime_seconds': 3600.0,
+        'datapaths': [{'dpid': i, 'name': f"br-{site}", 'site': site, 'ports': 4, 'rules': 6}
+                      for i, site in enumerate(names, start=1)] +
+                     [{'dpid': sites + 1, 'name': 'br-wan', 'site': None,
+                       'ports': 2 * sites, 'rules': 2}],
+        'paths': [{'src': i, 'dst': j, 'src_site': a, 'dst_site': b,
+                   'path_id': f"{i}-{j}-{tunnel}", 'tunnel': tunnel,
+                   'latency_ms': 10.0 + i + j, 'packet_loss_percent': 0.0,
+                   'bandwidth_used_mbps': 5.0, 'bandwidth_total_mbps': 100.0,
+                   'available': True, 'score': 90.0, 'packet_count': 0, 'byte_count': 0,
+                   'last_update': now}
+                  for i, a in enumerate(names, start=1) for j, b in enumerate(names, start=1)
+                  if i != j for tunnel in ('gre', 'vxlan')],
+        'flows': {'active': 12, 'by_class': {'normal': 8, 'high': 3, 'critical': 1}},
+        'stats': {'total_flows': 40, 'path_switches': 3, 'failovers': 1, 'packets_forwarded': 900,
+                  'elephant_reroutes': 0, 'flows_expired': 28, 'active_elephants': 0},
+    }
+
+
+def benchmark(queries=2000):
+    """One state query vs the process spawns the chatbot ran for the same answer"""
+    for sites in (3, 30):
+        document = sample_state(sites)
+        server = StateServer(('127.0.0.1', 0), lambda: document)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = ControllerStateClient(f"127.0.0.1:{server.server_address[1]}")
+
+        client.query()
+        rounds = max(1, queries // sites)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            state = client.query()
+        per_query = (time.perf_counter() - start) / rounds
+        client.close()
+        server.shutdown()
+        server.server_close()
+        print(f"State query, {len(state['datapaths'])} datapaths and {len(state['paths'])} paths: "
+              f"{per_query * 1e6:.0f} us")
+
+    # docker ps + ovs-ofctl for 4 bridges + ovs-vsctl: six shells, here running `true`
+    spawns = 20
+    start = time.perf_counter()
+    for _ in range(spawns):
+        for _ in range(6):
+            subprocess.run('true', shell=True, capture_output=True)
+    per_answer = (time.perf_counter() - start) / spawns
+    print(f"6 shell spawns of `true`: {per_answer * 1e6:.0f} us, before the real commands do any work")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'stand-in':
+        # python3 sdwan_state.py stand-in [HOST:]PORT: serve sample_state() for tests
+        address = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STATE_ADDR
+        print(f"Stand-in controller state on {address}")
+        StateServer(address, sample_state).serve_forever()
+    else:
+        benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Topology Graph
+Switch/link graph built from LLDP discovery, with cached k-shortest paths
+(Yen's algorithm) per switch pair. A link change only invalidates the
+pairs whose cached paths it can actually affect.
+"""
+
+import heapq
+import itertools
+import random
+import sys
+import time
+
+
+class Path:
+    """Loop-free path as a sequence of (src_dpid, out_port, dst_dpid) hops"""
+    def __init__(self, src, hops, cost):
+        self.src = src
+        self.hops = tuple(hops)
+        self.cost = cost
+
+    @property
+    def dpids(self):
+        """Switches traversed, in order"""
+        return (self.src,) + tuple(hop[2] for hop in self.hops)
+
+    @property
+    def path_id(self):
+        """Stable identifier, e.g. '1:3>4:2>2'"""
+        return '>'.join(f"{u}:{port}" for u, port, _ in self.hops) + f">{self.dpids[-1]}"
+
+    def edges(self):
+        """Directed edge keys (dpid, out_port) used by the path"""
+        return [(u, port) for u, port, _ in self.hops]
+
+    def __eq__(self, other):
+        return isinstance(other, Path) and self.src == other.src and self.hops == other.hops
+
+    def __hash__(self):
+        return hash((self.src, self.hops))
+
+    def __repr__(self):
+        return f"Path({self.path_id}, cost={self.cost})"
+
+
+class TopologyGraph:
+    """Directed multigraph of switches with a per-pair k-shortest-path cache"""
+    def __init__(self, k=4):
+        self.k = k
+
+        # dpid -> {out_port: (dst_dpid, dst_port, weight)}
+        self.links = {}
+
+        # (src, dst) -> [Path]
+        self._cache = {}
+
+        # (dpid, out_port) -> {(src, dst)} of cached pairs using that edge
+        self._edge_users = {}
+
+        self.recomputations = 0
+
+    # ------------------------------------------------------------------
+    # Graph mutation
+    # ------------------------------------------------------------------
+
+    def add_switch(self, dpid):
+        """Register a switch with no links"""
+        self.links.setdefault(dpid, {})
+
+    def add_link(self, src, src_port, dst, dst_port, weight=1):
+        """Add or update a directed link; returns True if the graph changed"""
+        self.add_switch(src)
+        self.add_switch(dst)
+
+        current = self.links[src].get(src_port)
+        if current == (dst, dst_port, weight):
+            return False
+
+        if current is not None:
+            # Moved or re-weighted link: drop the old one first
+            self.remove_link(src, src_port)
+
+        self.links[src][src_port] = (dst, dst_port, weight)
+        self._invalidate_for_new_edge(src, dst, weight)
+        return True
+
+    def remove_link(self, src, src_port):
+        """Remove a directed link; returns True if it existed"""
+        if self.links.get(src, {}).pop(src_port, None) is None:
+            return False
+
+        for pair in self._edge_users.pop((src, src_port), set()):
+            self._invalidate(pair)
+        return True
+
+    def remove_switch(self, dpid):
+        """Remove a switch and every link touching it"""
+        for port in list(self.links.get(dpid, {})):
+            self.remove_link(dpid, port)
+
+        for src, ports in list(self.links.items()):
+            for port, (dst, _, _) in list(ports.items()):
+                if dst == dpid:
+                    self.remove_link(src, port)
+
+        self.links.pop(dpid, None)
+        for pair in [p for p in self._cache if dpid in p]:
+            self._invalidate(pair)
+
+    def link_ports(self, dpid):
+        """Ports of a switch that have a discovered link"""
+        return set(self.links.get(dpid, {}))
+
+    # ------------------------------------------------------------------
+    # Path queries
+    # ------------------------------------------------------------------
+
+    def k_shortest_paths(self, src, dst, k=None):
+        """Cached k shortest loop-free paths from src to dst"""
+        if k is not None and k != self.k:
+            return self._yen(src, dst, k)  # Not cached: off the default depth
+
+        pair = (src, dst)
+        paths = self._cache.get(pair)
+        if paths is None:
+            paths = self._yen(src, dst, self.k)
+            self.recomputations += 1
+            self._store(pair, paths)
+        return paths
+
+    def is_cached(self, src, dst):
+        """True if the pair has a valid cached result"""
+        return (src, dst) in self._cache
+
+    # ------------------------------------------------------------------
+    # Cache maintenance
+    # ------------------------------------------------------------------
+
+    def _store(self, pair, paths):
+        self._cache[pair] = paths
+        for path in paths:
+            for edge in path.edges():
+                self._edge_users.setdefault(edge, set()).add(pair)
+
+    def _invalidate(self, pair):
+        paths = self._cache.pop(pair, None)
+        if not paths:
+            return
+        for path in paths:
+            for edge in path.edges():
+                users = self._edge_users.get(edge)
+                if users:
+                    users.discard(pair)
+                    if not users:
+                        del self._edge_users[edge]
+
+    def _invalidate_for_new_edge(self, u, v, weight):
+        """
+        A new edge u->v can only change a pair (s, t) if the cheapest path
+        through it, d(s, u) + w + d(v, t), beats the pair's k-th cached path.
+        """
+        if not self._cache:
+            return
+
+        to_u = self._dijkstra_all(u, reverse=True)
+        from_v = self._dijkstra_all(v)
+
+        for (s, t), paths in list(self._cache.items()):
+            if s not in to_u or t not in from_v:
+                continue
+            bound = to_u[s] + weight + from_v[t]
+            limit = paths[-1].cost if len(paths) >= self.k else float('inf')
+            if bound < limit:
+                self._invalidate((s, t))
+
+    # ------------------------------------------------------------------
+    # Algorithms
+    # ------------------------------------------------------------------
+
+    def _dijkstra_all(self, source, reverse=False):
+        """Distances from source (or to source when reverse=True)"""
+        if reverse:
+            adjacency = {}
+            for u, ports in self.links.items():
+                for dst, _, weight in ports.values():
+                    adjacency.setdefault(dst, []).append((u, weight))
+        else:
+            adjacency = {
+                u: [(dst, weight) for dst, _, weight in ports.values()]
+                for u, ports in self.links.items()
+            }
+
+        dist = {source: 0}
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist.get(u, float('inf')):
+                continue
+            for v, weight in adjacency.get(u, ()):
+                nd = d + weight
+                if nd < dist.get(v, float('inf')):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return dist
+
+    def _shortest_path(self, src, dst, banned_nodes=(), banned_edges=()):
+        """Dijkstra returning (cost, hops) or None"""
+        dist = {src: 0}
+        prev = {}
+        counter = itertools.count()
+        heap = [(0, next(counter), src)]
+
+        while heap:
+            d, _, u = heapq.heappop(heap)
+            if u == dst:
+                hops = []
+                while u != src:
+                    hop = prev[u]
+                    hops.append(hop)
+                    u = hop[0]
+                return d, hops[::-1]
+            if d > dist.get(u, float('inf')):
+                continue
+            for port, (v, _, weight) in self.links.get(u, {}).items():
+                if v in banned_nodes or (u, port) in banned_edges:
+                    continue
+                nd = d + weight
+                if nd < dist.get(v, float('inf')):
+                    dist[v] = nd
+                    prev[v] = (u, port, v)
+                    heapq.heappush(heap, (nd, next(counter), v))
+        return None
+
+    def _hop_cost(self, hops):
+        return sum(self.links[u][port][2] for u, port, _ in hops)
+
+    def _yen(self, src, dst, k):
+        """Yen's k shortest loop-free paths"""
+        if src not in self.links or dst not in self.links:
+            return []
+        if src == dst:
+            return [Path(src, [], 0)]
+
+        first = self._shortest_path(src, dst)
+        if first is None:
+            return []
+
+        accepted = [Path(src, first[1], first[0])]
+        candidates = []
+        seen = {accepted[0].hops}
+        counter = itertools.count()
+
+        while len(accepted) < k:
+            last = accepted[-1]
+            nodes = last.dpids
+
+            for i in range(len(last.hops)):
+                spur_node = nodes[i]
+                root = last.hops[:i]
+
+                banned_edges = {
+                    (p.hops[i][0], p.hops[i][1])
+                    for p in accepted
+                    if len(p.hops) > i and p.hops[:i] == root
+                }
+                banned_nodes = set(nodes[:i])
+
+                spur = self._shortest_path(spur_node, dst, banned_nodes, banned_edges)
+                if spur is None:
+                    continue
+
+                hops = root + tuple(spur[1])
+                if hops in seen:
+                    continue
+                seen.add(hops)
+                cost = self._hop_cost(root) + spur[0]
+                heapq.heappush(candidates, (cost, next(counter), hops))
+
+            if not candidates:
+                break
+            cost, _, hops = heapq.heappop(candidates)
+            accepted.append(Path(src, hops, cost))
+
+        return accepted
+
+
+def _build_benchmark_topology(switches=50, sites=10, seed=7):
+    """Ring plus random chords, with parallel GRE/VXLAN-style tunnels"""
+    rng = random.Random(seed)
+    graph = TopologyGraph(k=4)
+    next_port = {dpid: 1 for dpid in range(1, switches + 1)}
+
+    def connect(a, b, weight):
+        pa, pb = next_port[a], next_port[b]
+        next_port[a] += 1
+        next_port[b] += 1
+        graph.add_link(a, pa, b, pb, weight)
+        graph.add_link(b, pb, a, pa, weight)
+
+    for dpid in range(1, switches + 1):
+        connect(dpid, dpid % switches + 1, rng.randint(1, 5))
+    for _ in range(switches):
+        a, b = rng.sample(range(1, switches + 1), 2)
+        connect(a, b, rng.randint(1, 10))
+        connect(a, b, rng.randint(1, 10))  # Second tunnel between the same pair
+
+    site_dpids = rng.sample(range(1, switches + 1), sites)
+    return graph, site_dpids
+
+
+def benchmark(switches=50, sites=10):
+    """Time full and incremental recomputation on a synthetic topology"""
+    graph, site_dpids = _build_benchmark_topology(switches, sites)
+    pairs = [(s, t) for s in site_dpids for t in site_dpids if s != t]
+
+    start = time.perf_counter()
+    for s, t in pairs:
+        graph.k_shortest_paths(s, t)
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for s, t in pairs:
+        graph.k_shortest_paths(s, t)
+    cached = time.perf_counter() - start
+
+    # Fail a link used by some cached path, then recompute what was invalidated
+    src, port, _ = graph.k_shortest_paths(*pairs[0])[0].hops[0]
+    dst, dst_port, weight = graph.links[src][port]
+    before = graph.recomputations
+    start = time.perf_counter()
+    graph.remove_link(src, port)
+    for s, t in pairs:
+        graph.k_shortest_paths(s, t)
+    removal = time.perf_counter() - start
+    removal_pairs = graph.recomputations - before
+
+    before = graph.recomputations
+    start = time.perf_counter()
+    graph.add_link(src, port, dst, dst_port, weight)
+    for s, t in pairs:
+        graph.k_shortest_paths(s, t)
+    restore = time.perf_counter() - start
+    restore_pairs = graph.recomputations - before
+
+    print(f"Topology: {switches} switches, {sum(len(p) for p in graph.links.values())} "
+          f"directed links, {len(pairs)} site pairs, k={graph.k}")
+    print(f"  Full computation:   {full * 1000:8.2f} ms")
+    print(f"  Cached lookup:      {cached * 1000:8.2f} ms")
+    print(f"  Link down:          {removal * 1000:8.2f} ms ({removal_pairs} pairs recomputed)")
+    print(f"  Link restored:      {restore * 1000:8.2f} ms ({restore_pairs} pairs recomputed)")
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    benchmark(switches=size)
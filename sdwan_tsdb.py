@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Time-Series Store
+Embedded on-disk store for per-link metrics (latency, loss, jitter,
+bandwidth). Each series is kept in three tiers: raw samples, 1-minute and
+1-hour rollups (mean/min/max/count). Tiers are split into time segments,
+each an append-only file of compressed blocks (delta-of-delta timestamps,
+XOR-encoded floats) read back through mmap. Retention drops whole segments.
+"""
+
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from array import array
+from urllib.parse import quote, unquote
+
+try:
+    import numpy as np
+except ImportError:  # Range queries then return array('d')
+    np = None
+
+# tier -> (bucket seconds, segment span seconds, default retention seconds)
+TIERS = {
+    'raw': (0, 86400, 14 * 86400),
+    '1m': (60, 30 * 86400, 180 * 86400),
+    '1h': (3600, 365 * 86400, 5 * 365 * 86400),
+}
+TIER_ORDER = ['raw', '1m', '1h']
+COLUMNS = {
+    'raw': ('value',),
+    '1m': ('mean', 'min', 'max', 'count'),
+    '1h': ('mean', 'min', 'max', 'count'),
+}
+
+BLOCK_MAGIC = b'TSB1'
+# magic, point count, payload length, first timestamp (ms), last timestamp (ms)
+BLOCK_HEADER = struct.Struct('<4sIIqq')
+BLOCK_POINTS = 256
+FLUSH_INTERVAL = 60  # seconds a partial block may stay in memory
+OPEN_BUCKETS_FILE = 'open-buckets.json'  # Rollup buckets still filling, per series
+
+_DOUBLE = struct.Struct('<d')
+_BITS = struct.Struct('<Q')
+
+
+# ----------------------------------------------------------------------
+# Column codecs
+# ----------------------------------------------------------------------
+
+def _put_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_timestamps(timestamps):
+    """Delta-of-delta, zigzag varints (first value lives in the block header)"""
+    out = bytearray()
+    previous = timestamps[0]
+    previous_delta = 0
+    for ts in timestamps[1:]:
+        delta = ts - previous
+        dod = delta - previous_delta
+        _put_varint(out, (dod << 1) ^ (dod >> 63))
+        previous, previous_delta = ts, delta
+    return bytes(out)
+
+
+def decode_timestamps(buf, pos, end, first, count):
+    timestamps = [first]
+    previous = first
+    previous_delta = 0
+    while len(timestamps) < count and pos < end:
+        zz, pos = _get_varint(buf, pos)
+        delta = previous_delta + ((zz >> 1) ^ -(zz & 1))
+        previous += delta
+        previous_delta = delta
+        timestamps.append(previous)
+    return timestamps
+
+
+def encode_floats(values):
+    """XOR with the previous value's bits; trailing zero bits dropped"""
+    out = bytearray()
+    previous = 0
+    for value in values:
+        bits = _BITS.unpack(_DOUBLE.pack(value))[0]
+        xor = bits ^ previous
+        previous = bits
+        if xor == 0:
+            out.append(0)
+            continue
+        trailing = (xor & -xor).bit_length() - 1
+        _put_varint(out, trailing + 1)
+        _put_varint(out, xor >> trailing)
+    return bytes(out)
+
+
+def decode_floats(buf, pos, end, count):
+    values = array('d')
+    previous = 0
+    unpack_double = _DOUBLE.unpack
+    pack_bits = _BITS.pack
+    while len(values) < count and pos < end:
+        tag, pos = _get_varint(buf, pos)
+        if tag:
+            significant, pos = _get_varint(buf, pos)
+            previous ^= significant << (tag - 1)
+        values.append(unpack_double(pack_bits(previous))[0])
+    return values
+
+
+def _encode_block(timestamps, columns):
+    parts = [encode_timestamps(timestamps)] + [encode_floats(c) for c in columns]
+    payload = b''.join(struct.pack('<I', len(p)) + p for p in parts)
+    header = BLOCK_HEADER.pack(BLOCK_MAGIC, len(timestamps), len(payload),
+                               timestamps[0], timestamps[-1])
+    return header + payload
+
+
+def _decode_block(buf, offset, column_index):
+    """Return (timestamps_ms, values) of one column of a block"""
+    _, count, length, first, _ = BLOCK_HEADER.unpack_from(buf, offset)
+    pos = offset + BLOCK_HEADER.size
+    part_len = struct.unpack_from('<I', buf, pos)[0]
+    timestamps = decode_timestamps(buf, pos + 4, pos + 4 + part_len, first, count)
+    pos += 4 + part_len
+    for _ in range(column_index):
+        pos += 4 + struct.unpack_from('<I', buf, pos)[0]
+    part_len = struct.unpack_from('<I', buf, pos)[0]
+    values = decode_floats(buf, pos + 4, pos + 4 + part_len, count)
+    return timestamps, values
+
+
+# ----------------------------------------------------------------------
+# Segments and tiers
+# ----------------------------------------------------------------------
+
+class _Segment:
+    """One append-only segment file and its in-memory block index"""
+    def __init__(self, path, start):
+        self.path = path
+        self.start = start
+        self.blocks = []  # [(first_ms, last_ms, offset)]
+        self.size = 0
+        self._map = None
+        self._map_size = 0
+        self._scan()
+
+    def _scan(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset + BLOCK_HEADER.size <= len(data):
+            magic, _, length, first, last = BLOCK_HEADER.unpack_from(data, offset)
+            end = offset + BLOCK_HEADER.size + length
+            if magic != BLOCK_MAGIC or end > len(data):
+                break  # Torn tail from a crash: ignore it
+            self.blocks.append((first, last, offset))
+            offset = end
+        self.size = offset
+
+    def append(self, block, first, last):
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as f:
+            f.seek(self.size)
+            f.write(block)
+            f.truncate()
+        self.blocks.append((first, last, self.size))
+        self.size += len(block)
+
+    def buffer(self):
+        """mmap of the segment, remapped when the file has grown"""
+        if self._map is None or self._map_size != self.size:
+            self.close()
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_size = self.size
+        return self._map
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class _Tier:
+    """Segments and the pending (not yet written) block of one tier"""
+    def __init__(self, directory, name, retention):
+        self.directory = directory
+        self.name = name
+        self.bucket, self.span, _ = TIERS[name]
+        self.retention = retention
+        self.columns = COLUMNS[name]
+        self.pending_ts = []
+        self.pending = [[] for _ in self.columns]
+        self.pending_since = None
+        self.segments = {}
+
+        os.makedirs(directory, exist_ok=True)
+        for filename in os.listdir(directory):
+            if filename.endswith('.seg'):
+                start = int(filename[:-4])
+                self.segments[start] = _Segment(os.path.join(directory, filename), start)
+        self.enforce_retention()
+
+    def append(self, ts_ms, row):
+        if self.pending_ts and ts_ms < self.pending_ts[-1]:
+            return  # Out-of-order samples are not supported
+        if self._segment_start(ts_ms) + self.span < time.time() - self.retention:
+            return  # Its segment would already be past retention
+        if self.pending_ts and self._segment_start(ts_ms) != self._segment_start(self.pending_ts[0]):
+            self.flush()
+        if not self.pending_ts:
+            self.pending_since = time.monotonic()
+        self.pending_ts.append(ts_ms)
+        for column, value in zip(self.pending, row):
+            column.append(value)
+        if (len(self.pending_ts) >= BLOCK_POINTS
+                or time.monotonic() - self.pending_since >= FLUSH_INTERVAL):
+            self.flush()
+
+    def last_ms(self):
+        """Timestamp of the newest row, written or pending (-1 when empty)"""
+        if self.pending_ts:
+            return self.pending_ts[-1]
+        for start in sorted(self.segments, reverse=True):
+            if self.segments[start].blocks:
+                return self.segments[start].blocks[-1][1]
+        return -1
+
+    def _segment_start(self, ts_ms):
+        return ts_ms // 1000 // self.span * self.span
+
+    def flush(self):
+        if not self.pending_ts:
+            return
+        start = self._segment_start(self.pending_ts[0])
+        segment = self.segments.get(start)
+        if segment is None:
+            # Expire old segments before registering the one being written
+            self.enforce_retention()
+            segment = _Segment(os.path.join(self.directory, f"{start}.seg"), start)
+            self.segments[start] = segment
+        segment.append(_encode_block(self.pending_ts, self.pending),
+                       self.pending_ts[0], self.pending_ts[-1])
+        self.pending_ts = []
+        self.pending = [[] for _ in self.columns]
+
+    def enforce_retention(self, now=None):
+        cutoff = (time.time() if now is None else now) - self.retention
+        for start in [s for s in self.segments if s + self.span < cutoff]:
+            segment = self.segments.pop(start)
+            segment.close()
+            os.remove(segment.path)
+
+    def read(self, start_ms, end_ms, column):
+        index = self.columns.index(column)
+        timestamps = array('q')
+        values = array('d')
+        for seg_start in sorted(self.segments):
+            if seg_start * 1000 > end_ms or (seg_start + self.span) * 1000 < start_ms:
+                continue
+            segment = self.segments[seg_start]
+            buf = None
+            for first, last, offset in segment.blocks:
+                if last < start_ms or first > end_ms:
+                    continue
+                buf = buf or segment.buffer()
+                block_ts, block_values = _decode_block(buf, offset, index)
+                for ts, value in zip(block_ts, block_values):
+                    if start_ms <= ts <= end_ms:
+                        timestamps.append(ts)
+                        values.append(value)
+
+        for ts, value in zip(self.pending_ts, self.pending[index]):
+            if start_ms <= ts <= end_ms:
+                timestamps.append(ts)
+                values.append(value)
+        return timestamps, values
+
+    def close(self):
+        self.flush()
+        for segment in self.segments.values():
+            segment.close()
+
+
+class _Series:
+    """All tiers of one (link, metric) plus the open rollup buckets"""
+    def __init__(self, directory, retention):
+        self.tiers = {name: _Tier(os.path.join(directory, name), name, retention[name])
+                      for name in TIER_ORDER}
+        # tier -> [bucket_start_s, sum, min, max, count]
+        self.open_buckets = {}
+        self.buckets_path = os.path.join(directory, OPEN_BUCKETS_FILE)
+        self._load_buckets()
+
+    def _load_buckets(self):
+        """Reopen the rollup buckets that were still filling at the last flush"""
+        try:
+            with open(self.buckets_path) as f:
+                buckets = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, bucket in buckets.items():
+            # Closed into its tier after that flush (then a crash): already written
+            if name in self.tiers and self.tiers[name].last_ms() < bucket[0] * 1000:
+                self.open_buckets[name] = bucket
+
+    def _save_buckets(self):
+        temporary = self.buckets_path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.open_buckets, f)
+        os.replace(temporary, self.buckets_path)
+
+    def append(self, ts, value):
+        ts_ms = int(ts * 1000)
+        self.tiers['raw'].append(ts_ms, (value,))
+        self._roll(1, ts, value, value, value, 1)
+
+    def _roll(self, level, ts, mean, low, high, count):
+        """Fold a row into the open bucket of TIER_ORDER[level]"""
+        if level >= len(TIER_ORDER):
+            return
+        name = TIER_ORDER[level]
+        bucket_start = int(ts) // TIERS[name][0] * TIERS[name][0]
+        bucket = self.open_buckets.get(name)
+
+        if bucket is not None and bucket[0] != bucket_start:
+            self._close_bucket(level, bucket)
+            bucket = None
+        if bucket is None:
+            self.open_buckets[name] = [bucket_start, mean * count, low, high, count]
+        else:
+            bucket[1] += mean * count
+            bucket[2] = min(bucket[2], low)
+            bucket[3] = max(bucket[3], high)
+            bucket[4] += count
+
+    def _close_bucket(self, level, bucket):
+        start, total, low, high, count = bucket
+        mean = total / count
+        self.tiers[TIER_ORDER[level]].append(start * 1000, (mean, low, high, count))
+        self._roll(level + 1, start, mean, low, high, count)
+
+    def flush(self):
+        for tier in self.tiers.values():
+            tier.flush()
+        self._save_buckets()
+
+    def close(self):
+        for tier in self.tiers.values():
+            tier.close()
+        self._save_buckets()
+
+
+class TimeSeriesStore:
+    """Per-link metric history on disk with rollups and retention"""
+    def __init__(self, root, retention=None):
+        self.root = root
+        self.retention = {name: TIERS[name][2] for name in TIER_ORDER}
+        self.retention.update(retention or {})
+        self.series = {}
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _series(self, link_id, metric, create=True):
+        key = (link_id, metric)
+        series = self.series.get(key)
+        if series is None:
+            directory = os.path.join(self.root, quote(link_id, safe=''), metric)
+            if not create and not os.path.isdir(directory):
+                return None
+            series = _Series(directory, self.retention)
+            self.series[key] = series
+        return series
+
+    def append(self, link_id, metric, value, ts=None):
+        """Record one sample; ts in seconds (default: now)"""
+        with self.lock:
+            self._series(link_id, metric).append(time.time() if ts is None else ts, value)
+
+    def record(self, link_id, metrics, ts=None):
+        """Record several metrics sampled at the same time"""
+        ts = time.time() if ts is None else ts
+        with self.lock:
+            for metric, value in metrics.items():
+                if value is not None:
+                    self._series(link_id, metric).append(ts, value)
+
+    def query(self, link_id, metric, start, end=None, tier='auto', column=None):
+        """
+        Samples in [start, end] (seconds) as (timestamps, values) arrays.
+        tier: 'raw', '1m', '1h' or 'auto' (coarsest tier still giving
+        roughly one point per minute of range or better).
+        column: 'value' for raw, 'mean' / 'min' / 'max' / 'count' for rollups.
+        """
+        end = time.time() if end is None else end
+        if tier == 'auto':
+            span = end - start
+            tier = 'raw' if span <= 6 * 3600 else '1m' if span <= 7 * 86400 else '1h'
+        column = column or ('value' if tier == 'raw' else 'mean')
+
+        with self.lock:
+            series = self._series(link_id, metric, create=False)
+            if series is None:
+                timestamps, values = array('q'), array('d')
+            else:
+                timestamps, values = series.tiers[tier].read(int(start * 1000),
+                                                             int(end * 1000), column)
+
+        if np is not None:
+            return np.frombuffer(timestamps, dtype=np.int64) / 1000.0, np.frombuffer(values)
+        return array('d', (ts / 1000.0 for ts in timestamps)), values
+
+    def links(self):
+        """Link ids with stored history"""
+        return sorted(unquote(name) for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def flush(self):
+        with self.lock:
+            for series in self.series.values():
+                series.flush()
+
+    def close(self):
+        with self.lock:
+            for series in self.series.values():
+                series.close()
+            self.series.clear()
+
+
+def restart_check(root, samples=7200, restart_at=5400):
+    """Close and reopen mid-bucket: the rollups must match an uninterrupted run"""
+    base = (int(time.time()) // 3600 - 3) * 3600
+    store = TimeSeriesStore(root)
+    for i in range(samples + 60):  # One extra minute closes the last 1m bucket
+        if i == restart_at:
+            store.close()
+            store = TimeSeriesStore(root)
+        store.append('site1->site2', 'latency', 1.0, base + i)
+    store.flush()
+    _, counts = store.query('site1->site2', 'latency', base, base + samples - 1,
+                            tier='1m', column='count')
+    store.close()
+    ok = len(counts) == samples // 60 and sum(counts) == samples
+    print(f"Restart at sample {restart_at}: 1m tier has {len(counts)} rows covering "
+          f"{sum(counts):.0f} samples ({'ok' if ok else 'MISSING DATA'})")
+    return ok
+
+
+def benchmark(root, days=14, interval=1.0):
+    """Fill one link with days of 1 s samples and time typical reads"""
+    rng = random.Random(1)
+    store = TimeSeriesStore(root)
+    now = time.time()
+    start = now - days * 86400
+
+    t0 = time.perf_counter()
+    ts = start
+    latency = 20.0
+    while ts < now:
+        latency = max(1.0, latency + rng.gauss(0, 0.5))
+        store.append('site1->site2', 'latency', round(latency, 3), ts)
+        ts += interval
+    store.flush()
+    write = time.perf_counter() - t0
+
+    size = sum(os.path.getsize(os.path.join(d, f))
+               for d, _, files in os.walk(root) for f in files)
+    points = int(days * 86400 / interval)
+
+    for label, span, tier in (('last 5 min (raw)', 300, 'raw'), ('last hour (raw)', 3600, 'raw'),
+                              ('last day (1m)', 86400, '1m'), ('everything (1h)', days * 86400, '1h')):
+        t0 = time.perf_counter()
+        _, values = store.query('site1->site2', 'latency', now - span, now, tier=tier)
+        print(f"  {label:20s} {len(values):7d} points in "
+              f"{(time.perf_counter() - t0) * 1000:7.2f} ms")
+
+    print(f"Wrote {points} samples in {write:.1f} s, {size / 1024 / 1024:.2f} MB on disk "
+          f"({size / points:.2f} bytes/sample, all tiers)")
+    store.close()
+    restart_check(root.rstrip('/') + '-restart')  # Beside root: not a link directory
+
+
+if __name__ == '__main__':
+    import tempfile
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp(prefix='sdwan-tsdb-')
+    benchmark(directory, days=int(sys.argv[2]) if len(sys.argv) > 2 else 14)
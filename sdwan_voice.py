@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Voice Quality Probe
+Sends an RTP-like G.711 stream (160-byte payload every 20 ms, DSCP EF by
+default) from one namespace to a receiver socket opened in the target
+namespace by the same process. Both ends share CLOCK_MONOTONIC, so one-way
+delay is exact. The receiver computes RFC 3550 interarrival jitter,
+reordering, loss bursts (Gilbert model) and an ITU-T G.107 E-model MOS.
+"""
+
+import random
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+
+from sdwan_prober import open_socket
+
+PACKET_INTERVAL = 0.020  # 20 ms voice frames
+PAYLOAD_BYTES = 160      # G.711, 8 kHz * 20 ms
+CLOCK_RATE = 8000        # RTP timestamp units per second
+DSCP_EF = 46
+VOICE_PORT = 16400       # Inside the RTP range the controller classifies as critical
+
+# RTP header (V=2, PT=0 PCMU) followed by the send time in ns
+RTP_HEADER = struct.Struct('!BBHII')
+SEND_TIME = struct.Struct('!Q')
+
+# E-model defaults for G.711 with packet loss concealment (ITU-T G.113)
+CODEC_IE = 0.0
+CODEC_BPL = 25.1
+CODEC_DELAY_MS = 10.0
+
+
+def e_model(delay_ms, loss_percent, burst_ratio=1.0, ie=CODEC_IE, bpl=CODEC_BPL):
+    """(R factor, MOS) from one-way delay, loss and burst ratio (ITU-T G.107)"""
+    delay_impairment = 0.024 * delay_ms
+    if delay_ms > 177.3:
+        delay_impairment += 0.11 * (delay_ms - 177.3)
+    burst_ratio = max(burst_ratio, 1.0)
+    equipment = ie + (95 - ie) * loss_percent / (loss_percent / burst_ratio + bpl)
+
+    r = max(0.0, min(100.0, 93.2 - delay_impairment - equipment))
+    mos = 1 + 0.035 * r + 7e-6 * r * (r - 60) * (100 - r)
+    return r, max(1.0, min(4.5, mos))
+
+
+def analyze(count, arrivals):
+    """
+    Stream statistics from [(sequence index, send_ns, arrival_ns)] in arrival order.
+    """
+    received = {}
+    reordered = duplicates = 0
+    highest = -1
+    jitter = 0.0
+    previous_transit = None
+    delays = []
+
+    for index, send_ns, arrival_ns in arrivals:
+        if index in received:
+            duplicates += 1
+            continue
+        received[index] = arrival_ns
+        if index < highest:
+            reordered += 1
+        highest = max(highest, index)
+
+        # RFC 3550 6.4.1: J += (|D(i-1, i)| - J) / 16, over arrival order
+        transit = (arrival_ns - send_ns) / 1e6
+        delays.append(transit)
+        if previous_transit is not None:
+            jitter += (abs(transit - previous_transit) - jitter) / 16
+        previous_transit = transit
+
+    # Loss runs over the sent sequence
+    lost_flags = [index not in received for index in range(count)]
+    bursts = []
+    run = 0
+    for lost in lost_flags:
+        if lost:
+            run += 1
+        elif run:
+            bursts.append(run)
+            run = 0
+    if run:
+        bursts.append(run)
+
+    lost = sum(lost_flags)
+    loss_percent = lost * 100.0 / count if count else 100.0
+    burst_ratio = _burst_ratio(lost_flags)
+
+    if not delays:
+        return {'success': False, 'error': 'No packet received', 'packets_sent': count,
+                'packet_loss_percent': 100.0}
+
+    delay = sum(delays) / len(delays)
+    # Jitter buffer sized at twice the jitter adds to the mouth-to-ear delay
+    effective_delay = delay + 2 * jitter + CODEC_DELAY_MS
+    r_factor, mos = e_model(effective_delay, loss_percent, burst_ratio)
+
+    return {
+        'success': True,
+        'packets_sent': count,
+        'packets_received': len(received),
+        'packet_loss_percent': loss_percent,
+        'one_way_delay_ms': delay,
+        'delay_max_ms': max(delays),
+        'jitter_ms': jitter,
+        'reordered': reordered,
+        'duplicates': duplicates,
+        'loss_bursts': len(bursts),
+        'max_burst': max(bursts) if bursts else 0,
+        'burst_ratio': burst_ratio,
+        'r_factor': r_factor,
+        'mos': mos
+    }
+
+
+def _burst_ratio(lost_flags):
+    """
+    BurstR of the 2-state Gilbert model: 1 / (p + q), with p = P(loss after
+    a received packet) and q = P(received after a loss); 1 for random loss.
+    """
+    transitions = {(False, False): 0, (False, True): 0, (True, False): 0, (True, True): 0}
+    for previous, current in zip(lost_flags, lost_flags[1:]):
+        transitions[(previous, current)] += 1
+
+    from_received = transitions[(False, False)] + transitions[(False, True)]
+    from_lost = transitions[(True, False)] + transitions[(True, True)]
+    if not from_received or not from_lost:
+        return 1.0
+    p = transitions[(False, True)] / from_received
+    q = transitions[(True, False)] / from_lost
+    return 1.0 / (p + q) if p + q else 1.0
+
+
+class VoiceProbe:
+    """One RTP-like stream between two namespaces"""
+    def __init__(self, source_ns, target_ns, target_ip, port=VOICE_PORT, dscp=DSCP_EF):
+        self.target_ip = target_ip
+        self.port = port
+
+        self.receiver = open_socket(target_ns, socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.receiver.bind((target_ip, port))
+            self.sender = open_socket(source_ns, socket.AF_INET, socket.SOCK_DGRAM)
+        except OSError:
+            self.receiver.close()
+            raise
+        self.sender.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, dscp << 2)
+        self.ssrc = random.getrandbits(32)
+        self.base_seq = 0
+
+    def close(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def run(self, duration=5.0, interval=PACKET_INTERVAL, timeout=1.0):
+        """Stream for duration seconds; returns analyze() statistics"""
+        count = max(1, int(duration / interval))
+        self.base_seq = random.randrange(0x10000)
+        arrivals = []
+        done = threading.Event()
+        complete = threading.Event()
+        receiver = threading.Thread(target=self._receive, args=(arrivals, count, done, complete),
+                                    daemon=True, name='voice-rx')
+        receiver.start()
+
+        try:
+            self._send(count, interval)
+        finally:
+            # Let late packets in, then stop the receiver
+            complete.wait(timeout)
+            done.set()
+            receiver.join()
+
+        return analyze(count, arrivals)
+
+    def _send(self, count, interval):
+        payload = bytes(PAYLOAD_BYTES - SEND_TIME.size)
+        base_ts = random.getrandbits(32)
+        start = time.monotonic()
+
+        for index in range(count):
+            # Absolute schedule: pacing errors do not accumulate
+            delay = start + index * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            header = RTP_HEADER.pack(0x80, 0, (self.base_seq + index) & 0xFFFF,
+                                     (base_ts + index * int(CLOCK_RATE * interval)) & 0xFFFFFFFF,
+                                     self.ssrc)
+            packet = header + SEND_TIME.pack(time.monotonic_ns()) + payload
+            try:
+                self.sender.sendto(packet, (self.target_ip, self.port))
+            except OSError:
+                pass  # Counted as lost
+
+    def _receive(self, arrivals, count, done, complete):
+        sock = self.receiver
+        while not done.is_set():
+            if not select.select([sock], [], [], 0.05)[0]:
+                continue
+            data = sock.recv(2048)
+            arrival_ns = time.monotonic_ns()
+            if len(data) < RTP_HEADER.size + SEND_TIME.size:
+                continue
+            _, _, sequence, _, ssrc = RTP_HEADER.unpack_from(data)
+            if ssrc != self.ssrc:
+                continue
+            send_ns = SEND_TIME.unpack_from(data, RTP_HEADER.size)[0]
+            # 16-bit sequence numbers wrap: index relative to the first one sent
+            arrivals.append(((sequence - self.base_seq) & 0xFFFF, send_ns, arrival_ns))
+            if len(arrivals) >= count:
+                complete.set()
+
+
+def voice_test(source_ns, target_ns, target_ip, duration=5.0, dscp=DSCP_EF, port=VOICE_PORT):
+    """Run one voice-quality measurement; same success/error layout as ping_test"""
+    try:
+        probe = VoiceProbe(source_ns, target_ns, target_ip, port, dscp)
+    except OSError as e:
+        return {'success': False, 'error': str(e)}
+    try:
+        return probe.run(duration)
+    finally:
+        probe.close()
+
+
+def mos_rating(mos):
+    """Listening quality category of a MOS"""
+    if mos >= 4.3:
+        return 'Excellent'
+    if mos >= 4.0:
+        return 'Good'
+    if mos >= 3.6:
+        return 'Fair'
+    if mos >= 3.1:
+        return 'Poor'
+    return 'Bad'
+
+
+if __name__ == '__main__':
+    # Usage: sdwan_voice.py <source_ns|-> <target_ns|-> <target_ip> [duration] [dscp]
+    if len(sys.argv) < 4:
+        print(f"Usage: {sys.argv[0]} <source_ns|-> <target_ns|-> <target_ip> [duration] [dscp]")
+        sys.exit(1)
+    source, target = (None if ns == '-' else ns for ns in sys.argv[1:3])
+    result = voice_test(source, target, sys.argv[3],
+                        float(sys.argv[4]) if len(sys.argv) > 4 else 5.0,
+                        int(sys.argv[5]) if len(sys.argv) > 5 else DSCP_EF)
+    if not result['success']:
+        print(f"Voice test failed: {result['error']}")
+        sys.exit(1)
+    print(f"Packets: {result['packets_received']}/{result['packets_sent']} "
+          f"({result['packet_loss_percent']:.1f}% loss, {result['loss_bursts']} bursts, "
+          f"max {result['max_burst']})")
+    print(f"One-way delay: {result['one_way_delay_ms']:.3f} ms (max {result['delay_max_ms']:.3f})")
+    print(f"Jitter (RFC 3550): {result['jitter_ms']:.3f} ms, reordered: {result['reordered']}")
+    print(f"E-model: R={result['r_factor']:.1f}, MOS={result['mos']:.2f} "
+          f"({mos_rating(result['mos'])})")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Web Dashboard
+HTTP front end over the dashboard snapshot: a static page and a JSON API,
+both gzip-compressed and served with ETags. The JSON document is encoded
+once per snapshot change and shared by every viewer, so N browsers cost one
+set of collectors and one encoding, and polls of unchanged data get 304.
+"""
+
+import gzip
+import hashlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+POLL_INTERVAL_MS = 2000  # Page refresh cadence
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>SD-WAN Dashboard</title>
+<style>
+body { font-family: monospace; background: #111; color: #ddd; margin: 1.5em; }
+h1 { color: #4cc; font-size: 1.3em; }
+h2 { font-size: 1em; margin-top: 1.5em; }
+table { border-collapse: collapse; }
+td, th { padding: 2px 12px 2px 0; text-align: left; }
+.good { color: #4c4; } .warn { color: #cc4; } .bad { color: #c44; } .age { color: #888; }
+input { background: #222; color: #ddd; border: 1px solid #444; }
+</style>
+</head>
+<body>
+<h1>SD-WAN REAL-TIME DASHBOARD</h1>
+<div id="status"></div>
+<h2>INTER-SITE CONNECTIVITY <span id="count"></span></h2>
+<input id="filter" placeholder="filter">
+<table><thead><tr><th></th><th>Link</th><th>Latency</th><th>Loss</th><th>p50/p99</th><th>Score</th></tr></thead>
+<tbody id="links"></tbody></table>
+<script>
+const escape = s => String(s).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})[c]);
+const age = t => t ? ` <span class="age">(changed ${Math.max(0, Math.round(Date.now() / 1000 - t))} s ago)</span>` : '';
+let state = null;
+
+function render() {
+  if (!state) return;
+  const s = state.sections, c = s.controller, o = s.ovs, t = s.topology;
+  document.getElementById('status').innerHTML =
+    `<div>Controller: ${c ? (c.data.running ? `<span class="good">RUNNING</span> (PID ${escape(c.data.pid)})`
+                                             : '<span class="bad">NOT RUNNING</span>') + age(c.changed_at) : '...'}</div>` +
+    `<div>Open vSwitch: ${o ? (o.data.connected ? `${o.data.bridges.length} bridges, ` +
+        `${Object.values(o.data.flows).reduce((a, b) => a + b, 0)} flows` : '<span class="bad">DISCONNECTED</span>') +
+        age(o.changed_at) : '...'}</div>` +
+    `<div>Topology: ${t ? `${t.data.namespaces} namespaces, ${t.data.sites.length} sites` + age(t.changed_at) : '...'}</div>`;
+  const needle = document.getElementById('filter').value.toLowerCase();
+  const links = (s.links ? s.links.data : []).filter(l => !needle ||
+    l.link.toLowerCase().includes(needle) || l.label.toLowerCase().includes(needle));
+  document.getElementById('count').innerHTML = `(${links.length} links, worst first)` +
+    (s.links ? age(s.links.changed_at) : '');
+  document.getElementById('links').innerHTML = links.map(l => {
+    const cls = !l.success ? 'bad' : l.latency < 50 && l.loss < 1 ? 'good' : l.latency < 100 && l.loss < 5 ? 'warn' : 'bad';
+    return `<tr><td class="${cls}">●</td><td>${escape(l.label)}</td>` + (l.success ?
+      `<td>${l.latency.toFixed(2)} ms</td><td>${l.loss.toFixed(1)} %</td>` +
+      `<td>${l.p50.toFixed(1)}/${l.p99.toFixed(1)}</td>` : '<td class="bad">UNREACHABLE</td><td></td><td></td>') +
+      `<td>${l.score.toFixed(0)}</td></tr>`;
+  }).join('');
+}
+
+async function poll() {
+  try {
+    // no-cache: the browser revalidates with If-None-Match and reuses the body on 304
+    const response = await fetch('api/state', {cache: 'no-cache'});
+    if (response.ok) state = await response.json();
+  } catch (e) {}
+  render();
+  setTimeout(poll, POLL_INTERVAL);
+}
+document.getElementById('filter').addEventListener('input', render);
+poll();
+</script>
+</body>
+</html>
+""".replace('POLL_INTERVAL', str(POLL_INTERVAL_MS))
+
+
+class _Encoded:
+    """A response body kept plain and gzip-compressed, with its ETag"""
+    __slots__ = ('etag', 'body', 'gzipped', 'content_type')
+
+    def __init__(self, body, etag, content_type):
+        self.body = body
+        self.gzipped = gzip.compress(body, 6)
+        self.etag = etag
+        self.content_type = content_type
+
+
+class StateCache:
+    """
+    JSON document of the snapshot, encoded once per snapshot change.
+    document(sections) turns the snapshot sections into plain JSON data.
+    """
+    def __init__(self, snapshot, document):
+        self.snapshot = snapshot
+        self.document = document
+        self.lock = threading.Lock()
+        self.key = None
+        self.encoded = None
+        # Versions restart with the process: keep ETags of two runs apart
+        self.epoch = f"{int(time.time()):x}"
+        self.stats = {'requests': 0, 'encodings': 0, 'not_modified': 0}
+
+    def get(self):
+        sections = self.snapshot.read()
+        key = tuple(sorted((name, entry[0]) for name, entry in sections.items()))
+        with self.lock:
+            self.stats['requests'] += 1
+            if key != self.key:
+                body = json.dumps(self.document(sections), separators=(',', ':')).encode()
+                versions = '.'.join(f"{name[0]}{version}" for name, version in key)
+                self.encoded = _Encoded(body, f'"{self.epoch}-{versions}"', 'application/json')
+                self.key = key
+                self.stats['encodings'] += 1
+            return self.encoded
+
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'SDWANDashboard/1.0'
+    protocol_version = 'HTTP/1.1'  # Keep-alive between polls
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+    page = _Encoded(PAGE.encode(), '"page-' + hashlib.sha1(PAGE.encode()).hexdigest()[:16] + '"',
+                    'text/html; charset=utf-8')
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path in ('/', '/index.html'):
+            self._send(self.page)
+        elif path == '/api/state':
+            self._send(self.server.cache.get())
+        else:
+            self.send_error(404)
+
+    def _send(self, encoded):
+        if self.headers.get('If-None-Match') == encoded.etag:
+            self.server.cache.stats['not_modified'] += 1
+            self.send_response(304)
+            self.send_header('ETag', encoded.etag)
+            self.end_headers()
+            return
+
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = encoded.gzipped if gzipped else encoded.body
+        self.send_response(200)
+        self.send_header('Content-Type', encoded.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', encoded.etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # One line per poll per viewer is noise
+
+
+class DashboardHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache):
+        super().__init__(address, DashboardRequestHandler)
+        self.cache = cache
+
+
+def benchmark(viewers=50, polls=20, links=870):
+    """Many viewers polling one cache: encodings, 304s and bytes on the wire"""
+    import http.client
+
+    class Snapshot:
+        def __init__(self):
+            self.version = 1
+            self.data = [{'link': f"site{i % 30}->site{i // 30}", 'label': f"Site{i % 30} → Site{i // 30}",
+                          'success': True, 'latency': 10.0 + i % 50, 'loss': 0.0, 'p50': 10.0,
+                          'p99': 20.0, 'score': 90.0} for i in range(links)]
+
+        def read(self):
+            return {'links': (self.version, time.time(), self.data)}
+
+    snapshot = Snapshot()
+    cache = StateCache(snapshot, lambda sections: {name: entry[2] for name, entry in sections.items()})
+    server = DashboardHTTPServer(('127.0.0.1', 0), cache)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    wire = [0]
+    def viewer():
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        etag = None
+        for _ in range(polls):
+            headers = {'Accept-Encoding': 'gzip'}
+            if etag:
+                headers['If-None-Match'] = etag
+            conn.request('GET', '/api/state', headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            wire[0] += len(body)
+            etag = response.getheader('ETag', etag)
+        conn.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=viewer) for _ in range(viewers)]
+    for thread in threads:
+        thread.start()
+    for _ in range(3):  # Data changes a few times during the polls
+        time.sleep(0.05)
+        snapshot.version += 1
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    raw = len(json.dumps(snapshot.data, separators=(',', ':')))
+    print(f"{viewers} viewers x {polls} polls in {elapsed:.2f} s: {cache.stats['encodings']} encodings, "
+          f"{cache.stats['not_modified']} x 304")
+    print(f"{wire[0] / (viewers * polls):.0f} bytes/poll on average ({raw} bytes uncompressed JSON)")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50)